@@ -0,0 +1,5 @@
+# benchmarks - synthetic workloads and timings for the interpreter, signer and builders
+#
+#   python -m benchmarks                      run every case and print a table
+#   python -m benchmarks --save base.json     ...and keep the results as a baseline
+#   python -m benchmarks --compare base.json  fail (exit 1) on cases that got slower
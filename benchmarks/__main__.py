@@ -0,0 +1,116 @@
+# __main__.py - runs the benchmark cases and compares them with a baseline
+#
+#   python -m benchmarks [--runs N] [--scale F] [--only NAME[,NAME...]]
+#                        [--save FILE] [--compare FILE] [--tolerance F]
+import os
+import sys
+import json
+import time
+import timeit
+import platform
+import tempfile
+import contextlib
+
+from .cases import CASES
+from msx.scanner import CACHE_DIR_ENV
+from msx_output import NullSink, use_sink
+
+
+def option(name, default, kind=str):
+    if name in sys.argv:
+        return kind(sys.argv[sys.argv.index(name) + 1])
+    return default
+
+
+def measure(func, runs):
+    """Returns the best time of one call, timeit-style: each sample repeats the call for at least 0.2 s."""
+    timer = timeit.Timer(func)
+    number, _ = timer.autorange()
+    return min(timer.repeat(repeat=runs, number=number)) / number
+
+
+def run_case(name, runs, scale):
+    setup, _ = CASES[name]
+    cwd = os.getcwd()
+    cache_dir = os.environ.get(CACHE_DIR_ENV)
+    with tempfile.TemporaryDirectory(prefix="msx-bench-") as workdir:
+        os.chdir(workdir)
+        # Scan caches stay in the work folder, not the user's cache folder
+        os.environ[CACHE_DIR_ENV] = os.path.join(workdir, ".cache")
+        try:
+            with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull), use_sink(NullSink()):
+                func = setup(workdir, scale)
+                return measure(func, runs)
+        finally:
+            os.chdir(cwd)
+            if cache_dir is None:
+                del os.environ[CACHE_DIR_ENV]
+            else:
+                os.environ[CACHE_DIR_ENV] = cache_dir
+
+
+def compare(results, baseline, tolerance):
+    """Prints each case against the baseline; returns the names that got slower than allowed."""
+    regressions = []
+    for name, seconds in results.items():
+        base = baseline.get(name)
+        if base is None:
+            print(f"  {name:<30} {seconds * 1000:10.3f} ms   (not in baseline)")
+            continue
+        ratio = seconds / base
+        status = "ok"
+        if ratio > 1 + tolerance:
+            status = "SLOWER"
+            regressions.append(name)
+        elif ratio < 1 - tolerance:
+            status = "faster"
+        print(f"  {name:<30} {seconds * 1000:10.3f} ms   baseline {base * 1000:10.3f} ms   x{ratio:5.2f}  {status}")
+    return regressions
+
+
+def main():
+    runs = option("--runs", 5, int)
+    scale = option("--scale", 1.0, float)
+    tolerance = option("--tolerance", 0.25, float)
+    save_path = option("--save", None)
+    compare_path = option("--compare", None)
+    only = option("--only", None)
+    names = only.split(",") if only else list(CASES)
+    unknown = [name for name in names if name not in CASES]
+    if unknown:
+        print(f"Error: unknown benchmark(s): {', '.join(unknown)}. Known: {', '.join(CASES)}")
+        sys.exit(2)
+
+    results = {}
+    for name in names:
+        start = time.perf_counter()
+        results[name] = run_case(name, runs, scale)
+        if not compare_path:
+            print(f"  {name:<30} {results[name] * 1000:10.3f} ms   {CASES[name][1]}"
+                  f"  [{time.perf_counter() - start:.1f} s]")
+
+    if save_path:
+        with open(save_path, "w", encoding="utf-8") as f:
+            json.dump({
+                "python": platform.python_version(),
+                "machine": platform.machine(),
+                "scale": scale,
+                "results": results,
+            }, f, indent=2)
+        print(f"Baseline saved to {save_path}")
+
+    if compare_path:
+        with open(compare_path, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        if baseline.get("scale", 1.0) != scale:
+            print(f"Error: baseline was recorded at --scale {baseline.get('scale')}, not {scale}.")
+            sys.exit(2)
+        regressions = compare(results, baseline["results"], tolerance)
+        if regressions:
+            print(f"FAIL: {len(regressions)} benchmark(s) more than {tolerance:.0%} slower than the baseline.")
+            sys.exit(1)
+        print("PASS")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,187 @@
+# cases.py - the timed operations
+#
+# Each setup function builds its inputs under `workdir` (which is also the
+# current directory) and returns the callable to time. `scale` multiplies
+# the workload sizes.
+import os
+import time
+import itertools
+
+import runner
+from mini_interpreter import MiniInterpreter
+from msx.signer import scan_file_for_malicious_code, scan_extension
+from msx_storage import RACY_WINDOW_NS
+from .generators import (make_script, make_ghost_config, make_extension_tree, make_mini_project,
+                         make_command_script, make_subscriptions)
+
+
+def _size(value, scale):
+    return max(1, int(value * scale))
+
+
+def run_msx_file_cached(workdir, scale):
+    path = make_script(os.path.join(workdir, "cached.msx"), 20, _size(2000, scale), 10)
+    runner.run_msx_file(path)  # write the .msxc
+    return lambda: runner.run_msx_file(path)
+
+
+def run_msx_file_uncached(workdir, scale):
+    path = make_script(os.path.join(workdir, "uncached.msx"), 20, _size(2000, scale), 10)
+    return lambda: runner.run_msx_file(path, use_cache=False)
+
+
+def handle_body_line(workdir, scale):
+    local_vars = {"name": "ada", "n": "7", "place": "home"}
+    line = '    print "Hello $name, you are number $n at $place"'
+    count = _size(1000, scale)
+
+    def run():
+        for _ in range(count):
+            runner.handle_body_line(line, local_vars)
+    return run
+
+
+def handle_msx_statement(workdir, scale):
+    make_ghost_config(os.path.join(workdir, runner.GHOST_FILE), _size(50000, scale))
+    statements = [
+        "msx help",
+        "msx commands",
+        "msx extension import from file lib.msx",
+        "msx import all modules including .js .msx .py .jsx .tsx .json .ts",
+        "msx ghost key_press key_press3",
+        "msx no such command",
+    ]
+    count = _size(200, scale)
+
+    def run():
+        for _ in range(count):
+            for statement in statements:
+                runner.handle_msx_statement(statement)
+    return run
+
+
+def import_module_repeat(workdir, scale):
+    make_extension_tree(os.path.join(workdir, "lib"), 10)
+    statement = "msx extension import from file lib/module0/file1.msx"
+    runner.handle_msx_statement(statement)  # first import runs it
+    count = _size(1000, scale)
+
+    def run():
+        for _ in range(count):
+            runner.handle_msx_statement(statement)
+    return run
+
+
+def module_index_refresh(workdir, scale):
+    make_extension_tree(os.path.join(workdir, "lib"), _size(2000, scale))
+    statement = "msx import all modules including .js .msx .py .jsx .tsx .json .ts"
+    runner.handle_msx_statement(statement)  # build the index
+    return lambda: runner.handle_msx_statement(statement)
+
+
+def subscription_check(workdir, scale):
+    users = _size(300000, scale)
+    make_subscriptions(os.path.join(workdir, runner.SUBS_FILE), users)
+    names = [f"user{n * 7919 % users}" for n in range(_size(1000, scale))]
+    runner.check_subscription(names[0])  # replay the journal once
+
+    def run():
+        for name in names:
+            runner.check_subscription(name)
+    return run
+
+
+def subscription_sweep(workdir, scale):
+    path = make_subscriptions(os.path.join(workdir, runner.SUBS_FILE), _size(300000, scale))
+    runner.sweep_subscriptions()  # replay the journal once
+    batch = _size(1000, scale)
+    old_start = int(time.time()) - 48 * 3600
+    rounds = itertools.count()
+
+    def run():
+        # Another process subscribes `batch` users that have already expired
+        n = next(rounds)
+        with open(path, "a", encoding="utf-8") as f:
+            f.writelines(f"set late{n}-{i} 24 {old_start}\n" for i in range(batch))
+        runner.sweep_subscriptions()
+    return run
+
+
+def scan_file(workdir, scale):
+    path = os.path.join(workdir, "big.py")
+    with open(path, "w", encoding="utf-8") as f:
+        for i in range(_size(50000, scale)):
+            f.write(f"value_{i} = compute(value) + other_value  # ordinary line\n")
+    return lambda: scan_file_for_malicious_code(path)
+
+
+def scan_extension_tree(workdir, scale):
+    root = os.path.join(workdir, "extension")
+    make_extension_tree(root, _size(2000, scale))
+    return lambda: scan_extension(root, jobs=1, use_cache=False)
+
+
+def scan_extension_warm(workdir, scale):
+    root = os.path.join(workdir, "extension")
+    paths = make_extension_tree(root, _size(2000, scale))
+    # ctime cannot be backdated: wait until the files are old enough to trust
+    time.sleep(RACY_WINDOW_NS / 1e9)
+    scan_extension(root, jobs=1)  # write the scan cache
+    edited = paths[len(paths) // 2]
+    rounds = itertools.count()
+
+    def run():
+        with open(edited, "a", encoding="utf-8") as f:
+            f.write(f'print "edit {next(rounds)}"\n')
+        scan_extension(root, jobs=1)
+    return run
+
+
+def mini_build_local(workdir, scale):
+    # Sized to pass the default code_max, so every file is built
+    make_mini_project(workdir, _size(200, scale), size=800)
+    mini = MiniInterpreter()
+    mini.choose_mode(".mini")
+    return lambda: mini.build("bench")
+
+
+def mini_build_web(workdir, scale):
+    make_mini_project(workdir, _size(200, scale), size=800)
+    mini = MiniInterpreter()
+    mini.choose_mode(".minitron")
+    return lambda: mini.build("bench")
+
+
+def mini_compile_all(workdir, scale):
+    make_mini_project(workdir, _size(200, scale), size=800)
+    mini = MiniInterpreter()
+    mini.set_output_format("quiet")
+    mini.compile_all()  # fill .minicache
+    return lambda: mini.compile_all(jobs=1)
+
+
+def mini_run_script(workdir, scale):
+    path = make_command_script(os.path.join(workdir, "commands.mini"), _size(10000, scale))
+    mini = MiniInterpreter()
+    mini.set_output_format("quiet")
+    return lambda: mini.run_script(path)
+
+
+# name -> (setup, description)
+CASES = {
+    "run_msx_file": (run_msx_file_cached, "20 functions x 10 prints, 2000 calls, warm .msxc"),
+    "run_msx_file_uncached": (run_msx_file_uncached, "same script parsed from source"),
+    "handle_body_line": (handle_body_line, "1000 print lines with 3 substitutions"),
+    "handle_msx_statement": (handle_msx_statement, "1200 mixed MSX statements incl. ghost lookups in 100000 bindings"),
+    "import_module_repeat": (import_module_repeat, "1000 repeat imports of one .msx module"),
+    "module_index_refresh": (module_index_refresh, "msx import all over an unchanged 2000-file tree"),
+    "check_subscription": (subscription_check, "1000 checks against 300000 users"),
+    "sweep_subscriptions": (subscription_sweep, "300000 users, 1000 expired since the last sweep"),
+    "scan_file_for_malicious_code": (scan_file, "one 50000-line file"),
+    "scan_extension": (scan_extension_tree, "2000-file tree, no scan cache"),
+    "scan_extension_warm": (scan_extension_warm, "2000-file tree, warm scan cache, one file edited"),
+    "MiniInterpreter.build local": (mini_build_local, "rebuild of 200 unchanged .mini files"),
+    "MiniInterpreter.build web": (mini_build_web, "rebuild of 200 unchanged .mini files"),
+    "MiniInterpreter.compile_all": (mini_compile_all, "recompile of 200 unchanged .mini files"),
+    "MiniInterpreter.run_script": (mini_run_script, "10000 commands, quiet"),
+}
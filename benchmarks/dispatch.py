@@ -0,0 +1,74 @@
+# dispatch.py - times MSX statement dispatch as the number of commands grows
+#
+# Registers the built-in statements plus N generated ones ("msx ext<i>
+# action<j>") and times resolving a few statements, against a linear
+# if/elif-style scan over the same phrases (what handle_msx_statement used
+# to do), for each N.
+#
+#   python -m benchmarks.dispatch [--counts 0,100,1000,10000] [--runs N]
+import sys
+import timeit
+
+import runner
+from msx_statements import StatementRegistry
+
+STATEMENTS = [
+    "msx help",
+    "msx subscription sweep",
+    "msx extension import from file lib.msx",
+    "msx no such command",
+]
+
+
+def option(name, default):
+    if name in sys.argv:
+        return sys.argv[sys.argv.index(name) + 1]
+    return default
+
+
+def make_registry(extra):
+    registry = StatementRegistry()
+    handler = lambda args: None
+    for phrase, (_, prefix) in runner.MSX_STATEMENTS.items():
+        registry.register(phrase, handler, prefix)
+    for n in range(extra):
+        registry.register(f"msx ext{n // 10} action{n % 10}", handler)
+    return registry
+
+
+def linear_dispatch(phrases):
+    # phrases: [(phrase, prefix)], tested in order like the old chain
+    def dispatch(line):
+        line = line.strip()
+        for phrase, prefix in phrases:
+            if line == phrase or (prefix and line.startswith(phrase)):
+                return True
+        return False
+    return dispatch
+
+
+def per_call_us(func, runs):
+    timer = timeit.Timer(lambda: [func(line) for line in STATEMENTS])
+    number, _ = timer.autorange()
+    best = min(timer.repeat(runs, number))
+    return best / number / len(STATEMENTS) * 1e6
+
+
+def main():
+    counts = [int(c) for c in option("--counts", "0,100,1000,10000").split(",")]
+    runs = int(option("--runs", "5"))
+    print(f"{'commands':>10} {'dispatch us':>12} {'trie walk us':>13} {'linear us':>10}")
+    for extra in counts:
+        registry = make_registry(extra)
+        # generated phrases go first, as extension commands would be checked
+        # before the fallback at the end of a chain
+        phrases = [(f"msx ext{n // 10} action{n % 10}", False) for n in range(extra)]
+        phrases += [(phrase, prefix) for phrase, (_, prefix) in runner.MSX_STATEMENTS.items()]
+        dispatch = per_call_us(registry.dispatch, runs)
+        walk = per_call_us(lambda line: registry.resolve(line.split()), runs)
+        linear = per_call_us(linear_dispatch(phrases), runs)
+        print(f"{registry.count:>10} {dispatch:>12.3f} {walk:>13.3f} {linear:>10.3f}")
+
+
+if __name__ == "__main__":
+    main()
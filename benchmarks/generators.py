@@ -0,0 +1,126 @@
+# generators.py - synthetic inputs for the benchmarks
+import os
+import json
+import time
+
+FILES_PER_DIR = 100
+
+
+def make_script(path, functions=20, calls=500, prints=10):
+    """
+    Writes a .msx script defining `functions` functions of `prints` print
+    lines each (every line substitutes both parameters), followed by
+    `calls` calls spread round-robin over them and a few MSX commands.
+    """
+    lines = []
+    for f in range(functions):
+        lines.append(f"function work{f}(name, n) {{")
+        lines.extend(f'    print "work{f} line {p}: $name #$n"' for p in range(prints))
+        lines.append("}")
+    for c in range(calls):
+        lines.append(f'call work{c % functions}("user{c}", {c})')
+        if c % 100 == 0:
+            lines.append("msx help")
+            lines.append(f'print "checkpoint {c}"')
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("\n".join(lines) + "\n")
+    return path
+
+
+def make_ghost_config(path, bindings=50, binding_types=("double_click", "key_press")):
+    """Writes a ghost.command-fig.json with `bindings` log-only actions per binding type."""
+    data = {}
+    for binding_type in binding_types:
+        data[binding_type] = {f"{binding_type}{i}": f"open{i}.msx" for i in range(bindings)}
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2)
+    return path
+
+
+def make_extension_tree(root, files=2000, lines=60, dirty=1000, age=3600):
+    """
+    Writes an extension of `files` .msx files of `lines` lines each, spread
+    over sub-folders, with a blacklisted call in every `dirty`-th file. The
+    files and folders are backdated by `age` seconds so stat-based caches
+    trust them.
+    """
+    paths = []
+    for n in range(files):
+        folder = os.path.join(root, f"module{n // FILES_PER_DIR}")
+        os.makedirs(folder, exist_ok=True)
+        path = os.path.join(folder, f"file{n}.msx")
+        with open(path, "w", encoding="utf-8") as f:
+            for i in range(lines):
+                f.write(f'print "module file {n} line {i} with some ordinary content"\n')
+            if dirty and n % dirty == 0:
+                f.write('msx run subprocess("rm -rf /")\n')
+        paths.append(path)
+    if age:
+        old = time.time() - age
+        for path in paths:
+            os.utime(path, (old, old))
+        for folder in {os.path.dirname(path) for path in paths} | {root}:
+            os.utime(folder, (old, old))
+    return paths
+
+
+def make_mini_project(root, files=200, size=2000, age=3600):
+    """
+    Writes `files` .mini sources of about `size` bytes each for the
+    MiniInterpreter builders, backdated by `age` seconds so the build
+    manifests and compile index trust them and a rebuild takes the no-op
+    path.
+    """
+    os.makedirs(root, exist_ok=True)
+    line = "emit value + other_value * 3\n"
+    body = line * max(1, size // len(line))
+    paths = []
+    for n in range(files):
+        path = os.path.join(root, f"part{n}.mini")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(f"# part {n}\n{body}")
+        paths.append(path)
+    if age:
+        old = time.time() - age
+        for path in paths:
+            os.utime(path, (old, old))
+    return paths
+
+
+def make_command_script(path, commands=10000):
+    """Writes a MiniInterpreter command script cycling through setters and one unknown command."""
+    cycle = ["set_repeat true", "change_ton 5", "set_code_max 500", "enable_feature web true", "no_such_command"]
+    with open(path, "w", encoding="utf-8") as f:
+        for n in range(commands):
+            f.write(cycle[n % len(cycle)] + "\n")
+    return path
+
+
+def make_subscriptions(path, users=300000, expired=0, now=None):
+    """
+    Writes a subscription journal for `users` users (user0 ..), the first
+    `expired` of them already past their expiry and the rest active.
+    """
+    if now is None:
+        now = int(time.time())
+    with open(path, "w", encoding="utf-8") as f:
+        for n in range(users):
+            start = now - 48 * 3600 if n < expired else now
+            f.write(f"set user{n} 24 {start}\n")
+    return path
+
+
+def make_template(root, files=20, assets=5, asset_size=256 * 1024):
+    """Writes an extension template: `files` small source files over two folders plus `assets` binary files."""
+    for folder in ("src", "src/lib", "assets"):
+        os.makedirs(os.path.join(root, folder), exist_ok=True)
+    for n in range(files):
+        folder = "src" if n % 2 else "src/lib"
+        with open(os.path.join(root, folder, f"part{n}.msx"), "w", encoding="utf-8") as f:
+            f.write(f'function part{n}(name) {{\n    print "part {n} for $name"\n}}\n' * 20)
+    with open(os.path.join(root, "manifest.json"), "w", encoding="utf-8") as f:
+        f.write('{"name": "template", "version": "1.0.0"}\n')
+    for n in range(assets):
+        with open(os.path.join(root, "assets", f"image{n}.png"), "wb") as f:
+            f.write(os.urandom(asset_size))
+    return root
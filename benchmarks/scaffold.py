@@ -0,0 +1,62 @@
+# scaffold.py - times bulk extension creation against shutil.copytree
+#
+# Builds a template (small sources plus a few binary assets) and creates
+# --count extensions from it three ways: copytree per extension (what
+# create_extension does), create_extensions on one thread, and
+# create_extensions on a thread pool.
+#
+#   python -m benchmarks.scaffold [--count N] [--jobs N]
+import os
+import sys
+import time
+import shutil
+import tempfile
+import contextlib
+
+from msx.extension import create_extensions, extension_names
+from .generators import make_template
+
+
+def option(name, default):
+    if name in sys.argv:
+        return int(sys.argv[sys.argv.index(name) + 1])
+    return default
+
+
+def timed(label, func):
+    start = time.perf_counter()
+    func()
+    elapsed = time.perf_counter() - start
+    print(f"  {label:<36} {elapsed:>8.2f} s")
+    return elapsed
+
+
+def main():
+    count = option("--count", 1000)
+    jobs = option("--jobs", 0) or None
+    with tempfile.TemporaryDirectory() as workdir:
+        template = make_template(os.path.join(workdir, "template"))
+        os.chdir(workdir)
+        names = extension_names("ext", count)
+        files = sum(len(found) for _, _, found in os.walk(template))
+        print(f"{count} extensions from a {files}-file template:")
+
+        def copytree_all():
+            for name in names:
+                shutil.copytree(template, os.path.join("copytree", name))
+
+        def bulk(folder, jobs):
+            with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+                create_extensions([os.path.join(folder, name) for name in names], template, jobs)
+
+        os.makedirs("copytree")
+        os.makedirs("serial")
+        os.makedirs("pool")
+        base = timed("shutil.copytree", copytree_all)
+        serial = timed("create_extensions, 1 thread", lambda: bulk("serial", 1))
+        pool = timed(f"create_extensions, {jobs or 'default'} threads", lambda: bulk("pool", jobs))
+        print(f"  speedup: {base / serial:.1f}x (1 thread), {base / pool:.1f}x (pool)")
+
+
+if __name__ == "__main__":
+    main()
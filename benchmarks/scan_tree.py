@@ -0,0 +1,91 @@
+# scan_tree.py - times the extension scanner on a generated tree
+#
+# Builds an extension with --files files (spread over sub-folders, one in
+# every --dirty of them containing a blacklisted call) and times the old
+# per-line x per-pattern scan against PatternScanner, serially and with a
+# process pool, then re-scans with a warm ScanCache after editing one file.
+#
+#   python -m benchmarks.scan_tree [--files N] [--lines N] [--dirty N] [--jobs N] [--runs N]
+import os
+import sys
+import time
+import tempfile
+
+from msx.scanner import PatternScanner, ScanCache, iter_extension_files
+from msx.signer import BLACKLISTED_PATTERNS, SCANNED_EXTENSIONS
+from .generators import make_extension_tree
+
+
+def option(name, default):
+    if name in sys.argv:
+        return int(sys.argv[sys.argv.index(name) + 1])
+    return default
+
+
+def line_scan(root):
+    """The scan sign_extension used to do: every pattern against every line."""
+    findings = 0
+    for path in iter_extension_files(root, SCANNED_EXTENSIONS):
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                for pattern in BLACKLISTED_PATTERNS:
+                    if pattern in line:
+                        findings += 1
+    return findings
+
+
+def pattern_scan(root, jobs, cache_path=None):
+    scanner = PatternScanner(BLACKLISTED_PATTERNS)
+    cache = ScanCache(root, BLACKLISTED_PATTERNS, cache_path) if cache_path else None
+    paths = iter_extension_files(root, SCANNED_EXTENSIONS)
+    findings = sum(len(findings) for _, findings, _ in scanner.scan_files(paths, jobs, cache))
+    if cache:
+        cache.save()
+    return findings
+
+
+def edit_and_scan(root, jobs, cache_path):
+    with open(os.path.join(root, "module0", "file1.msx"), "a", encoding="utf-8") as f:
+        f.write('print "one more line"\n')
+    return pattern_scan(root, jobs, cache_path)
+
+
+def best_of(runs, func, *args):
+    best = None
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = func(*args)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def main():
+    files = option("--files", 20000)
+    lines = option("--lines", 60)
+    dirty = option("--dirty", 1000)
+    jobs = option("--jobs", os.cpu_count() or 1)
+    runs = option("--runs", 3)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        make_extension_tree(tmp, files, lines, dirty)
+        print(f"{files} files x {lines} lines, {len(BLACKLISTED_PATTERNS)} patterns")
+        cases = [
+            ("per-line scan", line_scan, tmp),
+            ("PatternScanner, 1 job", pattern_scan, tmp, 1),
+        ]
+        if jobs > 1:
+            cases.append((f"PatternScanner, {jobs} jobs", pattern_scan, tmp, jobs))
+        cache_path = os.path.join(tmp, "bench.msxscan")
+        cases += [
+            ("cold cache", pattern_scan, tmp, 1, cache_path),
+            ("warm cache, 1 file edited", edit_and_scan, tmp, 1, cache_path),
+        ]
+        for name, func, *args in cases:
+            runs_for_case = 1 if name == "cold cache" else runs
+            elapsed, findings = best_of(runs_for_case, func, *args)
+            print(f"{name:<26} {elapsed:7.3f} s  {findings} findings")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+# check_startup.py - fails when CLI start-up imports go over budget
+#
+# Runs each command under `python -X importtime`, adds up the time spent
+# importing modules and subtracts what a bare `python -c pass` imports, so
+# only the imports our own code triggers count against the budget.
+#
+#   python check_startup.py [--runs N]
+import os
+import sys
+import tempfile
+import subprocess
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+# name -> (python arguments, import budget in milliseconds)
+BUDGETS = {
+    "msx --help": (["msx.py", "--help"], 5),
+    "msx run": (["msx.py", "run", "{script}"], 35),
+    "msx inline": (["msx.py", "msx help"], 35),
+    "msx.cli --help": (["-m", "msx.cli", "--help"], 25),
+}
+
+
+def import_times(args, env):
+    """Returns (total import time in ms, {top-level module: cumulative ms})."""
+    result = subprocess.run([sys.executable, "-X", "importtime"] + args, cwd=ROOT, env=env,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    total = 0
+    top_level = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        total += int(self_us)
+        if not name.startswith("  "):
+            top_level[name.strip()] = int(cumulative_us) / 1000
+    return total / 1000, top_level
+
+
+def best_of(runs, args, env):
+    samples = [import_times(args, env) for _ in range(runs)]
+    return min(samples, key=lambda sample: sample[0])
+
+
+def main():
+    runs = 5
+    if "--runs" in sys.argv:
+        runs = int(sys.argv[sys.argv.index("--runs") + 1])
+
+    with tempfile.TemporaryDirectory() as tmp:
+        script = os.path.join(tmp, "startup.msx")
+        with open(script, "w", encoding="utf-8") as f:
+            f.write('print "ok"\n')
+        env = dict(os.environ)
+        # Always measure the in-process path, never a running daemon
+        env["MSX_DAEMON_SOCKET"] = os.path.join(tmp, "no-daemon.sock")
+        env["MSX_CACHE_DIR"] = tmp
+
+        baseline, baseline_modules = best_of(runs, ["-c", "pass"], env)
+        failed = False
+        for name, (args, budget) in BUDGETS.items():
+            args = [a.format(script=script) for a in args]
+            total, modules = best_of(runs, args, env)
+            spent = total - baseline
+            status = "ok" if spent <= budget else "OVER BUDGET"
+            print(f"{name:<16} {spent:7.1f} ms  (budget {budget} ms)  {status}")
+            if spent > budget:
+                failed = True
+                extra = {m: t for m, t in modules.items() if m not in baseline_modules}
+                for module, cumulative in sorted(extra.items(), key=lambda item: -item[1])[:5]:
+                    print(f"    {cumulative:7.1f} ms  {module}")
+
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1 @@
+# conftest.py - lets pytest import the top-level modules when run from the repo root
@@ -1,7 +1,46 @@
 # mini_interpreter.py
 import os
+import sys
 import json
+import time
 import shutil
+import hashlib
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor
+
+from msx_storage import atomic_write, RACY_WINDOW_NS
+from msx_output import BufferedSink, emit, use_sink
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+# "text" prints [TAG] lines, "quiet" only errors, "json" one JSON object per line
+OUTPUT_FORMATS = ("text", "quiet", "json")
+# error_log keeps the most recent errors; error_counts counts all of them
+ERROR_LOG_SIZE = 1000
+
+# Compiled artifacts: .minicache/<source digest>-<mode>.minic, plus
+# index.json, the {path: [size, mtime_ns, digest]} of the sources compiled
+COMPILE_CACHE_DIR = ".minicache"
+COMPILE_INDEX = "index.json"
+# Bump when compile output changes so old artifacts are not reused
+COMPILER_VERSION = 1
+# Below this many files a process pool costs more than it saves
+PARALLEL_THRESHOLD = 64
+
+# Build manifest kept inside each <name>_local folder: {name: artifact name}
+LOCAL_MANIFEST = ".mini-manifest.json"
+# Web builds write <name>.minitron plus <name>.minitron.index.json:
+# {"files": {name: [offset, length]}, "sources": {name: artifact name}, ...}
+WEB_INDEX_SUFFIX = ".index.json"
+# Most bytes moved per copy call, so no buffer grows with the file
+COPY_CHUNK = 1024 * 1024
+# Below this a read and a write cost less than setting up a kernel copy
+SMALL_FILE = 64 * 1024
+# ioctl(FICLONE): share the source's blocks on btrfs/XFS/overlay (reflink)
+FICLONE = 0x40049409
 
 class MiniInterpreter:
     def __init__(self):
@@ -14,7 +53,12 @@ class MiniInterpreter:
         self.exe_enabled = False
         self.web_enabled = False
         self.code_size_range = (55, 1000)
-        self.error_log = []
+        self.output_format = "text"
+        self.error_log = deque(maxlen=ERROR_LOG_SIZE)
+        self.error_counts = Counter()
+        # command name -> (bound method, argument converters)
+        self._commands = {name: (getattr(self, method), converters)
+                          for name, (method, converters) in COMMANDS.items()}
 
     # ----------------------
     # Mode selection
@@ -26,7 +70,7 @@ class MiniInterpreter:
             self.mode = "web"
         else:
             self._log_error(102, "Invalid mode")
-        print(f"[INFO] Mode set to {self.mode}")
+        self._report("INFO", f"Mode set to {self.mode}")
 
     # ----------------------
     # File commands
@@ -37,71 +81,196 @@ class MiniInterpreter:
             return None
         with open(file_path, "r") as f:
             content = f.read()
-        print(f"[INFO] Read file: {file_path}")
+        self._report("INFO", f"Read file: {file_path}")
         return content
 
     def execute_file(self, file_path):
         content = self.read_file(file_path)
         if content is None:
             return
-        print(f"[EXECUTE] Running {file_path}...\n{content}")
+        self._report("EXECUTE", f"Running {file_path}...\n{content}")
 
+    # ----------------------
+    # Compile
+    # ----------------------
     def compile_file(self, file_path):
-        print(f"[COMPILE] Compiling {file_path} for mode: {self.mode}")
-        # In a real implementation, compile logic goes here
+        artifact = self.compile_files([file_path], jobs=1).get(file_path)
+        if artifact:
+            self._report("COMPILE", f"Compiled {file_path} for mode: {self.mode} -> {artifact}")
+        return artifact
+
+    def compile_all(self, jobs=None):
+        # Every .mini file here; artifacts no current source refers to are removed
+        paths = sorted(entry.name for entry in os.scandir(".")
+                       if entry.name.endswith(".mini") and entry.is_file())
+        return self.compile_files(paths, jobs, prune=True)
+
+    def compile_files(self, paths, jobs=None, prune=False):
+        # Returns {path: artifact path} for the files that compiled. A source
+        # whose size and mtime match the index is not read, and one whose
+        # digest already has an artifact for this mode is not compiled again.
+        # The size limits are checked from the file's metadata before reading.
+        os.makedirs(COMPILE_CACHE_DIR, exist_ok=True)
+        index_path = os.path.join(COMPILE_CACHE_DIR, COMPILE_INDEX)
+        index, written_ns = _load_manifest(index_path)
+        artifacts = set(os.listdir(COMPILE_CACHE_DIR))
+        low, high = self.code_size_range
+        high = min(high, self.code_max)
+
+        results = {}
+        updated = dict(index)
+        tasks = []
+        for path in paths:
+            try:
+                st = os.stat(path)
+            except OSError:
+                self._log_error(101, f"File {path} not found")
+                continue
+            if st.st_size < low:
+                self._log_error(105, f"{path} is {st.st_size} bytes, below the minimum of {low}")
+                continue
+            if st.st_size > high:
+                self._log_error(106, f"{path} is {st.st_size} bytes, above the maximum of {high}")
+                continue
+            known = index.get(path)
+            if (known and known[0] == st.st_size and known[1] == st.st_mtime_ns
+                    and known[1] < written_ns - RACY_WINDOW_NS):
+                name = _artifact_name(known[2], self.mode)
+                if name in artifacts:
+                    results[path] = os.path.join(COMPILE_CACHE_DIR, name)
+                    continue
+            tasks.append((path, self.mode))
+
+        compiled = 0
+        for path, entry, name, compiled_now, error in _run_compile(tasks, jobs):
+            if error:
+                updated.pop(path, None)
+                self._log_error(107, f"Could not compile {path}: {error}")
+                continue
+            updated[path] = entry
+            results[path] = os.path.join(COMPILE_CACHE_DIR, name)
+            compiled += compiled_now
+
+        if prune:
+            updated = {path: entry for path, entry in updated.items() if path in results}
+            live = {_artifact_name(entry[2], mode) for entry in updated.values() for mode in ("local", "web")}
+            for name in artifacts - live - {COMPILE_INDEX}:
+                if name.endswith(".minic"):
+                    os.remove(os.path.join(COMPILE_CACHE_DIR, name))
+        if updated != index:
+            _save_manifest(index_path, updated)
+        cached = len(results) - compiled
+        self._report("COMPILE", f"{compiled} compiled, {cached} cached, {len(paths) - len(results)} failed (mode: {self.mode})")
+        return results
 
     # ----------------------
     # Build / Package
     # ----------------------
-    def build(self, output_name):
+    def build(self, output_name, jobs=None):
+        # Builds package the compiled artifacts, so the size limits and the
+        # compile cache apply; sources that fail to compile are left out
+        artifacts = self.compile_all(jobs)
         if self.mode == "local":
-            self._build_local(output_name)
+            self._build_local(output_name, artifacts)
         elif self.mode == "web":
-            self._build_web(output_name)
+            self._build_web(output_name, artifacts)
 
-    def _build_local(self, output_name):
+    def _build_local(self, output_name, artifacts):
+        # Incremental: artifact names are content digests, so an output is
+        # current when the manifest names the same artifact for it. Changed
+        # ones are cloned from .minicache and outputs whose source is gone
+        # (or no longer compiles) are removed.
         folder_name = output_name + "_local"
         if not os.path.exists(folder_name):
             os.makedirs(folder_name)
-        # Copy all .mini files to build folder
-        for file in os.listdir("."):
-            if file.endswith(".mini"):
-                shutil.copy(file, folder_name)
-        print(f"[BUILD] Local build completed: {folder_name}")
+        manifest_path = os.path.join(folder_name, LOCAL_MANIFEST)
+        old, _ = _load_manifest(manifest_path)
+        outputs = {entry.name for entry in os.scandir(folder_name) if entry.name.endswith(".mini")}
+
+        manifest = {}
+        copied = 0
+        for name, artifact_path in artifacts.items():
+            artifact = os.path.basename(artifact_path)
+            if not (old.get(name) == artifact and name in outputs):
+                _clone_file(artifact_path, os.path.join(folder_name, name))
+                copied += 1
+            manifest[name] = artifact
+
+        # Prune outputs whose source was deleted
+        removed = 0
+        for name in outputs - manifest.keys():
+            os.remove(os.path.join(folder_name, name))
+            removed += 1
 
-    def _build_web(self, output_name):
+        if manifest != old:
+            _save_manifest(manifest_path, manifest)
+        unchanged = len(manifest) - copied
+        self._report("BUILD", f"Local build completed: {folder_name} ({copied} copied, {removed} removed, {unchanged} unchanged)")
+
+    def _build_web(self, output_name, artifacts):
         file_name = output_name + ".minitron"
-        # Combine all .mini files into one for web
-        with open(file_name, "w") as outfile:
-            for file in os.listdir("."):
-                if file.endswith(".mini"):
-                    with open(file, "r") as f:
-                        outfile.write(f"# From {file}\n")
-                        outfile.write(f.read() + "\n\n")
-        print(f"[BUILD] Web build completed: {file_name}")
+        index_path = file_name + WEB_INDEX_SUFFIX
+        # Combine the compiled files into one for web, in name order so the
+        # bundle is the same wherever it is built
+        sources = {name: os.path.basename(path) for name, path in artifacts.items()}
+        index = _load_web_index(index_path)
+        if index and _web_build_current(file_name, index, sources):
+            self._report("BUILD", f"Web build up to date: {file_name}")
+            return
+
+        # Large files are streamed file to file by the kernel, never held
+        # whole in memory; the index records where each one sits in the bundle
+        ranges = {}
+        tmp_path = f"{file_name}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_path, "wb") as outfile:
+                offset = 0
+                for name in sorted(sources):
+                    header = f"# From {name}\n".encode("utf-8")
+                    outfile.write(header)
+                    offset += len(header)
+                    with open(artifacts[name], "rb") as f:
+                        st = os.fstat(f.fileno())
+                        if st.st_size <= SMALL_FILE:
+                            content = f.read(SMALL_FILE)
+                            outfile.write(content)
+                            length = len(content)
+                        else:
+                            outfile.flush()
+                            length = _stream_copy(f.fileno(), outfile.fileno(), st.st_size)
+                    ranges[name] = [offset, length]
+                    outfile.write(b"\n\n")
+                    offset += length + 2
+            os.replace(tmp_path, file_name)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        _save_web_index(index_path, {"size": offset, "sources": sources, "files": ranges})
+        self._report("BUILD", f"Web build completed: {file_name}")
 
     # ----------------------
     # Settings
     # ----------------------
     def set_repeat(self, value: bool):
         self.repeat = value
-        print(f"[INFO] Repeat set to {self.repeat}")
+        self._report("INFO", f"Repeat set to {self.repeat}")
 
     def set_recombine(self, value: bool):
         self.recombine = value
-        print(f"[INFO] Recombine set to {self.recombine}")
+        self._report("INFO", f"Recombine set to {self.recombine}")
 
     def change_ton(self, value: int):
         self.ton = value
-        print(f"[INFO] Ton set to {self.ton}")
+        self._report("INFO", f"Ton set to {self.ton}")
 
     def set_code_max(self, value: int):
         self.code_max = value
-        print(f"[INFO] Max code size set to {self.code_max}")
+        self._report("INFO", f"Max code size set to {self.code_max}")
 
     def reset_code(self, value: int):
         self.code_max = value
-        print(f"[INFO] Code reset to {self.code_max}")
+        self._report("INFO", f"Code reset to {self.code_max}")
 
     def enable_feature(self, feature: str, value: bool):
         if feature == "react":
@@ -110,62 +279,305 @@ class MiniInterpreter:
             self.exe_enabled = value
         elif feature == "web":
             self.web_enabled = value
-        print(f"[INFO] Feature {feature} set to {value}")
+        self._report("INFO", f"Feature {feature} set to {value}")
 
     def set_code_range(self, min_val: int, max_val: int):
         self.code_size_range = (min_val, max_val)
-        print(f"[INFO] Code range set to {self.code_size_range}")
+        self._report("INFO", f"Code range set to {self.code_size_range}")
 
     # ----------------------
     # Error handling
     # ----------------------
     def _log_error(self, code, message):
         self.error_log.append({"code": code, "message": message})
-        print(f"[ERROR {code}] {message}")
+        self.error_counts[code] += 1
+        if self.output_format == "json":
+            emit(json.dumps({"level": "error", "code": code, "message": message}))
+        else:
+            emit(f"[ERROR {code}] {message}")
 
     def show_errors(self):
+        total = sum(self.error_counts.values())
+        if self.output_format == "json":
+            emit(json.dumps({"level": "errors", "total": total, "counts": dict(self.error_counts),
+                             "recent": list(self.error_log)}))
+            return
+        if total > len(self.error_log):
+            emit(f"({total - len(self.error_log)} older errors not kept)")
         for err in self.error_log:
-            print(f"Error {err['code']}: {err['message']}")
+            emit(f"Error {err['code']}: {err['message']}")
+        for code, count in sorted(self.error_counts.items()):
+            emit(f"Error {code}: {count} total")
+
+    # ----------------------
+    # Output
+    # ----------------------
+    def set_output_format(self, value: str):
+        if value not in OUTPUT_FORMATS:
+            self._log_error(104, f"Unknown output format: {value}")
+            return
+        self.output_format = value
+
+    def _report(self, tag, message):
+        if self.output_format == "text":
+            emit(f"[{tag}] {message}")
+        elif self.output_format == "json":
+            emit(json.dumps({"level": tag.lower(), "message": message}))
 
     # ----------------------
     # Interactive command loop
     # ----------------------
     def run_command(self, cmd_line):
-        parts = cmd_line.strip().split()
+        parts = cmd_line.split()
         if not parts:
             return
-        cmd = parts[0].lower()
+        entry = self._commands.get(parts[0].lower())
         args = parts[1:]
-        if cmd == "read" and args:
-            self.read_file(args[0])
-        elif cmd == "execute" and args:
-            self.execute_file(args[0])
-        elif cmd == "compile" and args:
-            self.compile_file(args[0])
-        elif cmd == "build" and args:
-            self.build(args[0])
-        elif cmd == "set_repeat" and args:
-            self.set_repeat(args[0].lower() == "true")
-        elif cmd == "set_recombine" and args:
-            self.set_recombine(args[0].lower() == "true")
-        elif cmd == "change_ton" and args:
-            self.change_ton(int(args[0]))
-        elif cmd == "set_code_max" and args:
-            self.set_code_max(int(args[0]))
-        elif cmd == "enable_feature" and len(args) == 2:
-            self.enable_feature(args[0], args[1].lower() == "true")
-        elif cmd == "show_errors":
-            self.show_errors()
+        if entry is None or len(args) < len(entry[1]):
+            self._log_error(102, f"Unknown command: {cmd_line.strip()}")
+            return
+        method, converters = entry
+        try:
+            if len(converters) == 1:
+                value = converters[0](args[0])
+            else:
+                values = [convert(arg) for convert, arg in zip(converters, args)]
+        except ValueError:
+            self._log_error(103, f"Invalid argument: {cmd_line.strip()}")
+            return
+        if len(converters) == 1:
+            method(value)
         else:
-            self._log_error(102, f"Unknown command: {cmd_line}")
+            method(*values)
+
+    # ----------------------
+    # Batch mode
+    # ----------------------
+    def run_batch(self, stream):
+        """
+        Runs every command read from `stream` (a text file object, read
+        line by line), skipping blank lines and # comments. Output is
+        buffered; returns (commands run, errors logged).
+        """
+        errors_before = sum(self.error_counts.values())
+        count = 0
+        run = self.run_command
+        with use_sink(BufferedSink()):
+            for line in stream:
+                line = line.strip()
+                if not line or line[0] == "#":
+                    continue
+                if len(line) == 4 and line.lower() == "exit":
+                    break
+                run(line)
+                count += 1
+        return count, sum(self.error_counts.values()) - errors_before
+
+    def run_script(self, path):
+        """Runs a command script; "-" reads standard input."""
+        if path == "-":
+            return self.run_batch(sys.stdin)
+        if not os.path.exists(path):
+            self._log_error(101, f"File {path} not found")
+            return 0, 1
+        with open(path, "r", encoding="utf-8") as f:
+            return self.run_batch(f)
+
+def _parse_bool(value):
+    return value.lower() == "true"
+
+# command -> (MiniInterpreter method, converters for its arguments); extra
+# arguments are ignored
+COMMANDS = {
+    "read": ("read_file", (str,)),
+    "execute": ("execute_file", (str,)),
+    "compile": ("compile_file", (str,)),
+    "compile_all": ("compile_all", ()),
+    "build": ("build", (str,)),
+    "set_repeat": ("set_repeat", (_parse_bool,)),
+    "set_recombine": ("set_recombine", (_parse_bool,)),
+    "change_ton": ("change_ton", (int,)),
+    "set_code_max": ("set_code_max", (int,)),
+    "enable_feature": ("enable_feature", (str, _parse_bool)),
+    "show_errors": ("show_errors", ()),
+    "output": ("set_output_format", (str,)),
+}
+
+# ----------------------
+# Compile helpers
+# ----------------------
+def compile_source(source, mode):
+    # Drops comments, blank lines and trailing whitespace. Both modes lower
+    # the same way for now; the mode is still part of the artifact name so
+    # each gets its own artifact once they differ.
+    lines = []
+    for line in source.splitlines():
+        line = line.rstrip()
+        if line and not line.lstrip().startswith("#"):
+            lines.append(line)
+    return "\n".join(lines) + "\n" if lines else ""
+
+def _artifact_name(digest, mode):
+    return f"{digest}-{mode}.minic"
+
+def _compile_one(task):
+    # (path, mode) -> (path, [size, mtime_ns, digest], artifact name, 1 if compiled, error)
+    path, mode = task
+    try:
+        with open(path, "rb") as f:
+            st = os.fstat(f.fileno())
+            data = f.read()
+        h = hashlib.blake2b(data, digest_size=16)
+        h.update(b"\0%d" % COMPILER_VERSION)
+        digest = h.hexdigest()
+        name = _artifact_name(digest, mode)
+        artifact_path = os.path.join(COMPILE_CACHE_DIR, name)
+        compiled = 0
+        if not os.path.exists(artifact_path):
+            output = compile_source(data.decode("utf-8"), mode)
+            # Renamed into place so a reader never sees half an artifact
+            tmp_path = f"{artifact_path}.{os.getpid()}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(output.encode("utf-8"))
+            os.replace(tmp_path, artifact_path)
+            compiled = 1
+        return path, [st.st_size, st.st_mtime_ns, digest], name, compiled, None
+    except (OSError, UnicodeDecodeError) as e:
+        return path, None, None, 0, e
+
+def _run_compile(tasks, jobs):
+    jobs = jobs or os.cpu_count() or 1
+    if jobs > 1 and len(tasks) >= PARALLEL_THRESHOLD:
+        chunksize = max(1, len(tasks) // (jobs * 8))
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            yield from pool.map(_compile_one, tasks, chunksize=chunksize)
+    else:
+        for task in tasks:
+            yield _compile_one(task)
+
+# ----------------------
+# Build helpers
+# ----------------------
+def _load_manifest(path):
+    # ({name: entry}, written_ns); empty if missing or unreadable
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        return dict(data["files"]), int(data["written_ns"])
+    except (OSError, ValueError, KeyError, TypeError):
+        return {}, 0
+
+def _save_manifest(path, files):
+    data = {"written_ns": time.time_ns(), "files": files}
+    atomic_write(path, json.dumps(data, sort_keys=True).encode("utf-8"))
+
+def _clone_file(src, dst):
+    # Reflink, else copy_file_range, else a plain copy. Copied next to dst
+    # and renamed over it: opening dst itself could truncate src if the two
+    # are hard-linked (as outputs of older builds could be)
+    tmp_path = f"{dst}.{os.getpid()}.tmp"
+    try:
+        with open(src, "rb") as fsrc, open(tmp_path, "wb") as fdst:
+            if not _reflink(fsrc, fdst):
+                _stream_copy(fsrc.fileno(), fdst.fileno(), os.fstat(fsrc.fileno()).st_size)
+        shutil.copymode(src, tmp_path)
+        os.replace(tmp_path, dst)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+def _reflink(fsrc, fdst):
+    if fcntl is None:
+        return False
+    try:
+        fcntl.ioctl(fdst.fileno(), FICLONE, fsrc.fileno())
+        return True
+    except OSError:
+        return False
+
+def _stream_copy(src_fd, dst_fd, count):
+    # Copies up to `count` bytes between the descriptors' current offsets,
+    # COPY_CHUNK at a time: copy_file_range, else sendfile, else read/write
+    # (whichever fails, the next carries on from where it stopped). Returns
+    # the bytes copied, which is less than `count` if the source shrank.
+    copied = 0
+    methods = (_copy_range_chunk, _sendfile_chunk) if count > SMALL_FILE else ()
+    for method in methods:
+        try:
+            while copied < count:
+                n = method(src_fd, dst_fd, min(COPY_CHUNK, count - copied))
+                if n == 0:
+                    return copied
+                copied += n
+            return copied
+        except (OSError, AttributeError):
+            continue
+    while copied < count:
+        data = os.read(src_fd, min(COPY_CHUNK, count - copied))
+        if not data:
+            break
+        _write_all(dst_fd, data)
+        copied += len(data)
+    return copied
+
+def _copy_range_chunk(src_fd, dst_fd, size):
+    return os.copy_file_range(src_fd, dst_fd, size)
+
+def _sendfile_chunk(src_fd, dst_fd, size):
+    return os.sendfile(dst_fd, src_fd, None, size)
+
+def _write_all(fd, data):
+    view = memoryview(data)
+    while view:
+        view = view[os.write(fd, view):]
+
+def _load_web_index(path):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        if all(key in data for key in ("sources", "files", "size", "written_ns")):
+            return data
+    except (OSError, ValueError, TypeError):
+        pass
+    return None
+
+def _save_web_index(path, index):
+    index["written_ns"] = time.time_ns()
+    atomic_write(path, json.dumps(index, sort_keys=True).encode("utf-8"))
+
+def _web_build_current(file_name, index, sources):
+    # The bundle is current if it was built from the same artifacts (whose
+    # names are content digests) and is intact
+    if index["sources"] != sources:
+        return False
+    try:
+        return os.path.getsize(file_name) == index["size"]
+    except OSError:
+        return False
 
 # ----------------------
 # Example usage / Interactive CLI
 # ----------------------
 if __name__ == "__main__":
+    # python mini_interpreter.py [--quiet | --json] [script.mini | -]
+    args = sys.argv[1:]
     mini = MiniInterpreter()
+    for flag, output_format in (("--quiet", "quiet"), ("--json", "json")):
+        if flag in args:
+            args.remove(flag)
+            mini.set_output_format(output_format)
     mini.choose_mode(".mini")
 
+    if args:
+        commands, errors = mini.run_script(args[0])
+        if mini.output_format == "json":
+            emit(json.dumps({"level": "summary", "commands": commands, "errors": errors,
+                             "counts": dict(mini.error_counts)}))
+        elif errors:
+            emit(f"[SUMMARY] {commands} commands, {errors} errors")
+        sys.exit(1 if errors else 0)
+
     print("Welcome to MiniInterpreter CLI. Type 'exit' to quit.")
     while True:
         cmd = input(".mini> ")
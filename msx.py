@@ -1,39 +1,150 @@
 #!/usr/bin/env python
 import sys
 import os
-import tempfile
-from runner import run_msx_file  # Make sure runner.py is in the same folder
+# Everything else, including the interpreter (runner.py, same folder), is
+# imported inside the branch that needs it: `msx --help` loads nothing and
+# forwarding to a running daemon never loads the interpreter.
+# check_startup.py enforces the import budget for these paths.
 
 def main():
-    if len(sys.argv) < 2:
+    if len(sys.argv) < 2 or sys.argv[1] in ("-h", "--help"):
         print("Usage:")
         print("  msx run <msx_file>     # Run an MSX script")
+        print("  msx run --no-cache <msx_file>  # Run without the .msxc cache")
+        print("  msx run --stream <msx_file>    # Execute while reading, for huge scripts")
+        print("  msx run --profile [--profile-out FILE] <msx_file>  # Time statements, functions and lines")
+        print("  msx compile <msx_file> # Precompile an MSX script to .msxc")
+        print("  msx daemon start|stop|status   # Keep a warm MSX process for faster commands")
         print("  msx <command>          # Run a single MSX command directly")
-        sys.exit(1)
+        print('  msx -e "<stmt>" -e "<stmt>"    # Run several inline statements at once')
+        sys.exit(0 if len(sys.argv) > 1 else 1)
 
     command_or_file = sys.argv[1]
 
     # If using "run", treat next argument as a file
     if command_or_file == "run":
-        if len(sys.argv) < 3:
-            print("Usage: msx run <msx_file>")
+        run_args = sys.argv[2:]
+        use_cache = "--no-cache" not in run_args
+        stream = True if "--stream" in run_args else None
+        profile_out = None
+        if "--profile-out" in run_args:
+            i = run_args.index("--profile-out")
+            profile_out = run_args[i + 1] if i + 1 < len(run_args) else None
+            run_args = run_args[:i] + run_args[i + 2:]
+            if profile_out is None:
+                print("Usage: msx run --profile-out <collapsed_stacks_file> <msx_file>")
+                sys.exit(1)
+        profile = "--profile" in run_args or profile_out is not None
+        run_args = [a for a in run_args if a not in ("--no-cache", "--stream", "--profile")]
+        if not run_args:
+            print("Usage: msx run [--no-cache] [--stream] [--profile] <msx_file>")
             sys.exit(1)
-        msx_file = sys.argv[2]
+        msx_file = run_args[0]
         if not os.path.exists(msx_file):
             print(f"Error: File not found: {msx_file}")
             sys.exit(1)
-        run_msx_file(msx_file)
+        if profile:
+            # Always in-process, so the numbers describe this run
+            run_profiled(msx_file, use_cache, stream, profile_out)
+            return
+        request = {"op": "run", "path": os.path.abspath(msx_file), "cwd": os.getcwd(),
+                   "use_cache": use_cache, "stream": stream}
+        from msx_daemon import send_request
+        if not send_request(request):
+            from runner import run_msx_file
+            buffer_piped_output()
+            run_msx_file(msx_file, use_cache=use_cache, stream=stream)
+        return
+
+    # Long-lived daemon that runs and inline commands are forwarded to
+    if command_or_file == "daemon":
+        from msx_daemon import MSXDaemon, daemon_running, stop_daemon, default_socket_path
+        action = sys.argv[2] if len(sys.argv) > 2 else "status"
+        if action == "start":
+            MSXDaemon().serve_forever()
+        elif action == "stop":
+            if stop_daemon():
+                print("MSX daemon stopped.")
+            else:
+                print("MSX daemon is not running.")
+        elif action == "status":
+            if daemon_running():
+                print(f"MSX daemon running on {default_socket_path()}")
+            else:
+                print("MSX daemon is not running.")
+        else:
+            print("Usage: msx daemon start|stop|status")
+            sys.exit(1)
+        return
+
+    # Precompile scripts so later runs load the .msxc directly
+    if command_or_file == "compile":
+        from msx_compiler import compile_file
+        if len(sys.argv) < 3:
+            print("Usage: msx compile <msx_file> [<msx_file> ...]")
+            sys.exit(1)
+        for msx_file in sys.argv[2:]:
+            if not os.path.exists(msx_file):
+                print(f"Error: File not found: {msx_file}")
+                sys.exit(1)
+            cache_path = compile_file(msx_file)
+            if cache_path:
+                print(f"Compiled {msx_file} -> {cache_path}")
+            else:
+                print(f"Error: Could not write compiled file for {msx_file}")
+                sys.exit(1)
+        return
+
+    # One or more inline statements in a single invocation: msx -e "..." -e "..."
+    if command_or_file == "-e":
+        statements = []
+        args = sys.argv[1:]
+        while args:
+            if args[0] != "-e" or len(args) < 2:
+                print('Usage: msx -e "<statement>" [-e "<statement>" ...]')
+                sys.exit(1)
+            statements.append(args[1])
+            args = args[2:]
+        run_inline("\n".join(statements) + "\n")
         return
 
     # Otherwise, treat it as a single command typed inline
-    temp_file = tempfile.NamedTemporaryFile("w+", suffix=".msx", delete=False)
-    try:
-        temp_file.write(command_or_file + "\n")
-        temp_file.flush()
-        temp_file.close()
-        run_msx_file(temp_file.name)
-    finally:
-        os.remove(temp_file.name)
+    run_inline(command_or_file + "\n")
+
+
+def run_inline(source):
+    """Runs inline MSX source on the daemon, or in-process from memory."""
+    from msx_daemon import send_request
+    if send_request({"op": "exec", "source": source, "cwd": os.getcwd()}):
+        return
+    from runner import run_msx_source
+    buffer_piped_output()
+    run_msx_source(source)
+
+
+def run_profiled(msx_file, use_cache, stream, profile_out):
+    from runner import run_msx_file
+    from msx_output import get_sink
+    from msx_profile import Profiler
+    buffer_piped_output()
+    profiler = Profiler(os.path.basename(msx_file))
+    run_msx_file(msx_file, use_cache=use_cache, stream=stream, profiler=profiler)
+    get_sink().flush()
+    if profile_out:
+        profiler.write_collapsed(profile_out)
+        print(f"Collapsed stacks written to {profile_out}", file=sys.stderr)
+    else:
+        profiler.print_table()
+
+
+def buffer_piped_output():
+    # Piped output (log collectors, CI) is written in large chunks
+    if not sys.stdout.isatty():
+        import atexit
+        from msx_output import BufferedSink, set_sink
+        sink = BufferedSink()
+        set_sink(sink)
+        atexit.register(sink.flush)
 
 if __name__ == "__main__":
     main()
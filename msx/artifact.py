@@ -0,0 +1,169 @@
+# artifact.py - content-addressed build of an extension folder for publishing
+#
+# <extension>/.msxpub/
+#     manifest.json   {relative path: [size, mtime_ns, digest]} of the last build
+#     published.json  the manifest as of the last successful publish
+#     blobs/ab/cdef…  file contents, stored once per digest
+#
+# A build only hashes files whose size or mtime changed since the previous
+# one, and diffing it against published.json gives the files to stage.
+import os
+import json
+import time
+import hashlib
+
+from msx_storage import atomic_write, RACY_WINDOW_NS
+from msx_modules import MODULE_INDEX_NAME
+from msx_compiler import COMPILED_SUFFIX
+from mini_interpreter import COMPILE_CACHE_DIR
+from .scanner import SCAN_CACHE_NAME
+
+ARTIFACT_DIR = ".msxpub"
+MANIFEST_NAME = "manifest.json"
+PUBLISHED_NAME = "published.json"
+ARTIFACT_VERSION = 1
+# Never part of the artifact: MSX's own state and build caches
+IGNORED_NAMES = {".git", ARTIFACT_DIR, SCAN_CACHE_NAME, MODULE_INDEX_NAME, COMPILE_CACHE_DIR}
+IGNORED_SUFFIXES = (COMPILED_SUFFIX,)
+
+COPY_CHUNK = 1024 * 1024
+
+
+class Artifact:
+    """Manifest and blob store for the extension folder at `root`."""
+
+    def __init__(self, root):
+        self.root = root
+        self.dir = os.path.join(root, ARTIFACT_DIR)
+        self.blob_dir = os.path.join(self.dir, "blobs")
+        self._published = None
+
+    # ----------------------
+    # Manifests
+    # ----------------------
+    def build(self):
+        """
+        Returns the manifest for the folder as it is now, storing a blob for
+        every file whose content is new. Files whose size and mtime match
+        the previous build are not read.
+        """
+        previous, written_ns = self._load(MANIFEST_NAME)
+        manifest = {}
+        hashed = False
+        for rel, path in iter_artifact_files(self.root):
+            st = os.stat(path)
+            old = previous.get(rel)
+            if old and old[0] == st.st_size and old[1] == st.st_mtime_ns and old[1] < written_ns - RACY_WINDOW_NS:
+                manifest[rel] = old
+            else:
+                manifest[rel] = [st.st_size, st.st_mtime_ns, self._store(path)]
+                hashed = True
+        if hashed or len(manifest) != len(previous):
+            self._save(MANIFEST_NAME, manifest)
+        return manifest
+
+    def published(self):
+        if self._published is None:
+            self._published = self._load(PUBLISHED_NAME)[0]
+        return self._published
+
+    def diff(self, manifest):
+        """Returns (changed, removed): sorted relative paths that differ from the last publish."""
+        published = self.published()
+        changed = sorted(rel for rel, entry in manifest.items()
+                         if rel not in published or published[rel][2] != entry[2])
+        removed = sorted(rel for rel in published if rel not in manifest)
+        return changed, removed
+
+    def mark_published(self, manifest):
+        """Records `manifest` as published and drops blobs nothing refers to any more."""
+        self._save(PUBLISHED_NAME, manifest)
+        self._published = manifest
+        self.collect_garbage()
+
+    def collect_garbage(self):
+        """
+        Removes every blob that neither the last build's manifest nor the
+        published one refers to, including blobs of builds that were never
+        published. Returns the number removed.
+        """
+        live = {entry[2] for entry in self._load(MANIFEST_NAME)[0].values()}
+        live.update(entry[2] for entry in self.published().values())
+        removed = 0
+        try:
+            folders = [entry for entry in os.scandir(self.blob_dir) if entry.is_dir()]
+        except FileNotFoundError:
+            return 0
+        for folder in folders:
+            with os.scandir(folder.path) as it:
+                for blob in it:
+                    if folder.name + blob.name not in live:
+                        try:
+                            os.remove(blob.path)
+                            removed += 1
+                        except OSError:
+                            pass
+            try:
+                os.rmdir(folder.path)  # only succeeds once the folder is empty
+            except OSError:
+                pass
+        return removed
+
+    def _load(self, name):
+        try:
+            with open(os.path.join(self.dir, name), "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if data["version"] != ARTIFACT_VERSION:
+                return {}, 0
+            return dict(data["files"]), int(data["written_ns"])
+        except (OSError, ValueError, KeyError, TypeError):
+            return {}, 0
+
+    def _save(self, name, manifest):
+        os.makedirs(self.dir, exist_ok=True)
+        data = {"version": ARTIFACT_VERSION, "written_ns": time.time_ns(), "files": manifest}
+        atomic_write(os.path.join(self.dir, name), json.dumps(data, sort_keys=True).encode("utf-8"))
+
+    # ----------------------
+    # Blobs
+    # ----------------------
+    def blob_path(self, digest):
+        return os.path.join(self.blob_dir, digest[:2], digest[2:])
+
+    def has_blob(self, digest):
+        return os.path.exists(self.blob_path(digest))
+
+    def _store(self, path):
+        """Copies `path` into the blob store (once per distinct content); returns its digest."""
+        os.makedirs(self.blob_dir, exist_ok=True)
+        tmp_path = os.path.join(self.blob_dir, f"incoming.{os.getpid()}.tmp")
+        h = hashlib.blake2b(digest_size=16)
+        try:
+            with open(path, "rb") as src, open(tmp_path, "wb") as dst:
+                for chunk in iter(lambda: src.read(COPY_CHUNK), b""):
+                    h.update(chunk)
+                    dst.write(chunk)
+            digest = h.hexdigest()
+            blob_path = self.blob_path(digest)
+            if os.path.exists(blob_path):
+                os.remove(tmp_path)
+            else:
+                os.makedirs(os.path.dirname(blob_path), exist_ok=True)
+                os.replace(tmp_path, blob_path)
+            return digest
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+
+def iter_artifact_files(root):
+    """Yields (relative path with / separators, path) for every file that goes into the artifact."""
+    for dirpath, dirs, files in os.walk(root):
+        dirs[:] = [d for d in dirs if d not in IGNORED_NAMES]
+        rel_dir = os.path.relpath(dirpath, root)
+        for file in files:
+            if file in IGNORED_NAMES or file.endswith(IGNORED_SUFFIXES):
+                continue
+            rel = file if rel_dir == "." else os.path.join(rel_dir, file)
+            yield rel.replace(os.sep, "/"), os.path.join(dirpath, file)
@@ -1,8 +1,19 @@
 # cli.py
 import argparse
-from .extension import create_extension
-from .tester import test_extension
-from .signer import sign_extension
+import importlib
+
+# Subcommand -> (module, handler). Handlers are imported only when their
+# subcommand runs, so `--help` and each command load just what they need.
+COMMANDS = {
+    "create-extension": (".extension", "create_extension"),
+    "test-extension": (".tester", "test_extension"),
+    "sign-extension": (".signer", "sign_extension"),
+}
+
+def resolve_command(command):
+    module_name, handler_name = COMMANDS[command]
+    module = importlib.import_module(module_name, __package__)
+    return getattr(module, handler_name)
 
 def main():
     parser = argparse.ArgumentParser(description=".msx CLI")
@@ -10,11 +21,17 @@ def main():
 
     # create-extension command
     parser_create = subparsers.add_parser("create-extension")
-    parser_create.add_argument("name", help="Extension name")
+    parser_create.add_argument("name", nargs="?", help="Extension name (the prefix with --count)")
+    parser_create.add_argument("--count", type=int, help="Create N extensions named NAME-1 .. NAME-N")
+    parser_create.add_argument("--from-list", help="Create one extension per name listed in FILE")
+    parser_create.add_argument("--jobs", "-j", type=int, help="Create extensions on N threads")
 
     # test-extension command
     parser_test = subparsers.add_parser("test-extension")
     parser_test.add_argument("path", help="Path to extension folder")
+    parser_test.add_argument("--watch", action="store_true", help="Rerun changed scripts until interrupted")
+    parser_test.add_argument("--jobs", "-j", type=int, help="Run scripts in N isolated worker processes")
+    parser_test.add_argument("--report", help="Write per-script results to FILE (.xml for JUnit, otherwise JSON)")
 
     # sign-extension command
     parser_sign = subparsers.add_parser("sign-extension")
@@ -22,12 +39,25 @@ def main():
 
     args = parser.parse_args()
 
-    if args.command == "create-extension":
-        create_extension(args.name)
+    if args.command == "create-extension" and (args.count is not None or args.from_list):
+        from .extension import extension_names, create_extensions
+        try:
+            names = extension_names(args.name, args.count, args.from_list)
+        except ValueError as e:
+            print(f"Error: {e}")
+            raise SystemExit(1)
+        failed = create_extensions(names, jobs=args.jobs)
+        if failed:
+            raise SystemExit(1)
+    elif args.command == "create-extension":
+        if not args.name:
+            parser_create.error("a name, --count or --from-list is required")
+        resolve_command(args.command)(args.name)
     elif args.command == "test-extension":
-        test_extension(args.path)
+        if not resolve_command(args.command)(args.path, watch=args.watch, jobs=args.jobs, report=args.report):
+            raise SystemExit(1)
     elif args.command == "sign-extension":
-        sign_extension(args.path)
+        resolve_command(args.command)(args.path)
     else:
         parser.print_help()
 
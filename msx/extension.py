@@ -1,9 +1,21 @@
 # extension.py
 import os
+import time
 import shutil
+from concurrent.futures import ThreadPoolExecutor
 
 TEMPLATE_DIR = os.path.join(os.path.dirname(__file__), "template")
 
+# Bulk creation hard-links only these binary assets to the template; every
+# other file gets its own copy, since editing a linked file would change
+# the template and every extension made from it
+LINKABLE_SUFFIXES = (".png", ".jpg", ".jpeg", ".gif", ".webp", ".bmp", ".ico",
+                     ".woff", ".woff2", ".ttf", ".otf", ".mp3", ".wav", ".ogg", ".mp4", ".webm",
+                     ".zip", ".gz", ".tgz", ".wasm")
+# Template files up to this size are held in memory and written out directly
+INLINE_SIZE = 64 * 1024
+COPY_CHUNK = 1024 * 1024
+
 def create_extension(name):
     # Check if the extension folder already exists
     if os.path.exists(name):
@@ -19,3 +31,153 @@ def create_extension(name):
     shutil.copytree(TEMPLATE_DIR, name)
     print(f"Extension '{name}' created successfully at: {os.path.abspath(name)}")
     print("You can now edit the files and add your MSX code.")
+
+
+# ===============================
+# Bulk creation
+# ===============================
+class TemplateIndex:
+    """
+    The template read once: its folders, and for each file its mode and
+    either its contents (small files) or its path, plus whether it may be
+    hard-linked rather than copied.
+    """
+
+    def __init__(self, template=TEMPLATE_DIR):
+        self.template = template
+        self.dirs = []
+        self.files = []  # (relative path, source path, mode, contents or None, linkable)
+        for dirpath, dirs, files in os.walk(template):
+            dirs.sort()
+            rel_dir = os.path.relpath(dirpath, template)
+            for d in dirs:
+                self.dirs.append(os.path.normpath(os.path.join(rel_dir, d)))
+            for file in sorted(files):
+                path = os.path.join(dirpath, file)
+                st = os.stat(path)
+                contents = None
+                if st.st_size <= INLINE_SIZE:
+                    with open(path, "rb") as f:
+                        contents = f.read()
+                linkable = file.lower().endswith(LINKABLE_SUFFIXES)
+                rel = os.path.normpath(os.path.join(rel_dir, file))
+                self.files.append((rel, path, st.st_mode & 0o7777, contents, linkable))
+
+    def materialise(self, name, link=True):
+        """Creates the extension folder `name` from the template; raises OSError on failure."""
+        os.mkdir(name)
+        try:
+            self._populate(name, link)
+        except BaseException:
+            # Never leave a half-made extension behind
+            shutil.rmtree(name, ignore_errors=True)
+            raise
+
+    def _populate(self, name, link):
+        for rel in self.dirs:
+            os.mkdir(os.path.join(name, rel))
+        for rel, path, mode, contents, linkable in self.files:
+            dst = os.path.join(name, rel)
+            if link and linkable:
+                try:
+                    os.link(path, dst)
+                    continue
+                except OSError:
+                    pass  # other filesystem, or links not supported: copy
+            if contents is not None:
+                fd = os.open(dst, os.O_WRONLY | os.O_CREAT | os.O_EXCL, mode)
+                try:
+                    view = memoryview(contents)
+                    while view:
+                        view = view[os.write(fd, view):]
+                finally:
+                    os.close(fd)
+            else:
+                _copy_file(path, dst)
+            os.chmod(dst, mode)
+
+
+def _copy_file(src, dst):
+    # copy_file_range keeps the data in the kernel (and lets filesystems
+    # that support it share blocks); shutil is the fallback
+    with open(src, "rb") as fsrc, open(dst, "xb") as fdst:
+        if hasattr(os, "copy_file_range"):
+            try:
+                while os.copy_file_range(fsrc.fileno(), fdst.fileno(), COPY_CHUNK):
+                    pass
+                return
+            except OSError:
+                fsrc.seek(0)
+                fdst.seek(0)
+                fdst.truncate()
+        shutil.copyfileobj(fsrc, fdst, COPY_CHUNK)
+
+
+def extension_names(name=None, count=None, from_list=None):
+    """
+    Returns the folders to create: `name`, `count` numbered ones based on
+    it, and/or those listed in a file (blank lines and # comments skipped).
+    Raises ValueError for a count below 1 or a name that is not a plain
+    folder name.
+    """
+    names = []
+    if count is not None:
+        if count < 1:
+            raise ValueError(f"--count must be at least 1 (got {count})")
+        base = name or "extension"
+        width = len(str(count))
+        names.extend(f"{base}-{n:0{width}d}" for n in range(1, count + 1))
+    elif name:
+        names.append(name)
+    if from_list:
+        with open(from_list, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if line and not line.startswith("#"):
+                    names.append(line)
+    for name in names:
+        if not is_plain_name(name):
+            raise ValueError(f"'{name}' is not a plain folder name")
+    return names
+
+
+def is_plain_name(name):
+    """True if `name` names a folder in the current one: no separators, not absolute, not "." or ".."."""
+    return (name not in ("", ".", "..") and "/" not in name and "\\" not in name
+            and not os.path.isabs(name) and not os.path.splitdrive(name)[0])
+
+
+def create_extensions(names, template=TEMPLATE_DIR, jobs=None, link=True):
+    """
+    Creates every extension in `names` from `template`, which is indexed
+    once, on a pool of `jobs` threads. Returns {name: error} for the ones
+    that failed.
+    """
+    if not os.path.exists(template):
+        print(f"Error: Template folder '{template}' does not exist!")
+        return {name: "no template" for name in names}
+    start = time.perf_counter()
+    index = TemplateIndex(template)
+
+    def create(name):
+        if os.path.exists(name):
+            return name, "folder already exists"
+        try:
+            index.materialise(name, link)
+            return name, None
+        except OSError as e:
+            return name, str(e)
+
+    jobs = jobs or min(32, (os.cpu_count() or 1) * 4)
+    if jobs > 1 and len(names) > 1:
+        with ThreadPoolExecutor(max_workers=jobs) as pool:
+            results = list(pool.map(create, names))
+    else:
+        results = [create(name) for name in names]
+
+    failed = {name: error for name, error in results if error}
+    for name, error in failed.items():
+        print(f"Error: Could not create '{name}': {error}")
+    elapsed = time.perf_counter() - start
+    print(f"Created {len(names) - len(failed)} of {len(names)} extensions in {elapsed:.2f}s")
+    return failed
@@ -0,0 +1,291 @@
+# scanner.py - single-pass multi-pattern scanner for extension files
+import os
+import json
+import mmap
+import time
+import hashlib
+from concurrent.futures import ProcessPoolExecutor
+
+from msx_storage import atomic_write, RACY_WINDOW_NS
+
+# Files at least this big are mapped instead of read into memory
+MMAP_THRESHOLD = 1024 * 1024
+# Read size when a large file cannot be mapped
+CHUNK_SIZE = 1024 * 1024
+# Below this many files a process pool costs more than it saves
+PARALLEL_THRESHOLD = 64
+
+# Scan caches go here when set, instead of the user's cache folder. They
+# are never kept inside the extension, whose author could forge one.
+CACHE_DIR_ENV = "MSX_CACHE_DIR"
+SCAN_CACHE_NAME = ".msxscan"
+SCAN_CACHE_VERSION = 3
+
+
+class PatternScanner:
+    """
+    Finds every occurrence of any of `patterns` (plain substrings) in a
+    file that is read (or mapped) once. Each pattern is searched for over
+    the whole buffer with bytes.find, which runs at memchr speed, instead
+    of testing every pattern against every line in Python; overlapping
+    patterns ("subprocess" / "subprocess.Popen") are all reported, and
+    line numbers are only worked out for the matches.
+    """
+
+    def __init__(self, patterns):
+        self.patterns = list(dict.fromkeys(patterns))
+        self._encoded = [p.encode("utf-8") for p in self.patterns]
+        self._overlap = max((len(p) for p in self._encoded), default=1) - 1
+
+    # ----------------------
+    # Single file
+    # ----------------------
+    def scan_file(self, path):
+        """Returns [(line number, pattern), ...] for every match in `path`, in file order."""
+        return self._scan_path(path)[0]
+
+    def _scan_path(self, path, hashing=False, clean_digest=None):
+        """
+        Returns (findings, stat, digest). The digest of the content is only
+        worked out when `hashing` is set; if it equals `clean_digest` the
+        file is known to be clean and is not scanned.
+        """
+        with open(path, "rb") as f:
+            st = os.fstat(f.fileno())
+            if st.st_size < MMAP_THRESHOLD:
+                return self._scan_buffer(f.read(), st, hashing, clean_digest)
+            try:
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                    return self._scan_buffer(mm, st, hashing, clean_digest)
+            except (OSError, ValueError):
+                f.seek(0)
+                if not hashing:
+                    return self._scan_chunks(f), st, None
+                digest = hashlib.blake2b(digest_size=16)
+                findings = self._scan_chunks(f, digest)
+                return findings, st, digest.hexdigest()
+
+    def _scan_buffer(self, data, st, hashing, clean_digest):
+        if not hashing:
+            return self.scan_bytes(data), st, None
+        digest = content_digest(data)
+        if digest == clean_digest:
+            return [], st, digest
+        return self.scan_bytes(data), st, digest
+
+    def scan_bytes(self, data, line=1, stop=None):
+        """
+        Scans a bytes-like object (bytes or mmap), `line` being the number
+        of its first line. Only matches starting before `stop` are
+        reported; chunked reads leave the rest for the next chunk.
+        """
+        if stop is None:
+            stop = len(data)
+        hits = []
+        for index, encoded in enumerate(self._encoded):
+            offset = data.find(encoded)
+            while offset != -1 and offset < stop:
+                hits.append((offset, index))
+                offset = data.find(encoded, offset + 1)
+        if not hits:
+            return []
+
+        hits.sort()
+        findings = []
+        last = 0
+        for offset, index in hits:
+            line += data[last:offset].count(b"\n")
+            last = offset
+            findings.append((line, self.patterns[index]))
+        return findings
+
+    def _scan_chunks(self, f, digest=None):
+        # Matches starting in the last `overlap` bytes of a chunk may run
+        # into the next one, so those bytes are carried over and scanned again
+        findings = []
+        tail = b""
+        line = 1
+        while True:
+            chunk = f.read(CHUNK_SIZE)
+            if not chunk:
+                findings.extend(self.scan_bytes(tail, line))
+                return findings
+            if digest:
+                digest.update(chunk)
+            data = tail + chunk
+            cut = len(data) - min(self._overlap, len(data))
+            findings.extend(self.scan_bytes(data, line, stop=cut))
+            line += data[:cut].count(b"\n")
+            tail = data[cut:]
+
+    # ----------------------
+    # Many files
+    # ----------------------
+    def scan_files(self, paths, jobs=None, cache=None):
+        """
+        Yields (path, findings, error) for each path, in the order given.
+        Large batches are spread over a process pool of `jobs` workers
+        (default: one per CPU); `error` is set when a file cannot be read.
+        With a ScanCache, files it vouches for from their stat alone are
+        yielded first without being opened; the rest are hashed, and those
+        whose content scanned clean before are not scanned again. The cache
+        is updated with the results (the caller saves it).
+        """
+        if cache is None:
+            tasks = [(path, False, None) for path in paths]
+        else:
+            tasks = []
+            for path in paths:
+                digest, trusted = cache.lookup(path)
+                if trusted:
+                    cache.keep(path)
+                    yield path, [], None
+                else:
+                    tasks.append((path, True, digest))
+        for path, findings, error, st, digest in self._run(tasks, jobs):
+            if cache is not None:
+                cache.record(path, st, digest, clean=not findings and error is None)
+            yield path, findings, error
+
+    def _run(self, tasks, jobs):
+        jobs = jobs or os.cpu_count() or 1
+        if jobs > 1 and len(tasks) >= PARALLEL_THRESHOLD:
+            chunksize = max(1, len(tasks) // (jobs * 8))
+            with ProcessPoolExecutor(max_workers=jobs) as pool:
+                yield from pool.map(self._scan_one, tasks, chunksize=chunksize)
+        else:
+            for task in tasks:
+                yield self._scan_one(task)
+
+    def _scan_one(self, task):
+        path, hashing, clean_digest = task
+        try:
+            findings, st, digest = self._scan_path(path, hashing, clean_digest)
+            return path, findings, None, st, digest
+        except OSError as e:
+            return path, [], e, None, None
+
+
+# ===============================
+# Scan cache
+# ===============================
+def content_digest(data):
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+def patterns_digest(patterns):
+    return content_digest("\0".join(sorted(set(patterns))).encode("utf-8"))
+
+
+def user_cache_dir():
+    """Returns the folder scan caches are kept in: MSX_CACHE_DIR, else the user's cache folder."""
+    cache_dir = os.environ.get(CACHE_DIR_ENV)
+    if cache_dir:
+        return cache_dir
+    base = os.environ.get("LOCALAPPDATA") if os.name == "nt" else os.environ.get("XDG_CACHE_HOME")
+    return os.path.join(base or os.path.join(os.path.expanduser("~"), ".cache"), "msx")
+
+
+def scan_cache_path(root):
+    """Returns where the scan cache for the extension at `root` is stored, keyed by its absolute path."""
+    key = hashlib.blake2b(os.path.abspath(root).encode("utf-8"), digest_size=12).hexdigest()
+    name = os.path.basename(os.path.normpath(os.path.abspath(root)))
+    return os.path.join(user_cache_dir(), f"{name}-{key}{SCAN_CACHE_NAME}")
+
+
+class ScanCache:
+    """
+    Remembers which files under `root` scanned clean against a pattern
+    set, as {relative path: [inode, size, mtime_ns, ctime_ns, digest]} in a
+    JSON file outside the extension. A file whose inode, size, mtime and
+    ctime all match, and which last changed well before the cache was
+    written, is trusted without being read: ctime cannot be set back with
+    utime(), so a rewrite always shows. Any other file is hashed, and only
+    scanned if its content hash changed. Files with findings are never
+    cached, so they are reported every run. The file records a hash of the
+    patterns, and a cache written for a different pattern set is ignored.
+    """
+
+    def __init__(self, root, patterns, path=None):
+        self.root = root
+        self._prefix = os.path.join(root, "")
+        self.path = path or scan_cache_path(root)
+        self.patterns_digest = patterns_digest(patterns)
+        self.entries = {}
+        self.written_ns = 0
+        self._seen = {}
+        self._load()
+
+    def _load(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if data["version"] != SCAN_CACHE_VERSION or data["patterns"] != self.patterns_digest:
+                return
+            self.entries = dict(data["files"])
+            self.written_ns = int(data["written_ns"])
+        except (OSError, ValueError, KeyError, TypeError):
+            pass
+
+    def _key(self, path):
+        if path.startswith(self._prefix):
+            return path[len(self._prefix):]
+        return os.path.relpath(path, self.root)
+
+    def lookup(self, path):
+        """
+        Returns (digest, trusted): the digest `path` had when it last
+        scanned clean, or None if it has to be scanned whatever its
+        content, and whether its stat alone shows it is unchanged.
+        """
+        entry = self.entries.get(self._key(path))
+        if entry is None:
+            return None, False
+        ino, size, mtime_ns, ctime_ns, digest = entry
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None, False
+        if st.st_size != size:
+            return None, False
+        trusted_before = self.written_ns - RACY_WINDOW_NS
+        trusted = (st.st_ino == ino and st.st_mtime_ns == mtime_ns and st.st_ctime_ns == ctime_ns
+                   and mtime_ns < trusted_before and ctime_ns < trusted_before)
+        return digest, trusted
+
+    def keep(self, path):
+        """Carries the entry of a file trusted by lookup() over to this run."""
+        key = self._key(path)
+        self._seen[key] = self.entries[key]
+
+    def record(self, path, st, digest, clean):
+        key = self._key(path)
+        if clean and st is not None and digest is not None:
+            self._seen[key] = [st.st_ino, st.st_size, st.st_mtime_ns, st.st_ctime_ns, digest]
+        else:
+            self._seen.pop(key, None)
+
+    def save(self):
+        """Writes the entries recorded this run; files not seen are dropped."""
+        data = {
+            "version": SCAN_CACHE_VERSION,
+            "patterns": self.patterns_digest,
+            "written_ns": time.time_ns(),
+            "files": self._seen,
+        }
+        try:
+            cache_dir = os.path.dirname(self.path)
+            if cache_dir:
+                os.makedirs(cache_dir, exist_ok=True)
+            atomic_write(self.path, json.dumps(data).encode("utf-8"))
+            return True
+        except OSError:
+            return False
+
+
+def iter_extension_files(root, extensions):
+    """Yields paths under `root` whose names end with one of `extensions`, in walk order."""
+    for dirpath, _, files in os.walk(root):
+        for file in files:
+            if file.endswith(extensions):
+                yield os.path.join(dirpath, file)
@@ -4,16 +4,37 @@ import json
 import secrets
 import string
 import shutil
+from .scanner import PatternScanner, ScanCache, iter_extension_files
 
 BLACKLISTED_PATTERNS = ["os.remove", "subprocess", "eval(", "exec(", "open("]
+SCANNED_EXTENSIONS = (".msx", ".py", ".js", ".json")
+
+_scanner = PatternScanner(BLACKLISTED_PATTERNS)
+
+def format_finding(filepath, line, pattern):
+    return f"Malicious pattern '{pattern}' found in {filepath} line {line}"
 
 def scan_file_for_malicious_code(filepath):
-    with open(filepath, "r", encoding="utf-8") as f:
-        for i, line in enumerate(f, start=1):
-            for pattern in BLACKLISTED_PATTERNS:
-                if pattern in line:
-                    return f"Malicious pattern '{pattern}' found in {filepath} line {i}"
-    return None
+    """Returns a message for every blacklisted pattern in the file (empty list if clean)."""
+    return [format_finding(filepath, line, pattern) for line, pattern in _scanner.scan_file(filepath)]
+
+def scan_extension(extension_path, jobs=None, use_cache=True):
+    """
+    Returns every finding message for the extension, scanning files in
+    parallel. Unless `use_cache` is False, files unchanged since they last
+    scanned clean are not opened, and files whose content is unchanged are
+    only hashed.
+    """
+    errors = []
+    cache = ScanCache(extension_path, BLACKLISTED_PATTERNS) if use_cache else None
+    paths = iter_extension_files(extension_path, SCANNED_EXTENSIONS)
+    for filepath, findings, error in _scanner.scan_files(paths, jobs, cache):
+        if error:
+            raise error
+        errors.extend(format_finding(filepath, line, pattern) for line, pattern in findings)
+    if cache is not None:
+        cache.save()
+    return errors
 
 def sign_extension(extension_path):
     if not os.path.exists(extension_path):
@@ -21,16 +42,13 @@ def sign_extension(extension_path):
         return
 
     # Scan all supported files
-    for root, _, files in os.walk(extension_path):
-        for file in files:
-            if file.endswith((".msx", ".py", ".js", ".json")):
-                filepath = os.path.join(root, file)
-                error = scan_file_for_malicious_code(filepath)
-                if error:
-                    print(f"Malicious code detected: {error}")
-                    print("Deleting extension for safety...")
-                    shutil.rmtree(extension_path)
-                    return
+    errors = scan_extension(extension_path)
+    if errors:
+        for error in errors:
+            print(f"Malicious code detected: {error}")
+        print("Deleting extension for safety...")
+        shutil.rmtree(extension_path)
+        return
 
     # Safe: generate API key and connection string
     api_key = "".join(secrets.choice(string.ascii_letters + string.digits) for _ in range(32))
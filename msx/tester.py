@@ -1,44 +1,211 @@
 # tester.py
 import os
+import json
 import time
-from ..runner import run_msx_file
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+import runner
+from runner import run_msx_file
+from msx_output import CaptureSink
+from .watcher import open_watcher
 
-def test_extension(path):
-    if not os.path.exists(path):
-        print(f"Error: Extension folder '{path}' does not exist.")
-        return
-
-    print(f"Testing extension: {path}")
-    
-    # Gather all .msx files in folder and subfolders
+def find_msx_files(path):
+    """Gathers all .msx files in folder and subfolders"""
     msx_files = []
     for root, _, files in os.walk(path):
         for file in files:
             if file.endswith(".msx"):
                 msx_files.append(os.path.join(root, file))
+    return msx_files
+
+def run_script(file):
+    """Runs one script in the current process; returns True if it ran to the end."""
+    try:
+        print(f"\nRunning: {file}")
+        if run_msx_file(file) is False:
+            print(f"Failed: {file}")
+            return False
+        return True
+    except Exception as e:
+        print(f"Error in {file}: {e}")
+        return False
+
+def failure_message(output):
+    """The last error line a failed script printed (the engine reports the error that stopped it last)."""
+    for line in reversed(output.splitlines()):
+        if line.startswith("Error"):
+            return line
+    return "script stopped on an error"
+
+# ===============================
+# Parallel runs (--jobs)
+# ===============================
+def run_isolated(file):
+    """
+    Runs one script in a fresh temporary working directory, so the state
+    files scripts write (subs.msx, ratings.msx, ...) never collide, and
+    returns its captured output, wall time and status: "passed", "failed"
+    when the script stopped on an error of its own, or "error" when the
+    interpreter raised.
+    """
+    sink = CaptureSink()
+    status = "passed"
+    error = None
+    cwd = os.getcwd()
+    start = time.perf_counter()
+    with tempfile.TemporaryDirectory(prefix="msx-test-") as workdir:
+        os.chdir(workdir)
+        try:
+            if run_msx_file(file, output=sink) is False:
+                status = "failed"
+        except Exception as e:
+            status = "error"
+            error = f"{type(e).__name__}: {e}"
+        finally:
+            os.chdir(cwd)
+    output = sink.getvalue()
+    if status == "failed":
+        error = failure_message(output)
+    return {
+        "file": file,
+        "seconds": time.perf_counter() - start,
+        "status": status,
+        "error": error,
+        "output": output,
+    }
+
+def _no_input(prompt=""):
+    raise EOFError("scripts cannot read input when run with --jobs")
+
+def _init_worker():
+    # Scripts cannot prompt from a worker; `msx rate` sees end of input
+    runner.read_input = _no_input
+
+def run_suite(files, jobs):
+    """
+    Runs `files` in a pool of `jobs` worker processes, or one after another
+    in this process when `jobs` is 1; results come back in the order given.
+    """
+    files = [os.path.abspath(file) for file in files]
+    if jobs == 1:
+        previous_input = runner.read_input
+        runner.read_input = _no_input
+        try:
+            return [run_isolated(file) for file in files]
+        finally:
+            runner.read_input = previous_input
+    with ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker) as pool:
+        return list(pool.map(run_isolated, files))
+
+def print_results(results, root):
+    for result in results:
+        print(f"\nRunning: {result['file']} ({result['seconds'] * 1000:.1f} ms)")
+        print(result["output"], end="")
+        if result["status"] == "failed":
+            print(f"Failed: {result['file']}")
+        elif result["status"] == "error":
+            print(f"Error in {result['file']}: {result['error']}")
+
+    print("\nSlowest scripts:")
+    for result in sorted(results, key=lambda r: -r["seconds"])[:10]:
+        print(f"  {result['seconds'] * 1000:9.1f} ms  {os.path.relpath(result['file'], root)}")
+
+def write_report(results, root, report_path, wall_seconds, jobs):
+    """Writes a JUnit XML report if `report_path` ends in .xml, otherwise JSON."""
+    if report_path.endswith(".xml"):
+        data = junit_report(results, root, wall_seconds)
+    else:
+        data = json.dumps({
+            "extension": root,
+            "jobs": jobs,
+            "wall_seconds": wall_seconds,
+            "results": [dict(r, file=os.path.relpath(r["file"], root)) for r in results],
+        }, indent=2)
+    with open(report_path, "w", encoding="utf-8") as f:
+        f.write(data)
+
+def count_status(results, status):
+    return sum(1 for r in results if r["status"] == status)
+
+def junit_report(results, root, wall_seconds):
+    import xml.etree.ElementTree as ET
+    suite = ET.Element("testsuite", {
+        "name": os.path.basename(os.path.abspath(root)),
+        "tests": str(len(results)),
+        "failures": str(count_status(results, "failed")),
+        "errors": str(count_status(results, "error")),
+        "time": f"{wall_seconds:.6f}",
+    })
+    for result in results:
+        case = ET.SubElement(suite, "testcase", {
+            "classname": "msx",
+            "name": os.path.relpath(result["file"], root),
+            "time": f"{result['seconds']:.6f}",
+        })
+        if result["status"] == "failed":
+            ET.SubElement(case, "failure", {"message": result["error"]})
+        elif result["status"] == "error":
+            ET.SubElement(case, "error", {"message": result["error"]})
+        ET.SubElement(case, "system-out").text = result["output"]
+    return ET.tostring(suite, encoding="unicode")
+
+def test_suite(path, jobs, report=None):
+    """Runs every script through run_suite; returns True if all of them passed."""
+    files = sorted(find_msx_files(path))
+    start = time.perf_counter()
+    results = run_suite(files, jobs)
+    wall_seconds = time.perf_counter() - start
+    print_results(results, path)
+    print(f"\n{len(results)} scripts, {count_status(results, 'failed')} failed, "
+          f"{count_status(results, 'error')} errors, {wall_seconds:.2f} s with {jobs} jobs.")
+    if report:
+        write_report(results, path, report, wall_seconds, jobs)
+        print(f"Report written to {report}")
+    return all(r["status"] == "passed" for r in results)
+
+# ===============================
+# Entry point
+# ===============================
+def run_all(path, jobs=None, report=None):
+    """Runs every script once; returns True if all of them passed."""
+    if jobs or report:
+        # --report alone runs the scripts one at a time, like a plain run
+        return test_suite(path, jobs or 1, report)
+    files = find_msx_files(path)
+    failed = sum(1 for file in files if not run_script(file))
+    if failed:
+        print(f"\n{failed} of {len(files)} scripts failed.")
+    else:
+        print("\nAll tests completed successfully.")
+    return not failed
+
+def test_extension(path, watch=False, jobs=None, report=None):
+    """
+    Tests the extension at `path`; returns False if the folder is missing
+    or any script failed (in watch mode, on the first run).
+    """
+    if not os.path.exists(path):
+        print(f"Error: Extension folder '{path}' does not exist.")
+        return False
+
+    print(f"Testing extension: {path}")
+
+    if not watch:
+        return run_all(path, jobs, report)
 
-    # Store last modification times for auto-reload
-    last_mod_times = {file: os.path.getmtime(file) for file in msx_files}
-
-    while True:
-        for file in msx_files:
-            try:
-                print(f"\nRunning: {file}")
-                run_msx_file(file)
-            except Exception as e:
-                print(f"Error in {file}: {e}")
-        
-        # Check for file changes
-        changed = False
-        for file in msx_files:
-            mod_time = os.path.getmtime(file)
-            if mod_time != last_mod_times[file]:
-                last_mod_times[file] = mod_time
-                changed = True
-        if changed:
-            print("\nChanges detected. Retesting...")
-        else:
-            print("\nAll tests completed successfully.")
-            break
-        
-        time.sleep(1)  # Wait a bit before re-running
+    # Start watching before the first run so edits made during it are seen
+    with open_watcher(path, ".msx") as watcher:
+        passed = run_all(path, jobs, report)
+        print(f"\nWatching {path} for changes ({type(watcher).__name__}). Press Ctrl+C to stop.")
+        try:
+            while True:
+                changed, deleted = watcher.wait()
+                for file in sorted(deleted):
+                    print(f"\nRemoved: {file}")
+                if changed:
+                    print("\nChanges detected. Retesting...")
+                for file in sorted(changed):
+                    run_script(file)
+        except KeyboardInterrupt:
+            print("\nStopped watching.")
+    return passed
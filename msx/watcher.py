@@ -0,0 +1,250 @@
+# watcher.py - waits for .msx files under a folder to change
+#
+# On Linux the kernel reports changes through inotify (reached with ctypes,
+# so there is nothing to install) and an idle watcher sleeps in select().
+# Elsewhere, or if inotify is unavailable, the folder is polled.
+import os
+import sys
+import time
+import errno
+import ctypes
+import ctypes.util
+import select
+import struct
+
+# Once a change arrives, wait until the folder has been quiet this long so a
+# burst of saves (editor temp files, git checkout) becomes a single rerun
+DEBOUNCE = 0.05
+# ...but never hold results back longer than this
+DEBOUNCE_MAX = 1.0
+POLL_INTERVAL = 0.5
+
+# <sys/inotify.h>
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+WATCH_MASK = (IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+              | IN_DELETE_SELF | IN_MOVE_SELF | IN_ONLYDIR)
+EVENT_HEADER = struct.Struct("iIII")  # wd, mask, cookie, len
+
+
+def snapshot(root, suffix):
+    """Returns {path: (mtime_ns, size)} for every file under `root` ending with `suffix`."""
+    files = {}
+    for dirpath, _, names in os.walk(root):
+        for name in names:
+            if name.endswith(suffix):
+                path = os.path.join(dirpath, name)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                files[path] = (st.st_mtime_ns, st.st_size)
+    return files
+
+
+class PollingWatcher:
+    """Finds changes by re-listing the folder every POLL_INTERVAL seconds."""
+
+    def __init__(self, root, suffix=".msx"):
+        self.root = root
+        self.suffix = suffix
+        self.files = snapshot(root, suffix)
+
+    def wait(self, timeout=None):
+        """
+        Blocks until files change; returns (changed, deleted) as sets of
+        paths, both empty if `timeout` seconds pass first. New files count
+        as changed.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        changed, deleted = set(), set()
+        known = self.files
+        while True:
+            if self._poll(changed, deleted):
+                # Keep polling until a round finds nothing new
+                time.sleep(POLL_INTERVAL)
+                continue
+            if changed or deleted:
+                # A file created and deleted again within the burst never existed
+                return changed & self.files.keys(), (deleted - self.files.keys()) & known.keys()
+            if deadline is not None and time.monotonic() >= deadline:
+                return changed, deleted
+            time.sleep(POLL_INTERVAL)
+
+    def _poll(self, changed, deleted):
+        """Adds what changed since the last poll to `changed` and `deleted`; returns True if anything did."""
+        current = snapshot(self.root, self.suffix)
+        found = {path for path, stamp in current.items() if self.files.get(path) != stamp}
+        gone = self.files.keys() - current.keys()
+        self.files = current
+        changed |= found
+        deleted |= gone
+        return bool(found or gone)
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class InotifyWatcher:
+    """Watches every directory under `root` with one inotify descriptor."""
+
+    def __init__(self, root, suffix=".msx"):
+        self.root = root
+        self.suffix = suffix
+        self._libc = _load_libc()
+        self.fd = self._libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(_errno(), "inotify_init1 failed")
+        self.dirs = {}  # wd -> directory path
+        self.files = set()
+        self._watch_tree(root)
+
+    # ----------------------
+    # Watches
+    # ----------------------
+    def _watch_tree(self, top):
+        """Watches `top` and every directory below it; returns the matching files found there."""
+        found = set()
+        for dirpath, _, names in os.walk(top):
+            wd = self._libc.inotify_add_watch(self.fd, os.fsencode(dirpath), WATCH_MASK)
+            if wd < 0:
+                if _errno() == errno.ENOSPC:
+                    raise OSError(errno.ENOSPC, "out of inotify watches (fs.inotify.max_user_watches)")
+                continue
+            self.dirs[wd] = dirpath
+            found.update(os.path.join(dirpath, name) for name in names if name.endswith(self.suffix))
+        self.files |= found
+        return found
+
+    def _forget_tree(self, top):
+        """
+        Drops the files and watches under `top` (moved away or deleted);
+        returns the files. A folder moved out of the tree keeps its watches
+        in the kernel, which would go on reporting it under its old path.
+        """
+        prefix = os.path.join(top, "")
+        gone = {path for path in self.files if path.startswith(prefix)}
+        self.files -= gone
+        for wd, path in list(self.dirs.items()):
+            if path == top or path.startswith(prefix):
+                self._libc.inotify_rm_watch(self.fd, wd)
+                del self.dirs[wd]
+        return gone
+
+    # ----------------------
+    # Events
+    # ----------------------
+    def wait(self, timeout=None):
+        """
+        Blocks until files change; returns (changed, deleted) as sets of
+        paths, both empty if `timeout` seconds pass first. New files count
+        as changed.
+        """
+        changed, deleted = set(), set()
+        if not select.select([self.fd], [], [], timeout)[0]:
+            return changed, deleted
+        known = set(self.files)
+        give_up = time.monotonic() + DEBOUNCE_MAX
+        while True:
+            self._read_events(changed, deleted)
+            remaining = give_up - time.monotonic()
+            if remaining <= 0 or not select.select([self.fd], [], [], min(DEBOUNCE, remaining))[0]:
+                break
+        changed &= self.files
+        # A file created and deleted again within the burst never existed
+        return changed, (deleted - self.files) & known
+
+    def _read_events(self, changed, deleted):
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return
+        offset = 0
+        while offset < len(data):
+            wd, mask, _, length = EVENT_HEADER.unpack_from(data, offset)
+            offset += EVENT_HEADER.size
+            name = os.fsdecode(data[offset:offset + length].rstrip(b"\0"))
+            offset += length
+            if mask & IN_Q_OVERFLOW:
+                self._resync(changed, deleted)
+                continue
+            directory = self.dirs.get(wd)
+            if directory is None:
+                continue
+            if mask & IN_IGNORED:
+                del self.dirs[wd]
+                continue
+            path = os.path.join(directory, name) if name else directory
+            if mask & IN_ISDIR:
+                if mask & (IN_CREATE | IN_MOVED_TO):
+                    changed |= self._watch_tree(path)
+                elif mask & (IN_DELETE | IN_MOVED_FROM):
+                    deleted |= self._forget_tree(path)
+            elif name.endswith(self.suffix):
+                if mask & (IN_CLOSE_WRITE | IN_MOVED_TO):
+                    self.files.add(path)
+                    changed.add(path)
+                elif mask & (IN_DELETE | IN_MOVED_FROM):
+                    self.files.discard(path)
+                    deleted.add(path)
+
+    def _resync(self, changed, deleted):
+        # The kernel queue overflowed, so events were lost: start over
+        for wd in list(self.dirs):
+            self._libc.inotify_rm_watch(self.fd, wd)
+        self.dirs.clear()
+        before = self.files
+        self.files = set()
+        changed |= self._watch_tree(self.root)
+        deleted |= before - self.files
+
+    def close(self):
+        if self.fd >= 0:
+            os.close(self.fd)
+            self.fd = -1
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _load_libc():
+    libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+    libc.inotify_init1.argtypes = [ctypes.c_int]
+    libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+    libc.inotify_rm_watch.argtypes = [ctypes.c_int, ctypes.c_int]
+    return libc
+
+
+def _errno():
+    return ctypes.get_errno()
+
+
+def open_watcher(root, suffix=".msx"):
+    """Returns an InotifyWatcher where the platform supports it, else a PollingWatcher."""
+    if sys.platform.startswith("linux"):
+        try:
+            return InotifyWatcher(root, suffix)
+        except (OSError, AttributeError):
+            pass
+    return PollingWatcher(root, suffix)
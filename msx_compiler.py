@@ -0,0 +1,246 @@
+# msx_compiler.py - compiles .msx scripts into a cached intermediate form
+import os
+import sys
+import marshal
+import hashlib
+import weakref
+from msx_parser import parse_line, split_lines, OP_MSX, OP_DEF, OP_CALL, OP_PRINT, OP_END
+
+# Bump whenever the compiled layout or the parsing rules change, so stale
+# .msxc files written by an older interpreter are never trusted.
+MSXC_VERSION = 5
+MSXC_MAGIC = b"MSXC"
+MSXC_TAG = f"msx-{MSXC_VERSION}-{sys.implementation.cache_tag}"
+
+# When set, compiled files go to this directory instead of next to the source
+CACHE_DIR_ENV = "MSX_CACHE_DIR"
+
+# Statements per on-disk chunk when a function body is spilled while streaming
+SPILL_CHUNK = 10000
+
+# ===============================
+# Compilation
+# ===============================
+# Every statement is a tuple whose first two items are (kind, line number):
+#   (OP_MSX, lineno, line)
+#   (OP_DEF, lineno, function_index)
+#   (OP_CALL, lineno, func_name, [arg values])
+#   (OP_PRINT, lineno, text)
+#   (OP_UNKNOWN, lineno, line)
+# Inside function bodies, print text and call arguments are templates
+# (see compile_template) and lines other than print/call are dropped.
+def compile_source(text):
+    """
+    Parses MSX source text into a program: (statements, functions).
+    `functions` is the function table, a list of (name, params, body);
+    OP_DEF statements refer to it by index so redefinitions keep their order.
+    """
+    functions = []
+    statements = list(iter_statements(split_lines(text), functions))
+    return statements, functions
+
+
+def iter_statements(lines, functions, spill=False):
+    """
+    Yields top-level statements from an iterable of source lines as soon as
+    each one is complete, appending finished functions to `functions`.
+    An OP_DEF is yielded when its body closes, which is the earliest point
+    the function can be called. With `spill`, bodies longer than SPILL_CHUNK
+    statements are written to temporary files instead of kept in memory.
+    """
+    current = None  # [lineno, name, params, body, spilled body or None]
+
+    for i, line in enumerate(lines):
+        line = line.strip()
+        if not line or line[0] == "#":
+            continue
+
+        stmt = parse_line(line)
+        kind = stmt[0]
+
+        if kind == OP_MSX:
+            yield (OP_MSX, i + 1, line)
+        elif kind == OP_DEF:
+            if current is not None:
+                yield _close_function(current, functions)
+            current = [i + 1, stmt[1], stmt[2], [], None]
+        elif kind == OP_END:
+            if current is not None:
+                yield _close_function(current, functions)
+            current = None
+        elif current is not None:
+            params, body = current[2], current[3]
+            if kind == OP_PRINT:
+                body.append((OP_PRINT, i + 1, compile_template(stmt[1], params)))
+            elif kind == OP_CALL:
+                arg_templates = [compile_template(v, params) for v in stmt[2]]
+                body.append((OP_CALL, i + 1, stmt[1], arg_templates))
+            if spill and len(body) >= SPILL_CHUNK:
+                if current[4] is None:
+                    current[4] = SpilledBody()
+                current[4].append_chunk(body)
+                current[3] = []
+        else:
+            yield (kind, i + 1) + stmt[1:]
+
+    if current is not None:
+        yield _close_function(current, functions)
+
+
+def _close_function(current, functions):
+    lineno, name, params, body, spilled = current
+    if spilled is not None:
+        if body:
+            spilled.append_chunk(body)
+        body = spilled
+    functions.append((name, params, body))
+    return (OP_DEF, lineno, len(functions) - 1)
+
+
+class SpilledBody:
+    """
+    A function body kept on disk as marshalled chunks of statements, so
+    only one chunk per active call is in memory at a time. The backing file
+    is removed once the body is no longer referenced.
+    """
+
+    def __init__(self):
+        import tempfile  # only needed once a body actually spills
+        fd, self.path = tempfile.mkstemp(prefix="msx-", suffix=".msxbody")
+        os.close(fd)
+        weakref.finalize(self, os.remove, self.path)
+        self.chunks = []  # (offset, length) of each chunk in the file
+        self._size = 0
+
+    def append_chunk(self, statements):
+        data = marshal.dumps(statements)
+        with open(self.path, "ab") as f:
+            f.write(data)
+        self.chunks.append((self._size, len(data)))
+        self._size += len(data)
+
+    def load_chunk(self, index):
+        offset, length = self.chunks[index]
+        with open(self.path, "rb") as f:
+            f.seek(offset)
+            return marshal.loads(f.read(length))
+
+
+def compile_template(text, params):
+    """
+    Turns `text` into a str.format template whose fields are parameter slot
+    numbers, so rendering is a single format() call however many locals the
+    function has. Placeholders are bound the way the old str.replace chain
+    did: "$param" for each parameter in order, so with parameters (n, name)
+    "$name" renders as the value of n followed by "ame".
+    """
+    if "$" not in text or not params:
+        return _escape_braces(text)
+    # Duplicate names keep their first position and their last slot, like
+    # the dict of locals the replace chain ran over
+    slots = {p: i for i, p in enumerate(params)}
+    parts = [text]  # literal strings and slot numbers
+    for param, slot in slots.items():
+        placeholder = "$" + param
+        expanded = []
+        for part in parts:
+            if isinstance(part, int) or placeholder not in part:
+                expanded.append(part)
+                continue
+            pieces = part.split(placeholder)
+            expanded.append(pieces[0])
+            for piece in pieces[1:]:
+                expanded.append(slot)
+                expanded.append(piece)
+        parts = expanded
+    return "".join(f"{{{part}}}" if isinstance(part, int) else _escape_braces(part) for part in parts)
+
+
+def _escape_braces(text):
+    return text.replace("{", "{{").replace("}", "}}")
+
+
+# ===============================
+# .msxc cache
+# ===============================
+def source_digest(data):
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+# Suffix of compiled scripts
+COMPILED_SUFFIX = ".msxc"
+
+
+def cache_path_for(path):
+    """Returns where the compiled form of `path` is stored."""
+    cache_dir = os.environ.get(CACHE_DIR_ENV)
+    if cache_dir:
+        key = hashlib.blake2b(os.path.abspath(path).encode("utf-8"), digest_size=12).hexdigest()
+        name = os.path.splitext(os.path.basename(path))[0]
+        return os.path.join(cache_dir, f"{name}-{key}{COMPILED_SUFFIX}")
+    base, ext = os.path.splitext(path)
+    if ext == ".msx":
+        return base + COMPILED_SUFFIX
+    return path + COMPILED_SUFFIX
+
+
+def read_cache(cache_path, digest):
+    """Returns the cached program if it matches `digest`, otherwise None."""
+    try:
+        with open(cache_path, "rb") as f:
+            data = f.read()
+        if not data.startswith(MSXC_MAGIC):
+            return None
+        tag, cached_digest, program = marshal.loads(memoryview(data)[len(MSXC_MAGIC):])
+    except (OSError, EOFError, ValueError, TypeError):
+        return None
+    if tag != MSXC_TAG or cached_digest != digest:
+        return None
+    return program
+
+
+def write_cache(cache_path, digest, program):
+    """Writes the compiled program; returns False if the cache is not writable."""
+    tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+    try:
+        cache_dir = os.path.dirname(cache_path)
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+        with open(tmp_path, "wb") as f:
+            f.write(MSXC_MAGIC + marshal.dumps((MSXC_TAG, digest, program)))
+        os.replace(tmp_path, cache_path)
+        return True
+    except OSError:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        return False
+
+
+def load_program(path, use_cache=True):
+    """
+    Returns the compiled program for `path`, loading the .msxc file when it
+    is fresh and recompiling (and refreshing the cache) when it is not.
+    """
+    with open(path, "rb") as f:
+        data = f.read()
+    if not use_cache:
+        return compile_source(data.decode("utf-8"))
+
+    digest = source_digest(data)
+    cache_path = cache_path_for(path)
+    program = read_cache(cache_path, digest)
+    if program is None:
+        program = compile_source(data.decode("utf-8"))
+        write_cache(cache_path, digest, program)
+    return program
+
+
+def compile_file(path):
+    """Compiles `path` unconditionally and returns the .msxc path written, or None."""
+    with open(path, "rb") as f:
+        data = f.read()
+    program = compile_source(data.decode("utf-8"))
+    cache_path = cache_path_for(path)
+    if write_cache(cache_path, source_digest(data), program):
+        return cache_path
+    return None
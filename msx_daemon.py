@@ -0,0 +1,252 @@
+# msx_daemon.py - long-lived MSX process and its thin client
+#
+# The daemon listens on a Unix domain socket and keeps compiled scripts in
+# memory between requests. Requests and replies are JSON objects, one per
+# line:
+#   client -> daemon  {"op": "run", "path": ..., "cwd": ..., "use_cache": ..., "stream": ...}
+#                     {"op": "exec", "source": ..., "cwd": ...}   inline statements
+#                     {"op": "ping"} / {"op": "stop"}
+#   daemon -> client  {"out": text}      output, already newline-terminated
+#                     {"input": prompt}  client answers {"line": ...} or {"eof": true}
+#                     {"error": text}    the request could not be handled
+#                     {"done": true}     request finished
+import os
+import sys
+import json
+import stat
+import socket
+
+SOCKET_ENV = "MSX_DAEMON_SOCKET"
+# Parsed scripts the daemon keeps between requests
+PROGRAM_CACHE_SIZE = 64
+
+
+def default_socket_path():
+    path = os.environ.get(SOCKET_ENV)
+    if path:
+        return path
+    runtime_dir = os.environ.get("XDG_RUNTIME_DIR")
+    if not runtime_dir:
+        runtime_dir = os.path.join("/tmp", f"msx-{os.getuid()}")
+    return os.path.join(runtime_dir, "msx-daemon.sock")
+
+
+def socket_dir_problem(socket_path):
+    """
+    Returns why the folder holding `socket_path` cannot be trusted, or None.
+    It must be a real folder (not a symlink) owned by this user and closed
+    to everyone else; otherwise another user could have created it first
+    (as /tmp/msx-<uid> can be) and be listening in the daemon's place.
+    """
+    socket_dir = os.path.dirname(os.path.abspath(socket_path))
+    try:
+        st = os.lstat(socket_dir)
+    except OSError as e:
+        return f"cannot check {socket_dir}: {e}"
+    if not stat.S_ISDIR(st.st_mode):
+        return f"{socket_dir} is not a folder"
+    if st.st_uid != os.getuid():
+        return f"{socket_dir} is owned by another user"
+    if st.st_mode & 0o077:
+        return f"{socket_dir} is accessible to other users (mode {stat.S_IMODE(st.st_mode):o}, need 700)"
+    return None
+
+
+def _send(wfile, message):
+    wfile.write(json.dumps(message) + "\n")
+    wfile.flush()
+
+
+# ===============================
+# Client
+# ===============================
+def send_request(request, socket_path=None):
+    """
+    Sends `request` to a running daemon and relays its output to stdout.
+    Returns True when the daemon handled it and False when no daemon is
+    listening, in which case the caller should run the request in-process.
+    """
+    if not hasattr(socket, "AF_UNIX"):
+        return False
+    socket_path = socket_path or default_socket_path()
+    if not os.path.exists(socket_path):
+        return False
+    problem = socket_dir_problem(socket_path)
+    if problem:
+        sys.stderr.write(f"Warning: not using the MSX daemon: {problem}\n")
+        return False
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(socket_path)
+    except OSError:
+        sock.close()
+        return False
+
+    with sock, sock.makefile("r", encoding="utf-8") as rfile, sock.makefile("w", encoding="utf-8") as wfile:
+        _send(wfile, request)
+        for line in rfile:
+            message = json.loads(line)
+            if "out" in message:
+                sys.stdout.write(message["out"])
+            elif "input" in message:
+                sys.stdout.write(message["input"])
+                sys.stdout.flush()
+                answer = sys.stdin.readline()
+                _send(wfile, {"line": answer.rstrip("\n")} if answer else {"eof": True})
+            elif "error" in message:
+                sys.stderr.write(f"Error: {message['error']}\n")
+            elif message.get("done"):
+                break
+    sys.stdout.flush()
+    return True
+
+
+def daemon_running(socket_path=None):
+    return send_request({"op": "ping"}, socket_path)
+
+
+# ===============================
+# Daemon
+# ===============================
+class _ClientStream:
+    """File-like target for a BufferedSink that frames output for the client."""
+
+    def __init__(self, wfile):
+        self.wfile = wfile
+
+    def write(self, text):
+        self.wfile.write(json.dumps({"out": text}) + "\n")
+
+    def flush(self):
+        self.wfile.flush()
+
+
+class MSXDaemon:
+    def __init__(self, socket_path=None):
+        from collections import OrderedDict
+        self.socket_path = socket_path or default_socket_path()
+        # abspath -> (mtime_ns, size, program); the most recently run scripts
+        # stay parsed between requests
+        self.programs = OrderedDict()
+        self.running = False
+
+    def serve_forever(self):
+        import runner
+        self.runner = runner
+
+        socket_dir = os.path.dirname(self.socket_path)
+        if socket_dir:
+            os.makedirs(socket_dir, mode=0o700, exist_ok=True)
+        problem = socket_dir_problem(self.socket_path)
+        if problem:
+            print(f"Error: refusing to start the MSX daemon: {problem}")
+            return
+        if os.path.exists(self.socket_path):
+            if daemon_running(self.socket_path):
+                print(f"Error: MSX daemon already running on {self.socket_path}")
+                return
+            os.remove(self.socket_path)
+
+        server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        server.bind(self.socket_path)
+        os.chmod(self.socket_path, 0o600)
+        server.listen()
+        print(f"MSX daemon listening on {self.socket_path}")
+        sys.stdout.flush()
+
+        self.running = True
+        try:
+            while self.running:
+                conn, _ = server.accept()
+                # One bad request or vanished client must not stop the daemon
+                try:
+                    with conn:
+                        self.handle_connection(conn)
+                except Exception as e:
+                    print(f"Error: request failed: {type(e).__name__}: {e}", file=sys.stderr)
+                    sys.stderr.flush()
+        finally:
+            server.close()
+            if os.path.exists(self.socket_path):
+                os.remove(self.socket_path)
+
+    def handle_connection(self, conn):
+        # Requests run one at a time: the runner works on the process's cwd
+        # and module-level state, so this is what keeps them isolated.
+        with conn.makefile("r", encoding="utf-8") as rfile, conn.makefile("w", encoding="utf-8") as wfile:
+            line = rfile.readline()
+            if not line:
+                return
+            try:
+                request = json.loads(line)
+            except ValueError:
+                request = None
+            op = request.get("op") if isinstance(request, dict) else None
+            if op == "stop":
+                self.running = False
+            elif op in ("run", "exec"):
+                self.run_request(request, rfile, wfile)
+            elif op != "ping":
+                _send(wfile, {"error": "invalid request"})
+            _send(wfile, {"done": True})
+
+    def run_request(self, request, rfile, wfile):
+        from msx_output import BufferedSink, use_sink
+
+        runner = self.runner
+        sink = BufferedSink(_ClientStream(wfile), flush_interval=0.05)
+
+        def read_input(prompt=""):
+            sink.flush()
+            _send(wfile, {"input": prompt})
+            reply = json.loads(rfile.readline() or '{"eof": true}')
+            if reply.get("eof"):
+                raise EOFError
+            return reply["line"]
+
+        previous_cwd = os.getcwd()
+        previous_input = runner.read_input
+        runner.read_input = read_input
+        try:
+            os.chdir(request.get("cwd", previous_cwd))
+            with use_sink(sink):
+                if request["op"] == "exec":
+                    runner.run_msx_source(request["source"])
+                elif request.get("stream"):
+                    runner.run_msx_file(request["path"], stream=True)
+                else:
+                    self.run_file(request["path"], request.get("use_cache", True))
+        except Exception as e:
+            try:
+                sink.write_line(f"Error: {type(e).__name__}: {e}")
+                sink.flush()
+            except OSError:
+                pass  # the client has gone; nobody to tell
+        finally:
+            runner.read_input = previous_input
+            os.chdir(previous_cwd)
+
+    def run_file(self, path, use_cache):
+        runner = self.runner
+        if not os.path.exists(path):
+            runner.emit(f"Error: File {path} not found.")
+            return
+        st = os.stat(path)
+        if st.st_size > runner.STREAM_THRESHOLD:
+            runner.run_msx_file(path, stream=True)
+            return
+        cached = self.programs.get(path) if use_cache else None
+        if cached and cached[0] == st.st_mtime_ns and cached[1] == st.st_size:
+            program = cached[2]
+            self.programs.move_to_end(path)
+        else:
+            program = runner.load_program(path, use_cache)
+            self.programs[path] = (st.st_mtime_ns, st.st_size, program)
+            self.programs.move_to_end(path)
+            if len(self.programs) > PROGRAM_CACHE_SIZE:
+                self.programs.popitem(last=False)
+        runner.execute_program(program)
+
+
+def stop_daemon(socket_path=None):
+    return send_request({"op": "stop"}, socket_path)
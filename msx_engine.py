@@ -0,0 +1,156 @@
+# msx_engine.py - call-stack execution engine for compiled .msx programs
+#
+# Every loop takes an optional `hook` (msx_profile.Profiler) that is told
+# when each statement, call and print starts and ends. Without one the
+# loops only pay an `is None` test per statement.
+import time
+from msx_parser import OP_MSX, OP_DEF, OP_CALL, OP_PRINT
+from msx_output import get_sink
+from msx_compiler import SpilledBody
+
+# Scripts have no conditionals, so a recursive call never terminates on its
+# own; the bound turns it into a clean error instead of a hang.
+MAX_CALL_DEPTH = 1000
+
+
+class Frame:
+    """One active function call: its compiled body, bound slots and position."""
+    __slots__ = ("name", "body", "values", "pc", "spilled", "chunk")
+
+    def __init__(self, name, func, args_values):
+        params, body = func
+        if isinstance(body, SpilledBody):
+            # Walk the body one on-disk chunk at a time
+            self.spilled = body
+            self.chunk = 0
+            body = body.load_chunk(0)
+        else:
+            self.spilled = None
+        values = tuple(args_values[:len(params)])
+        if len(values) < len(params):
+            # Unbound parameters print as written, like the old str.replace loop
+            values += tuple(f"${p}" for p in params[len(values):])
+        self.name = name
+        self.body = body
+        self.values = values
+        self.pc = 0
+
+
+# ===============================
+# Program execution
+# ===============================
+def execute_program(program, handle_msx, max_depth=MAX_CALL_DEPTH, hook=None, functions=None):
+    """
+    Runs a compiled program from msx_compiler. `handle_msx` is called for
+    every top-level "msx ..." statement. Functions are defined in
+    `functions` ({name: (params, body)}, a new table by default). Returns
+    False if execution stopped on an error.
+    """
+    statements, function_table = program
+    return execute_statements(statements, function_table, handle_msx, max_depth, hook, functions)
+
+
+def execute_statements(statements, function_table, handle_msx, max_depth=MAX_CALL_DEPTH, hook=None,
+                       functions=None):
+    """
+    Runs top-level statements from any iterable, including the generator
+    msx_compiler.iter_statements, in which case each statement executes as
+    soon as it has been read.
+    """
+    if functions is None:
+        functions = {}
+    write = get_sink().write_line
+    clock = time.perf_counter
+
+    for stmt in statements:
+        kind = stmt[0]
+        if hook is not None:
+            start = clock()
+        if kind == OP_PRINT:
+            write(stmt[2])
+        elif kind == OP_CALL:
+            if not call_function(functions, stmt[2], stmt[3], stmt[1], max_depth, hook):
+                if hook is not None:
+                    hook.statement(stmt, start)
+                return False
+        elif kind == OP_DEF:
+            name, params, body = function_table[stmt[2]]
+            functions[name] = (params, body)
+        elif kind == OP_MSX:
+            handle_msx(stmt[2])
+        else:
+            write(f"Unknown command at line {stmt[1]}: {stmt[2]}")
+        if hook is not None:
+            hook.statement(stmt, start)
+    return True
+
+
+def define_functions(program, functions):
+    """Adds the functions a compiled program defines to `functions` without running anything else."""
+    # The table is in definition order, so a redefinition still wins
+    for name, params, body in program[1]:
+        functions[name] = (params, body)
+
+
+def call_function(functions, func_name, args_values, lineno, max_depth=MAX_CALL_DEPTH, hook=None):
+    """
+    Calls `func_name` and runs it to completion on an explicit frame stack,
+    so nested and recursive calls never touch the Python stack.
+    """
+    write = get_sink().write_line
+    clock = time.perf_counter
+    if hook is not None:
+        start = clock()
+    func = functions.get(func_name)
+    if func is None:
+        write(f"Error: Function '{func_name}' not defined at line {lineno}")
+        return False
+
+    stack = [Frame(func_name, func, args_values)]
+    if hook is not None:
+        hook.enter_call(func_name, None, lineno, start)
+    while stack:
+        frame = stack[-1]
+        body = frame.body
+        if frame.pc >= len(body):
+            spilled = frame.spilled
+            if spilled is not None and frame.chunk + 1 < len(spilled.chunks):
+                frame.chunk += 1
+                frame.body = spilled.load_chunk(frame.chunk)
+                frame.pc = 0
+            else:
+                stack.pop()
+                if hook is not None:
+                    hook.leave_call(frame.name)
+            continue
+        stmt = body[frame.pc]
+        frame.pc += 1
+
+        if stmt[0] == OP_PRINT:
+            if hook is None:
+                write(stmt[2].format(*frame.values))
+            else:
+                start = clock()
+                write(stmt[2].format(*frame.values))
+                hook.body_print(frame.name, stmt[1], start)
+            continue
+
+        # OP_CALL: argument templates are rendered against the caller's slots
+        if hook is not None:
+            start = clock()
+        callee = functions.get(stmt[2])
+        if callee is None:
+            write(f"Error: Function '{stmt[2]}' not defined at line {stmt[1]}")
+            if hook is not None:
+                hook.unwind(stack)
+            return False
+        if len(stack) >= max_depth:
+            write(f"Error: Maximum call depth ({max_depth}) exceeded calling '{stmt[2]}' at line {stmt[1]}")
+            if hook is not None:
+                hook.unwind(stack)
+            return False
+        values = frame.values
+        stack.append(Frame(stmt[2], callee, [fmt.format(*values) for fmt in stmt[3]]))
+        if hook is not None:
+            hook.enter_call(stmt[2], frame.name, stmt[1], start)
+    return True
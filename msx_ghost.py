@@ -0,0 +1,43 @@
+# msx_ghost.py - cached, precompiled ghost command bindings
+#
+# ghost.command-fig.json maps binding types to {key: action}:
+#   {"double_click": {"reset": "restart.msx"}, "key_press": {"F5": "refresh"}}
+# The file is parsed once per (path, mtime, size) and each action is
+# resolved to its handler up front, so a trigger is two dict lookups.
+import os
+import json
+
+# abspath -> (mtime_ns, size, bindings)
+_cache = {}
+
+
+def load_bindings(path, resolve_action):
+    """
+    Returns {binding_type: {key: (action, handler)}} for the ghost config at
+    `path`, or None if it does not exist. `resolve_action(action)` returns
+    the callable to run for an action, or None if the action only logs.
+    """
+    path = os.path.abspath(path)
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        _cache.pop(path, None)
+        return None
+    cached = _cache.get(path)
+    if cached and cached[0] == st.st_mtime_ns and cached[1] == st.st_size:
+        return cached[2]
+
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    bindings = {}
+    for binding_type, entries in data.items():
+        if isinstance(entries, dict):
+            bindings[binding_type] = {
+                key: (action, resolve_action(action)) for key, action in entries.items()
+            }
+    _cache[path] = (st.st_mtime_ns, st.st_size, bindings)
+    return bindings
+
+
+def clear_cache():
+    _cache.clear()
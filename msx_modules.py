@@ -0,0 +1,275 @@
+# msx_modules.py - lazy module index and loader for msx import statements
+#
+# <extension>/.msxmodules is a JSON index of every importable file:
+#   {"files": {relative path: [type, size, mtime_ns, digest or null]},
+#    "dirs": {relative folder: [mtime_ns, [sub-folders], [module files]]}, ...}
+# It is built with one os.scandir pass that only stats files, and after
+# that only folders whose mtime moved (a file was added, removed or
+# renamed in them) are listed again. The root, which the index itself is
+# written to, is always listed. Contents are read when a module is
+# first loaded, which is also when its digest is recorded. Parsed .msx
+# and .json modules stay in an LRU cache and are reused while the file's
+# size and mtime (or, failing that, its digest) are unchanged.
+import os
+import json
+import time
+import hashlib
+from collections import OrderedDict
+
+from msx_storage import atomic_write, RACY_WINDOW_NS
+from msx_compiler import load_program
+
+MODULE_INDEX_NAME = ".msxmodules"
+MODULE_INDEX_VERSION = 2
+MODULE_TYPES = (".js", ".msx", ".py", ".jsx", ".tsx", ".json", ".ts")
+# Only these are parsed, and so only these are cached
+PARSED_TYPES = (".msx", ".json")
+# Parsed modules kept in memory
+MODULE_CACHE_SIZE = 256
+# Folders never searched for modules (dot-folders are skipped as well)
+SKIPPED_DIRS = {"__pycache__", "node_modules"}
+
+
+def module_type(name):
+    """Returns the module type of a file name (".msx", ".json", ...), or None if it cannot be imported."""
+    ext = os.path.splitext(name)[1]
+    return ext if ext in MODULE_TYPES else None
+
+
+def file_digest(path):
+    h = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+class ModuleIndex:
+    """The persisted index of importable files under `root`."""
+
+    def __init__(self, root, path=None):
+        self.root = root
+        self.path = path or os.path.join(root, MODULE_INDEX_NAME)
+        self.entries = {}
+        self.dirs = {}
+        self.written_ns = 0
+        self.dirty = False
+        self._load()
+
+    def _load(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if data["version"] != MODULE_INDEX_VERSION:
+                return
+            self.entries = dict(data["files"])
+            self.dirs = dict(data["dirs"])
+            self.written_ns = int(data["written_ns"])
+        except (OSError, ValueError, KeyError, TypeError):
+            pass
+
+    def save(self):
+        """Writes the index if anything changed; returns False if it could not be written."""
+        if not self.dirty:
+            return True
+        written_ns = time.time_ns()
+        data = {"version": MODULE_INDEX_VERSION, "written_ns": written_ns,
+                "files": self.entries, "dirs": self.dirs}
+        try:
+            atomic_write(self.path, json.dumps(data, sort_keys=True).encode("utf-8"))
+        except OSError:
+            return False
+        self.written_ns = written_ns
+        self.dirty = False
+        return True
+
+    def refresh(self):
+        """
+        Brings the index up to date with the tree: one stat per folder, and
+        a scandir of only the folders whose mtime changed, keeping the
+        digests of files whose size and mtime have not changed. Files edited
+        in place in an unchanged folder are not seen here; load() stats a
+        module every time it is used. Returns (added, changed, removed) as
+        counts.
+        """
+        entries = {}
+        dirs = {}
+        added = changed = 0
+        racy = False
+        trusted_before = self.written_ns - RACY_WINDOW_NS
+        stack = [""]
+        while stack:
+            rel_dir = stack.pop()
+            path = os.path.join(self.root, rel_dir) if rel_dir else self.root
+            prefix = rel_dir + "/" if rel_dir else ""
+            known = mtime_ns = None
+            if rel_dir:
+                try:
+                    mtime_ns = os.stat(path).st_mtime_ns
+                except OSError:
+                    continue
+                known = self.dirs.get(rel_dir)
+            if (known and known[0] == mtime_ns and mtime_ns < trusted_before
+                    and all(prefix + name in self.entries for name in known[2])):
+                dirs[rel_dir] = known
+                stack.extend(prefix + name for name in known[1])
+                for name in known[2]:
+                    entries[prefix + name] = self.entries[prefix + name]
+                continue
+            # Listed again only because it changed too close to the last
+            # save; saving moves written_ns on so that it is trusted later
+            racy = racy or (known is not None and known[0] == mtime_ns)
+
+            subdirs, files = [], []
+            with os.scandir(path) as it:
+                for entry in it:
+                    name = entry.name
+                    if entry.is_dir(follow_symlinks=False):
+                        if name[0] != "." and name not in SKIPPED_DIRS:
+                            subdirs.append(name)
+                        continue
+                    kind = module_type(name)
+                    if kind is None or not entry.is_file():
+                        continue
+                    files.append(name)
+                    rel = prefix + name
+                    st = entry.stat()
+                    old = self.entries.get(rel)
+                    if old is None:
+                        added += 1
+                    elif old[1] == st.st_size and old[2] == st.st_mtime_ns and old[2] < trusted_before:
+                        entries[rel] = old
+                        continue
+                    elif old[1] != st.st_size or old[2] != st.st_mtime_ns:
+                        changed += 1
+                    entries[rel] = [kind, st.st_size, st.st_mtime_ns, None]
+            if rel_dir:
+                dirs[rel_dir] = [mtime_ns, subdirs, files]
+            stack.extend(prefix + name for name in subdirs)
+        removed = len(self.entries.keys() - entries.keys())
+        if added or changed or removed or racy or entries != self.entries or dirs != self.dirs:
+            self.entries = entries
+            self.dirs = dirs
+            self.dirty = True
+        return added, changed, removed
+
+    def update(self, rel, st, digest=None):
+        """Records the current stat (and digest, if known) of one module."""
+        entry = [module_type(rel), st.st_size, st.st_mtime_ns, digest]
+        if self.entries.get(rel) != entry:
+            self.entries[rel] = entry
+            self.dirty = True
+        return entry
+
+    def counts(self):
+        """Returns {module type: number of modules}."""
+        counts = {}
+        for entry in self.entries.values():
+            counts[entry[0]] = counts.get(entry[0], 0) + 1
+        return counts
+
+
+class ModuleLoader:
+    """
+    Loads modules under `root` on first use. .msx modules load as compiled
+    programs (through the .msxc cache) and .json modules as their data;
+    other types load as source text and are not cached.
+    """
+
+    def __init__(self, root, cache_size=MODULE_CACHE_SIZE):
+        self.root = root
+        self.real_root = os.path.realpath(root)
+        self.index = ModuleIndex(root)
+        self.cache_size = cache_size
+        self._cache = OrderedDict()  # rel -> (size, mtime_ns, digest, module)
+        self.imported = {}  # rel -> digest of the version last imported
+        self._resolved = {}  # name as given -> (rel, real path, st_dev, st_ino)
+
+    def relative(self, name):
+        """
+        Returns (relative path with / separators, real path) for `name`.
+        Symlinks are resolved before the containment check, so one leading
+        outside the root raises ValueError like any other outside name.
+        """
+        path = os.path.realpath(name if os.path.isabs(name) else os.path.join(self.root, name))
+        rel = os.path.relpath(path, self.real_root)
+        if rel == os.pardir or rel.startswith(os.pardir + os.sep):
+            raise ValueError(f"{name} is outside {self.root}")
+        return rel.replace(os.sep, "/"), path
+
+    def load(self, name):
+        """
+        Returns (relative path, type, digest, module) for `name`. Raises
+        OSError if it cannot be read and ValueError if it is outside the
+        root, is not a module type or does not parse.
+        """
+        return self._load(*self._resolve(name))
+
+    def _load(self, rel, kind, path, st):
+        cached = self._cache.get(rel)
+        if cached and cached[0] == st.st_size and cached[1] == st.st_mtime_ns:
+            self._cache.move_to_end(rel)
+            return rel, kind, cached[2], cached[3]
+
+        digest = file_digest(path)
+        if cached and cached[2] == digest:
+            module = cached[3]
+        elif kind == ".msx":
+            module = load_program(path)
+        elif kind == ".json":
+            with open(path, "r", encoding="utf-8") as f:
+                module = json.load(f)
+        else:
+            with open(path, "r", encoding="utf-8") as f:
+                module = f.read()
+        self.index.update(rel, st, digest)
+
+        if kind in PARSED_TYPES and st.st_mtime_ns < time.time_ns() - RACY_WINDOW_NS:
+            self._cache[rel] = (st.st_size, st.st_mtime_ns, digest, module)
+            self._cache.move_to_end(rel)
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        else:
+            self._cache.pop(rel, None)
+        return rel, kind, digest, module
+
+    def _resolve(self, name):
+        # A name resolved before is reused while its real path still leads
+        # to the same file: the stat is needed anyway, and a symlink put in
+        # its way since would lead somewhere else
+        resolved = self._resolved.get(name)
+        if resolved is not None:
+            rel, path, dev, ino = resolved
+            try:
+                st = os.stat(path)
+                if st.st_dev == dev and st.st_ino == ino:
+                    return rel, module_type(rel), path, st
+            except OSError:
+                pass
+        rel, path = self.relative(name)
+        kind = module_type(rel)
+        if kind is None:
+            raise ValueError(f"{name} is not an importable module")
+        st = os.stat(path)
+        if len(self._resolved) < MODULE_CACHE_SIZE * 4:
+            self._resolved[name] = (rel, path, st.st_dev, st.st_ino)
+        return rel, kind, path, st
+
+    def import_module(self, name):
+        """
+        Like load, plus whether this version of the module is being imported
+        for the first time (so its side effects should run). Only .msx
+        modules have any: other types are checked and recorded in the index
+        but not read, and come back as None.
+        """
+        rel, kind, path, st = self._resolve(name)
+        if kind == ".msx":
+            rel, kind, version, module = self._load(rel, kind, path, st)
+        else:
+            version, module = (st.st_size, st.st_mtime_ns), None
+            known = self.index.entries.get(rel)
+            if not (known and known[1] == st.st_size and known[2] == st.st_mtime_ns):
+                self.index.update(rel, st)
+        first = self.imported.get(rel) != version
+        self.imported[rel] = version
+        return rel, kind, module, first
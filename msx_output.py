@@ -0,0 +1,113 @@
+# msx_output.py - pluggable output sinks for the MSX runner
+import sys
+import time
+from contextlib import contextmanager
+
+
+# ===============================
+# Sinks
+# ===============================
+class StdoutSink:
+    """Writes each line straight to stdout, like print()."""
+
+    def write_line(self, text):
+        print(text)
+
+    def flush(self):
+        sys.stdout.flush()
+
+
+class BufferedSink:
+    """
+    Collects lines and writes them to `stream` in one call once `flush_size`
+    characters are pending or `flush_interval` seconds have passed since the
+    last write-out. Lines always come out in the order they were written.
+    """
+
+    def __init__(self, stream=None, flush_size=64 * 1024, flush_interval=0.5):
+        self.stream = stream
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+        self._pending = []
+        self._pending_size = 0
+        self._last_flush = time.monotonic()
+
+    def write_line(self, text):
+        self._pending.append(text)
+        self._pending_size += len(text) + 1
+        if self._pending_size >= self.flush_size:
+            self.flush()
+        elif time.monotonic() - self._last_flush >= self.flush_interval:
+            self.flush()
+
+    def flush(self):
+        stream = self.stream or sys.stdout
+        if self._pending:
+            self._pending.append("")
+            stream.write("\n".join(self._pending))
+            self._pending = []
+            self._pending_size = 0
+        stream.flush()
+        self._last_flush = time.monotonic()
+
+
+class CaptureSink:
+    """Keeps every line in memory, for embedding the runner and for tests."""
+
+    def __init__(self):
+        self.lines = []
+
+    def write_line(self, text):
+        self.lines.append(text)
+
+    def flush(self):
+        pass
+
+    def getvalue(self):
+        return "".join(line + "\n" for line in self.lines)
+
+
+class NullSink:
+    """Discards all output; useful when benchmarking the interpreter."""
+
+    def write_line(self, text):
+        pass
+
+    def flush(self):
+        pass
+
+
+# ===============================
+# Current sink
+# ===============================
+_sink = StdoutSink()
+
+
+def get_sink():
+    return _sink
+
+
+def set_sink(sink):
+    """Installs `sink` for all runner output and returns the previous one."""
+    global _sink
+    previous = _sink
+    _sink = sink
+    return previous
+
+
+@contextmanager
+def use_sink(sink):
+    """Sends runner output to `sink` for the duration of the block."""
+    previous = set_sink(sink)
+    try:
+        yield sink
+    finally:
+        # Restored even when the flush fails (a client that went away)
+        try:
+            sink.flush()
+        finally:
+            set_sink(previous)
+
+
+def emit(text):
+    _sink.write_line(text)
@@ -0,0 +1,84 @@
+# msx_parser.py - shared line lexer for .msx scripts
+import re
+
+# ===============================
+# Statement kinds
+# ===============================
+OP_MSX = 0
+OP_DEF = 1
+OP_CALL = 2
+OP_PRINT = 3
+OP_UNKNOWN = 4
+OP_END = 5  # closing "}" of a function body, only seen while parsing
+
+# Applied to the text after the keyword, never to the whole line
+FUNCTION_REST_RE = re.compile(r'(\w+)\((.*?)\)\s*{$')
+CALL_REST_RE = re.compile(r'(\w+)\((.*?)\)$')
+
+
+# ===============================
+# Line parsing
+# ===============================
+def parse_line(line):
+    """
+    Classifies one stripped, non-empty, non-comment line.
+    The first word is split off once and looked up in KEYWORDS, so the cost
+    does not depend on how many statement kinds there are:
+        (OP_MSX, line)
+        (OP_DEF, name, [arg names])
+        (OP_END,)
+        (OP_CALL, name, [arg values])
+        (OP_PRINT, text)
+        (OP_UNKNOWN, line)
+    """
+    parts = line.split(None, 1)
+    if len(parts) == 2:
+        handler = KEYWORDS.get(parts[0])
+        if handler is not None:
+            stmt = handler(line, parts[1])
+            if stmt is not None:
+                return stmt
+    elif line == "}":
+        return END
+    return (OP_UNKNOWN, line)
+
+
+def _parse_msx(line, rest):
+    return (OP_MSX, line)
+
+
+def _parse_function(line, rest):
+    match = FUNCTION_REST_RE.match(rest)
+    if match:
+        args = [a.strip() for a in match.group(2).split(",") if a.strip()]
+        return (OP_DEF, match.group(1), args)
+    return None
+
+
+def _parse_call(line, rest):
+    match = CALL_REST_RE.match(rest)
+    if match:
+        args_values = [arg.strip('"') for arg in match.group(2).split(",") if arg.strip()]
+        return (OP_CALL, match.group(1), args_values)
+    return None
+
+
+def _parse_print(line, rest):
+    if len(rest) >= 2 and rest[0] == '"' and rest[-1] == '"':
+        return (OP_PRINT, rest[1:-1])
+    return None
+
+
+END = (OP_END,)
+
+KEYWORDS = {
+    "msx": _parse_msx,
+    "function": _parse_function,
+    "call": _parse_call,
+    "print": _parse_print,
+}
+
+
+def split_lines(text):
+    # Same line boundaries as reading the file in text mode
+    return text.replace("\r\n", "\n").replace("\r", "\n").split("\n")
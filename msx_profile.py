@@ -0,0 +1,174 @@
+# msx_profile.py - per-statement profiler for .msx programs
+#
+#   profiler = Profiler("main.msx")
+#   run_msx_file("main.msx", profiler=profiler)
+#   profiler.print_table()                    # kinds, functions, lines
+#   profiler.write_collapsed("main.folded")   # flamegraph.pl / speedscope input
+#
+# A Profiler is passed to msx_engine's loops as their hook, and they call
+# it back as statements, calls and prints start and finish.
+import sys
+import time
+from msx_parser import OP_MSX, OP_DEF, OP_CALL, OP_PRINT
+
+KIND_NAMES = {OP_MSX: "msx", OP_DEF: "def", OP_CALL: "call", OP_PRINT: "print"}
+
+
+class Profiler:
+    """
+    Collects, for one or more runs:
+      kinds      statement kind -> [count, seconds]   (plus "parse" and "msx <command>")
+      functions  function name  -> [calls, cumulative seconds, self seconds]
+      lines      line number    -> [count, cumulative seconds]
+      stacks     "root;f;g"     -> self seconds, for collapsed-stack output
+    Kind times are the statement's own cost: a "call" is binding the
+    arguments and pushing the frame, and what the callee then runs is
+    counted under its own statements. Line and function cumulative times
+    include everything a call ran; recursive calls are only counted once,
+    at the outermost call.
+    """
+
+    def __init__(self, root="main"):
+        self.root = root
+        self.kinds = {}
+        self.functions = {}
+        self.lines = {}
+        self.stacks = {}
+        self._active = {}  # function name -> frames currently on the stack
+        # Per open frame of the running call: when it was called, the line
+        # of the call inside its caller (None at top level) and its
+        # collapsed-stack key
+        self._starts = []
+        self._call_lines = []
+        self._keys = []
+
+    # ----------------------
+    # Recording
+    # ----------------------
+    def add(self, table, key, seconds, count=1):
+        entry = table.get(key)
+        if entry is None:
+            table[key] = [count, seconds]
+        else:
+            entry[0] += count
+            entry[1] += seconds
+
+    def add_stack(self, stack_key, seconds):
+        self.stacks[stack_key] = self.stacks.get(stack_key, 0.0) + seconds
+
+    def enter(self, name):
+        self._active[name] = self._active.get(name, 0) + 1
+        entry = self.functions.get(name)
+        if entry is None:
+            self.functions[name] = [1, 0.0, 0.0]
+        else:
+            entry[0] += 1
+
+    def leave(self, name, seconds):
+        depth = self._active[name] - 1
+        self._active[name] = depth
+        if depth == 0:
+            self.functions[name][1] += seconds
+
+    def add_self(self, name, seconds):
+        self.functions[name][2] += seconds
+
+    # ----------------------
+    # msx_engine hook
+    # ----------------------
+    def statement(self, stmt, start):
+        """A top-level statement that began at `start` has finished."""
+        elapsed = time.perf_counter() - start
+        kind = stmt[0]
+        if kind == OP_CALL:
+            # enter_call recorded the call itself; the line gets the whole run
+            self.add(self.lines, stmt[1], elapsed)
+            return
+        stack_key = self.root
+        self.add(self.kinds, KIND_NAMES.get(kind, "unknown"), elapsed)
+        if kind == OP_MSX:
+            command = msx_command_name(stmt[2])
+            self.add(self.kinds, command, elapsed)
+            stack_key = f"{self.root};{command}"
+        self.add(self.lines, stmt[1], elapsed)
+        self.add_stack(stack_key, elapsed)
+
+    def enter_call(self, name, caller, lineno, start):
+        """`caller` (None at top level) called `name` at `lineno`; binding it began at `start`."""
+        elapsed = time.perf_counter() - start
+        self.add(self.kinds, "call", elapsed)
+        if caller is None:
+            self.add_stack(self.root, elapsed)
+            self._starts = [start]
+            self._call_lines = [None]
+            self._keys = [f"{self.root};{name}"]
+        else:
+            self.add_self(caller, elapsed)
+            self.add_stack(self._keys[-1], elapsed)
+            self._starts.append(start)
+            self._call_lines.append(lineno)
+            self._keys.append(f"{self._keys[-1]};{name}")
+        self.enter(name)
+
+    def leave_call(self, name):
+        """The innermost frame, a call of `name`, has returned."""
+        self._keys.pop()
+        elapsed = time.perf_counter() - self._starts.pop()
+        self.leave(name, elapsed)
+        call_line = self._call_lines.pop()
+        if call_line is not None:
+            self.add(self.lines, call_line, elapsed)
+
+    def body_print(self, name, lineno, start):
+        """A print at `lineno` inside `name` that began at `start` has finished."""
+        elapsed = time.perf_counter() - start
+        self.add(self.kinds, "print", elapsed)
+        self.add(self.lines, lineno, elapsed)
+        self.add_self(name, elapsed)
+        self.add_stack(self._keys[-1], elapsed)
+
+    def unwind(self, stack):
+        """Execution stopped on an error: closes the frames of `stack` still open."""
+        now = time.perf_counter()
+        for frame, frame_start in zip(stack, self._starts):
+            self.leave(frame.name, now - frame_start)
+
+    # ----------------------
+    # Output
+    # ----------------------
+    def print_table(self, file=None, limit=20):
+        """Prints the kinds, functions and lines tables, slowest first."""
+        file = file or sys.stderr
+        print("\nStatement kinds:", file=file)
+        print(f"  {'kind':<24} {'count':>10} {'total ms':>12} {'per call us':>12}", file=file)
+        for kind, (count, seconds) in _slowest(self.kinds, limit):
+            print(f"  {kind:<24} {count:>10} {seconds * 1000:>12.3f} {seconds / count * 1e6:>12.2f}", file=file)
+
+        print("\nFunctions:", file=file)
+        print(f"  {'function':<24} {'calls':>10} {'cumulative ms':>14} {'self ms':>12}", file=file)
+        ordered = sorted(self.functions.items(), key=lambda item: -item[1][1])[:limit]
+        for name, (calls, cumulative, own) in ordered:
+            print(f"  {name:<24} {calls:>10} {cumulative * 1000:>14.3f} {own * 1000:>12.3f}", file=file)
+
+        print("\nLines:", file=file)
+        print(f"  {'line':<24} {'count':>10} {'total ms':>12} {'per call us':>12}", file=file)
+        for lineno, (count, seconds) in _slowest(self.lines, limit):
+            print(f"  {lineno:<24} {count:>10} {seconds * 1000:>12.3f} {seconds / count * 1e6:>12.2f}", file=file)
+
+    def write_collapsed(self, path):
+        """Writes "root;f;g <microseconds>" lines, as flamegraph.pl and speedscope read them."""
+        with open(path, "w", encoding="utf-8") as f:
+            for stack_key, seconds in sorted(self.stacks.items()):
+                micros = int(round(seconds * 1e6))
+                if micros:
+                    f.write(f"{stack_key} {micros}\n")
+
+
+def _slowest(table, limit):
+    return sorted(table.items(), key=lambda item: -item[1][1])[:limit]
+
+
+def msx_command_name(line):
+    """Groups MSX statements by their first two words ("msx subscribe", "msx rate")."""
+    return " ".join(line.split()[:2])
+
@@ -0,0 +1,110 @@
+# msx_ratings.py - ratings log with an incrementally maintained aggregate index
+import os
+import json
+from msx_storage import locked, atomic_write
+
+MIN_RATING = 1
+MAX_RATING = 5
+
+
+class RatingsStore:
+    """
+    Ratings are appended to a plain log, one integer per line, and the
+    running count, sum and 1-5 histogram live in a small sidecar index
+    (<log>.idx). The index records how many bytes of the log it covers, so
+    a reader can tell in O(1) whether it is current; when it is behind it
+    catches up from that offset, and it is only rebuilt from scratch when
+    the log was truncated or the index is missing or unreadable.
+    """
+
+    def __init__(self, log_path):
+        self.log_path = log_path
+        self.index_path = log_path + ".idx"
+        self.lock_path = log_path + ".lock"
+
+    # ----------------------
+    # Writes
+    # ----------------------
+    def add(self, rating):
+        with locked(self.lock_path):
+            index = self._current_index()
+            with open(self.log_path, "ab") as f:
+                f.write(f"{rating}\n".encode("ascii"))
+                f.flush()
+                index["log_size"] = f.tell()
+            index["count"] += 1
+            index["sum"] += rating
+            index["histogram"][rating - MIN_RATING] += 1
+            self._write_index(index)
+
+    def clear(self):
+        for path in (self.log_path, self.index_path, self.lock_path):
+            if os.path.exists(path):
+                os.remove(path)
+
+    # ----------------------
+    # Reads
+    # ----------------------
+    def stats(self):
+        """Returns {"count", "sum", "average", "histogram"} without reading the log."""
+        index = self._read_index()
+        if index is None or index["log_size"] != self._log_size():
+            with locked(self.lock_path):
+                index = self._current_index()
+                self._write_index(index)
+        count = index["count"]
+        return {
+            "count": count,
+            "sum": index["sum"],
+            "average": index["sum"] / count if count else 0.0,
+            "histogram": {r: index["histogram"][r - MIN_RATING] for r in range(MIN_RATING, MAX_RATING + 1)},
+        }
+
+    # ----------------------
+    # Index maintenance (callers hold the lock)
+    # ----------------------
+    def _current_index(self):
+        index = self._read_index()
+        log_size = self._log_size()
+        if index is None or index["log_size"] > log_size:
+            index = _empty_index()
+        if index["log_size"] < log_size:
+            self._scan_log(index)
+        return index
+
+    def _scan_log(self, index):
+        with open(self.log_path, "rb") as f:
+            f.seek(index["log_size"])
+            for line in f:
+                try:
+                    rating = int(line)
+                except ValueError:
+                    continue
+                if MIN_RATING <= rating <= MAX_RATING:
+                    index["count"] += 1
+                    index["sum"] += rating
+                    index["histogram"][rating - MIN_RATING] += 1
+            index["log_size"] = f.tell()
+
+    def _read_index(self):
+        try:
+            with open(self.index_path, "r", encoding="utf-8") as f:
+                index = json.load(f)
+            if len(index["histogram"]) != MAX_RATING - MIN_RATING + 1:
+                return None
+            return index
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+
+    def _write_index(self, index):
+        atomic_write(self.index_path, json.dumps(index).encode("utf-8"))
+
+    def _log_size(self):
+        try:
+            return os.path.getsize(self.log_path)
+        except OSError:
+            return 0
+
+
+def _empty_index():
+    return {"count": 0, "sum": 0, "histogram": [0] * (MAX_RATING - MIN_RATING + 1), "log_size": 0}
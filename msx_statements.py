@@ -0,0 +1,121 @@
+# msx_statements.py - registry of "msx ..." statements with word-trie dispatch
+#
+#   from msx_statements import register_statement
+#   register_statement("msx deploy", "my_extension.commands:deploy", prefix=True)
+#
+# Statements are resolved by walking a trie one word at a time, so finding
+# the handler costs the same however many commands are registered. A handler
+# may be given as "module:function"; the module is only imported the first
+# time the statement runs, so registering commands costs nothing at start-up.
+import importlib
+
+# Resolved statements are remembered by their exact text (a script runs the
+# same few lines over and over); the cache is emptied when it gets this big
+RESOLVE_CACHE_SIZE = 4096
+
+
+class _Node:
+    __slots__ = ("children", "exact", "prefix")
+
+    def __init__(self):
+        self.children = {}
+        self.exact = None   # (phrase, handler) for the phrase with no more words
+        self.prefix = None  # (phrase, handler) for the phrase followed by anything
+
+
+class StatementRegistry:
+    """
+    Maps statement phrases ("msx rate stats") to handlers. A handler is
+    called with the words that follow its phrase; an exact phrase only
+    matches with nothing after it, a prefix phrase with anything. The
+    longest matching phrase wins, and returning False from a handler
+    means the statement was not understood after all.
+    """
+
+    def __init__(self):
+        self.root = _Node()
+        self.count = 0
+        self._cache = {}  # line -> (node, slot, args), or None for no match
+
+    def register(self, phrase, handler, prefix=False):
+        """Adds (or replaces) the handler for `phrase`; `handler` is a callable or "module:function"."""
+        words = phrase.split()
+        if not words:
+            raise ValueError("statement phrase is empty")
+        if not callable(handler) and ":" not in str(handler):
+            raise ValueError(f"handler for '{phrase}' must be callable or 'module:function'")
+        node = self.root
+        for word in words:
+            child = node.children.get(word)
+            if child is None:
+                child = node.children[word] = _Node()
+            node = child
+        slot = "prefix" if prefix else "exact"
+        if getattr(node, slot) is None:
+            self.count += 1
+        setattr(node, slot, (" ".join(words), handler))
+        self._cache.clear()
+
+    def resolve(self, words):
+        """Returns (node, slot, number of words matched) for the best match of `words`, or None."""
+        node = self.root
+        best = None
+        for depth, word in enumerate(words, 1):
+            node = node.children.get(word)
+            if node is None:
+                return best
+            if node.prefix is not None:
+                best = (node, "prefix", depth)
+        if node.exact is not None:
+            return node, "exact", len(words)
+        return best
+
+    def dispatch(self, line):
+        """Runs the handler for `line`; returns False if no handler took it."""
+        try:
+            entry = self._cache[line]
+        except KeyError:
+            words = line.split()
+            match = self.resolve(words)
+            entry = None
+            if match is not None:
+                node, slot, depth = match
+                entry = (node, slot, tuple(words[depth:]))
+            if len(self._cache) >= RESOLVE_CACHE_SIZE:
+                self._cache.clear()
+            self._cache[line] = entry
+        if entry is None:
+            return False
+        node, slot, args = entry
+        phrase, handler = getattr(node, slot)
+        if not callable(handler):
+            handler = _load_handler(handler)
+            setattr(node, slot, (phrase, handler))
+        return handler(args) is not False
+
+    def phrases(self):
+        """Returns every registered phrase, sorted; prefix phrases end with " ..."."""
+        found = []
+        stack = [self.root]
+        while stack:
+            node = stack.pop()
+            if node.exact is not None:
+                found.append(node.exact[0])
+            if node.prefix is not None:
+                found.append(node.prefix[0] + " ...")
+            stack.extend(node.children.values())
+        return sorted(found)
+
+
+def _load_handler(spec):
+    module_name, _, attr = spec.partition(":")
+    return getattr(importlib.import_module(module_name), attr)
+
+
+# The registry runner.handle_msx_statement dispatches through
+REGISTRY = StatementRegistry()
+
+
+def register_statement(phrase, handler, prefix=False):
+    """Registers an "msx ..." statement with the runner; see StatementRegistry.register."""
+    REGISTRY.register(phrase, handler, prefix)
@@ -0,0 +1,43 @@
+# msx_storage.py - file locking and atomic replacement shared by the MSX stores
+import os
+from contextlib import contextmanager
+
+# Caches that skip files by size and mtime only trust files last modified
+# at least this long before the cache was written: a file changed again
+# within the filesystem's timestamp granularity keeps the same mtime
+RACY_WINDOW_NS = 2 * 10**9
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+
+@contextmanager
+def locked(lock_path):
+    """Holds an exclusive lock on `lock_path` (created if missing)."""
+    with open(lock_path, "a+b") as f:
+        if fcntl:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        else:
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            if fcntl:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def atomic_write(path, data):
+    """Replaces `path` with `data` (bytes) so readers see the old or the new file, never a mix."""
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
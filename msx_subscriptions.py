@@ -0,0 +1,168 @@
+# msx_subscriptions.py - per-user subscription store with heap-ordered expiry
+import os
+import time
+import heapq
+from msx_storage import locked, atomic_write
+
+# Subscriptions made without naming a user, and the one held by an old
+# single-subscription subs.msx file
+DEFAULT_USER = "default"
+
+# Compact once the journal holds this many more lines than live subscriptions
+COMPACT_SLACK = 1024
+
+
+class SubscriptionStore:
+    """
+    Subscriptions keyed by user, stored as an append-only journal:
+        set <user> <duration_hours> <start_timestamp>
+        del <user>
+    The journal is replayed into a dict, so lookups are O(1), and a min-heap
+    of expiry times, so a sweep only pops what has expired. Each append is
+    fsynced under a lock, and a torn last line is ignored on replay. Once
+    dead lines pile up the journal is rewritten and swapped in atomically.
+    Other processes' writes are picked up by replaying from the last offset
+    read, so a long-lived store never re-reads the whole file.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.lock_path = path + ".lock"
+        self._reset()
+
+    def _reset(self):
+        self.subs = {}  # user -> (duration_hours, start_timestamp)
+        self._heap = []  # (expires_at, user, start_timestamp); stale entries skipped on pop
+        self._offset = 0
+        self._file_id = None
+        self._journal_lines = 0
+        self._legacy = False
+
+    # ----------------------
+    # Reads
+    # ----------------------
+    def refresh(self):
+        """Brings the in-memory state up to date with the journal on disk."""
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            self._reset()
+            return
+        file_id = (st.st_dev, st.st_ino)
+        if file_id != self._file_id or st.st_size < self._offset:
+            self._reset()
+            self._file_id = file_id
+        if st.st_size > self._offset:
+            self._replay()
+
+    def get(self, user):
+        """Returns (duration_hours, start_timestamp) for `user`, or None."""
+        self.refresh()
+        return self.subs.get(user)
+
+    def __len__(self):
+        return len(self.subs)
+
+    def _replay(self):
+        with open(self.path, "rb") as f:
+            f.seek(self._offset)
+            data = f.read()
+        if self._offset == 0 and data[:data.find(b"\n")].find(b"=") != -1:
+            self._load_legacy(data)
+            return
+        end = data.rfind(b"\n") + 1  # leave a torn last line for later
+        for line in data[:end].decode("utf-8").splitlines():
+            self._apply(line.split())
+        self._offset += end
+
+    def _load_legacy(self, data):
+        values = {}
+        for line in data.decode("utf-8").splitlines():
+            if "=" in line:
+                key, val = line.strip().split("=")
+                values[key] = int(val)
+        self._apply(["set", DEFAULT_USER, str(values.get("duration_hours", 0)), str(values.get("start_timestamp", 0))])
+        self._offset = len(data)
+        self._legacy = True
+
+    def _apply(self, fields):
+        if len(fields) == 4 and fields[0] == "set":
+            user, duration_hours, start = fields[1], int(fields[2]), int(fields[3])
+            self.subs[user] = (duration_hours, start)
+            heapq.heappush(self._heap, (start + duration_hours * 3600, user, start))
+        elif len(fields) == 2 and fields[0] == "del":
+            self.subs.pop(fields[1], None)
+        else:
+            return
+        self._journal_lines += 1
+
+    # ----------------------
+    # Writes
+    # ----------------------
+    def subscribe(self, user, duration_hours, start_timestamp=None):
+        if start_timestamp is None:
+            start_timestamp = int(time.time())
+        with locked(self.lock_path):
+            self._append([f"set {user} {duration_hours} {start_timestamp}"])
+
+    def remove(self, users):
+        with locked(self.lock_path):
+            self._append([f"del {user}" for user in users])
+
+    def sweep(self, now=None):
+        """Removes every subscription that has expired by `now`; returns their users."""
+        if now is None:
+            now = time.time()
+        with locked(self.lock_path):
+            self.refresh()
+            expired = []
+            heap = self._heap
+            while heap and heap[0][0] <= now:
+                expires_at, user, start = heapq.heappop(heap)
+                current = self.subs.get(user)
+                # Skip entries superseded by a later subscribe or removal
+                if current is not None and current[1] == start and start + current[0] * 3600 == expires_at:
+                    expired.append(user)
+            if expired:
+                self._append(["del " + user for user in expired])
+            return expired
+
+    def clear(self):
+        for path in (self.path, self.lock_path):
+            if os.path.exists(path):
+                os.remove(path)
+        self._reset()
+
+    def _append(self, lines):
+        # Callers hold the lock
+        self.refresh()
+        if self._legacy:
+            self._compact()
+        data = "".join(line + "\n" for line in lines).encode("utf-8")
+        if os.path.exists(self.path) and os.path.getsize(self.path) > self._offset:
+            data = b"\n" + data  # terminate a torn line left by a crashed writer
+        with open(self.path, "ab") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        self.refresh()
+        if self._journal_lines > 2 * len(self.subs) + COMPACT_SLACK:
+            self._compact()
+
+    def _compact(self):
+        lines = [f"set {user} {duration} {start}\n" for user, (duration, start) in self.subs.items()]
+        atomic_write(self.path, "".join(lines).encode("utf-8"))
+        self._reset()
+        self.refresh()
+
+
+# One store per path, kept for the life of the process (e.g. the daemon)
+_stores = {}
+
+
+def open_store(path):
+    path = os.path.abspath(path)
+    store = _stores.get(path)
+    if store is None:
+        store = _stores[path] = SubscriptionStore(path)
+    return store
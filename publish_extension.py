@@ -2,57 +2,114 @@ import os
 import subprocess
 import sys
 
+from msx.scanner import PatternScanner, iter_extension_files
+from msx.artifact import Artifact, ARTIFACT_DIR, MODULE_INDEX_NAME, COMPILE_CACHE_DIR, COMPILED_SUFFIX
+
 # List of suspicious keywords to scan for in extension files
 SUSPICIOUS_KEYWORDS = ["os.system", "subprocess.Popen", "eval", "exec", "open(", "requests"]
+SCANNED_EXTENSIONS = (".py", ".msx", ".js")  # adjust extensions as needed
+# git matches every path against every pathspec, so past this many changed
+# paths a plain `git add -A` over the whole folder is cheaper
+PATHSPEC_LIMIT = 1000
+
+_scanner = PatternScanner(SUSPICIOUS_KEYWORDS)
 
-def scan_for_malicious_code(extension_path):
+def scan_for_malicious_code(extension_path, paths=None):
+    """Scans the whole extension, or only `paths` (relative to it) when given."""
     print(f"Scanning '{extension_path}' for potentially malicious code...")
     issues_found = False
 
-    for root, _, files in os.walk(extension_path):
-        for file in files:
-            if file.endswith((".py", ".msx", ".js")):  # adjust extensions as needed
-                file_path = os.path.join(root, file)
-                try:
-                    with open(file_path, "r", encoding="utf-8") as f:
-                        content = f.read()
-                        for keyword in SUSPICIOUS_KEYWORDS:
-                            if keyword in content:
-                                print(f"⚠ Suspicious keyword '{keyword}' found in {file_path}")
-                                issues_found = True
-                except Exception as e:
-                    print(f"Could not read {file_path}: {e}")
+    if paths is None:
+        paths = iter_extension_files(extension_path, SCANNED_EXTENSIONS)
+    else:
+        paths = [os.path.join(extension_path, p) for p in paths if p.endswith(SCANNED_EXTENSIONS)]
+    for file_path, findings, error in _scanner.scan_files(paths):
+        if error:
+            print(f"Could not read {file_path}: {error}")
+        for line, keyword in findings:
+            print(f"⚠ Suspicious keyword '{keyword}' found in {file_path} line {line}")
+            issues_found = True
 
     if issues_found:
         print("Warning: Potentially unsafe code detected. Review before publishing.")
     else:
         print("No obvious malicious code found.")
 
+def git(extension_path, *args, **kwargs):
+    return subprocess.run(["git", "-C", extension_path] + list(args), check=True, **kwargs)
+
+def git_paths(extension_path, args, paths):
+    """Runs a git command on `paths`, passed on stdin so long lists never hit the argv limit."""
+    return git(extension_path, *args, "--pathspec-from-file=-", "--pathspec-file-nul",
+               input="\0".join(paths).encode("utf-8"))
+
+def exclude_artifact(extension_path):
+    """Keeps the artifact, module index and build caches out of `git status` for the extension repo."""
+    exclude_file = os.path.join(extension_path, ".git", "info", "exclude")
+    try:
+        with open(exclude_file, "r", encoding="utf-8") as f:
+            existing = f.read().splitlines()
+    except OSError:
+        existing = []
+    patterns = [f"/{ARTIFACT_DIR}", f"/{MODULE_INDEX_NAME}", f"{COMPILE_CACHE_DIR}/", f"*{COMPILED_SUFFIX}"]
+    missing = [pattern for pattern in patterns if pattern not in existing]
+    if missing:
+        os.makedirs(os.path.dirname(exclude_file), exist_ok=True)
+        with open(exclude_file, "a", encoding="utf-8") as f:
+            f.write("".join(line + "\n" for line in missing))
+
+def unignored(extension_path, paths):
+    """Drops paths the extension's .gitignore excludes (git add refuses to stage them by name)."""
+    if not paths:
+        return paths
+    result = subprocess.run(["git", "-C", extension_path, "check-ignore", "-z", "--stdin"],
+                            input="\0".join(paths).encode("utf-8"), stdout=subprocess.PIPE)
+    ignored = set(result.stdout.decode("utf-8").split("\0"))
+    return [p for p in paths if p not in ignored]
+
 def publish_extension(extension_path, repo_url):
     if not os.path.exists(extension_path):
         print(f"Error: Extension folder '{extension_path}' not found.")
         return
 
-    # Scan extension for suspicious code
-    scan_for_malicious_code(extension_path)
+    # Build the artifact and find what changed since the last publish
+    artifact = Artifact(extension_path)
+    manifest = artifact.build()
+    changed, removed = artifact.diff(manifest)
+    if not changed and not removed:
+        print(f"Extension '{extension_path}' has not changed since it was last published.")
+        return
+    print(f"{len(changed)} file(s) changed and {len(removed)} removed since the last publish.")
 
-    # Change directory to the extension folder
-    os.chdir(extension_path)
+    # Scan the changed files for suspicious code
+    scan_for_malicious_code(extension_path, changed)
 
     # Initialize git repo if not already
     if not os.path.exists(os.path.join(extension_path, ".git")):
-        subprocess.run(["git", "init"], check=True)
-        subprocess.run(["git", "remote", "add", "origin", repo_url], check=True)
+        git(extension_path, "init", "--quiet")
+        git(extension_path, "symbolic-ref", "HEAD", "refs/heads/main")
+        git(extension_path, "remote", "add", "origin", repo_url)
+    exclude_artifact(extension_path)
 
-    # Add all files
-    subprocess.run(["git", "add", "."], check=True)
+    # Stage only what changed
+    if len(changed) + len(removed) > PATHSPEC_LIMIT:
+        git(extension_path, "add", "-A", "--", ".")
+    else:
+        changed = unignored(extension_path, changed)
+        if changed:
+            git_paths(extension_path, ["add"], changed)
+        if removed:
+            git_paths(extension_path, ["rm", "--cached", "--quiet", "--ignore-unmatch"], removed)
 
     # Commit changes
-    commit_msg = f"Publish {os.path.basename(extension_path)}"
-    subprocess.run(["git", "commit", "-m", commit_msg], check=True)
+    staged = subprocess.run(["git", "-C", extension_path, "diff", "--cached", "--quiet"])
+    if staged.returncode != 0:
+        commit_msg = f"Publish {os.path.basename(os.path.abspath(extension_path))}"
+        git(extension_path, "commit", "--quiet", "-m", commit_msg)
 
     # Push to main branch
-    subprocess.run(["git", "push", "-u", "origin", "main"], check=True)
+    git(extension_path, "push", "--quiet", "-u", "origin", "main")
+    artifact.mark_published(manifest)
 
     print(f"Extension '{extension_path}' published to {repo_url} successfully!")
 
@@ -1,7 +1,12 @@
 import os
-import re
-import json
 import time
+import msx_engine
+from msx_output import emit, get_sink, use_sink
+from msx_compiler import load_program, compile_source, compile_template, iter_statements
+from msx_parser import parse_line, OP_CALL, OP_PRINT
+from msx_subscriptions import open_store, DEFAULT_USER
+from msx_ghost import load_bindings as load_ghost_bindings
+from msx_statements import REGISTRY, register_statement
 
 # ===============================
 # Subscription & rating storage
@@ -10,201 +15,327 @@ SUBS_FILE = "subs.msx"
 RATINGS_FILE = "ratings.msx"
 GHOST_FILE = "ghost.command-fig.json"
 
+# Scripts larger than this (in bytes) are streamed instead of compiled whole
+STREAM_THRESHOLD = 64 * 1024 * 1024
+
+# Function tables of the programs running now, innermost last: an .msx
+# module imported by a program defines its functions in the program's table
+_function_tables = []
+
 # ===============================
 # Core MSX Runner
 # ===============================
-def run_msx_file(path, reset=False):
+def run_msx_file(path, reset=False, use_cache=True, output=None, stream=None, profiler=None):
     """
     Executes a .msx file with support for:
     - print statements
     - function definitions and calls
     - MSX commands including rate, subscription, ghost, restart
+
+    The parsed form is cached in a .msxc file keyed by the source hash;
+    pass use_cache=False to always parse from scratch.
+
+    Output goes to the current msx_output sink, or to `output` if given.
+
+    With stream=True the file is executed while it is being read and only
+    function bodies are kept; stream=None turns this on for files larger
+    than STREAM_THRESHOLD.
+
+    Pass an msx_profile.Profiler as `profiler` to time every statement.
+
+    Returns False if the file is missing or execution stopped on an error.
     """
+    if output is not None:
+        with use_sink(output):
+            return run_msx_file(path, reset, use_cache, stream=stream, profiler=profiler)
+
     if not os.path.exists(path):
-        print(f"Error: File {path} not found.")
-        return
+        emit(f"Error: File {path} not found.")
+        return False
 
+    if stream is None:
+        stream = os.path.getsize(path) > STREAM_THRESHOLD
+    if stream:
+        with open(path, "r", encoding="utf-8") as f:
+            return run_msx_source(f, profiler=profiler)
+    elif not use_cache:
+        with open(path, "r", encoding="utf-8") as f:
+            return run_msx_source(f.read(), profiler=profiler)
+    return execute_program(timed_parse(profiler, load_program, path, use_cache), profiler)
+
+
+def run_msx_source(source, output=None, profiler=None):
+    """
+    Executes MSX source without touching the filesystem. `source` is either
+    the script text or an iterable of lines (an open file, a list, a
+    generator); iterables are executed as they are read and function bodies
+    longer than msx_compiler.SPILL_CHUNK statements are spilled to disk.
+    Returns False if execution stopped on an error.
+    """
+    if output is not None:
+        with use_sink(output):
+            return run_msx_source(source, profiler=profiler)
+
+    if isinstance(source, str):
+        return execute_program(timed_parse(profiler, compile_source, source), profiler)
+    function_table = []
+    # When profiling, parsing is interleaved with execution here, so it is
+    # not timed apart
+    statements = iter_statements(source, function_table, spill=True)
     functions = {}
-    current_func = None
-
-    with open(path, "r", encoding="utf-8") as f:
-        lines = f.readlines()
-
-    for i, line in enumerate(lines):
-        line = line.strip()
-        if not line or line.startswith("#"):
-            continue
-
-        # MSX statements
-        if line.startswith("msx "):
-            handle_msx_statement(line)
-            continue
-
-        # function definition
-        match = re.match(r'^function\s+(\w+)\((.*?)\)\s*{$', line)
-        if match:
-            func_name = match.group(1)
-            args = [a.strip() for a in match.group(2).split(",") if a.strip()]
-            functions[func_name] = {"args": args, "body": []}
-            current_func = func_name
-            continue
-
-        # function end
-        if line == "}":
-            current_func = None
-            continue
-
-        # inside function body
-        if current_func:
-            functions[current_func]["body"].append(line)
-            continue
-
-        # call function
-        match_call = re.match(r'^call\s+(\w+)\((.*?)\)$', line)
-        if match_call:
-            func_name = match_call.group(1)
-            args_values = [arg.strip('"') for arg in match_call.group(2).split(",") if arg.strip()]
-            func = functions.get(func_name)
-            if not func:
-                print(f"Error: Function '{func_name}' not defined at line {i+1}")
-                return
-            local_vars = dict(zip(func["args"], args_values))
-            for body_line in func["body"]:
-                handle_body_line(body_line, local_vars)
-            continue
-
-        # print statement
-        match_print = re.match(r'^print\s+"(.*)"$', line)
-        if match_print:
-            print(match_print.group(1))
-            continue
-
-        print(f"Unknown command at line {i+1}: {line}")
+    _function_tables.append(functions)
+    try:
+        return msx_engine.execute_statements(statements, function_table, handle_msx_statement,
+                                             hook=profiler, functions=functions)
+    finally:
+        _function_tables.pop()
+
+
+def execute_program(program, profiler=None, functions=None):
+    if functions is None:
+        functions = {}
+    _function_tables.append(functions)
+    try:
+        return msx_engine.execute_program(program, handle_msx_statement, hook=profiler, functions=functions)
+    finally:
+        _function_tables.pop()
+
+
+def timed_parse(profiler, parse, *args):
+    """Calls `parse(*args)`, recording the time under "parse" when profiling."""
+    if profiler is None:
+        return parse(*args)
+    start = time.perf_counter()
+    program = parse(*args)
+    profiler.add(profiler.kinds, "parse", time.perf_counter() - start)
+    return program
 
 
 # ===============================
 # Function body execution
 # ===============================
 def handle_body_line(line, local_vars):
+    """
+    Runs a single function-body line on its own. Calls need a function
+    table, so they only run inside a program (see msx_engine.call_function).
+    """
     line = line.strip()
+    if not line:
+        return
+    stmt = parse_line(line)
     # print statements
-    match_print = re.match(r'^print\s+"(.*)"$', line)
-    if match_print:
-        text = match_print.group(1)
-        for var, val in local_vars.items():
-            text = text.replace(f"${var}", val)
-        print(text)
-    # nested function call (optional)
-    match_call = re.match(r'^call\s+(\w+)\((.*?)\)$', line)
-    if match_call:
-        print(f"Nested call detected but not executed: {line}")
+    if stmt[0] == OP_PRINT:
+        params = list(local_vars)
+        emit(compile_template(stmt[1], params).format(*local_vars.values()))
+    # nested function call
+    elif stmt[0] == OP_CALL:
+        emit(f"Nested call detected but not executed: {line}")
 
 
 # ===============================
 # MSX Command Handler
 # ===============================
+# Statements are looked up in msx_statements.REGISTRY, one word at a time;
+# extensions add their own with msx_statements.register_statement.
 def handle_msx_statement(line):
-    line = line.strip()
-    if line == "msx help":
-        print("MSX Help: list of commands...")
-    elif line == "msx export commands list":
-        print("Exporting commands list...")
-    elif line == "msx commands":
-        print("Listing MSX commands...")
-    elif line == "msx terminal":
-        print("Opening MSX terminal...")
-    elif line == "msx double click file commands":
-        run_ghost_commands("double_click")
-    elif line == "msx sign commands":
-        print("Running sign commands...")
-    elif line.startswith("msx extension import from file"):
-        file = line.split()[-1]
-        print(f"Importing extension from {file}...")
-    elif line == "msx import all modules including .js .msx .py .jsx .tsx .json .ts":
-        print("Importing all modules...")
-    elif line == "msx rate":
-        run_rate()
-    elif line == "msx subscription check":
-        check_subscription()
-    elif line.startswith("msx subscribe"):
-        parts = line.split()
-        duration_hours = 24  # default
-        if len(parts) > 2:
-            try:
-                duration_hours = int(parts[2])
-                duration_hours = max(15, min(duration_hours, 72))
-            except:
-                pass
-        subscribe(duration_hours)
-    elif line == "msx restart":
-        reset_extension_state()
-    elif line == "msx create custom subscriptions manager":
-        create_subscription_manager()
-    else:
-        print(f"Unknown MSX statement: {line}")
+    if not REGISTRY.dispatch(line):
+        emit(f"Unknown MSX statement: {line.strip()}")
+
+
+def _say(text):
+    return lambda args: emit(text)
+
+
+def _ghost_statement(args):
+    # msx ghost <type> [key]
+    if len(args) not in (1, 2):
+        return False
+    run_ghost_commands(args[0], args[1] if len(args) > 1 else None)
+
+
+def _import_extension_statement(args):
+    file = args[-1] if args else "file"
+    emit(f"Importing extension from {file}...")
+    loader = module_loader()
+    try:
+        rel, kind, module, first = loader.import_module(file)
+    except FileNotFoundError:
+        emit(f"Error: File {file} not found.")
+        return
+    except (OSError, ValueError) as e:
+        emit(f"Error: Could not import {file}: {e}")
+        return
+    finally:
+        loader.index.save()
+    # An .msx module runs once per version of the file, in the importer's
+    # function table, so its functions can be called after the import;
+    # importing it again only defines them again. Other module types are
+    # only recorded as imported.
+    if kind == ".msx":
+        functions = _function_tables[-1] if _function_tables else {}
+        if first:
+            execute_program(module, functions=functions)
+        else:
+            msx_engine.define_functions(module, functions)
+    if not first:
+        emit(f"{rel} already imported")
+        return
+    emit(f"Imported {rel}")
+
+
+def _import_all_statement(args):
+    emit("Importing all modules...")
+    loader = module_loader()
+    added, changed, removed = loader.index.refresh()
+    loader.index.save()
+    counts = loader.index.counts()
+    summary = ", ".join(f"{counts[kind]} {kind}" for kind in sorted(counts)) or "none"
+    emit(f"Indexed {len(loader.index.entries)} modules ({summary}); "
+         f"{added} new, {changed} changed, {removed} removed")
+
+
+def _check_subscription_statement(args):
+    check_subscription(args[0] if args else DEFAULT_USER)
+
+
+def _subscribe_statement(args):
+    duration_hours = 24  # default
+    if args:
+        try:
+            duration_hours = int(args[0])
+            duration_hours = max(15, min(duration_hours, 72))
+        except ValueError:
+            pass
+    subscribe(duration_hours, args[1] if len(args) > 1 else DEFAULT_USER)
+
+
+# phrase -> (handler, matches longer statements too)
+MSX_STATEMENTS = {
+    "msx help": (_say("MSX Help: list of commands..."), False),
+    "msx export commands list": (_say("Exporting commands list..."), False),
+    "msx commands": (_say("Listing MSX commands..."), False),
+    "msx terminal": (_say("Opening MSX terminal..."), False),
+    "msx double click file commands": (lambda args: run_ghost_commands("double_click"), False),
+    "msx ghost": (_ghost_statement, True),
+    "msx sign commands": (_say("Running sign commands..."), False),
+    "msx extension import from file": (_import_extension_statement, True),
+    "msx import all modules including .js .msx .py .jsx .tsx .json .ts": (_import_all_statement, False),
+    "msx rate": (lambda args: run_rate(), False),
+    "msx rate stats": (lambda args: show_rating_stats(), False),
+    "msx subscription check": (_check_subscription_statement, True),
+    "msx subscription sweep": (lambda args: sweep_subscriptions(), False),
+    "msx subscribe": (_subscribe_statement, True),
+    "msx restart": (lambda args: reset_extension_state(), False),
+    "msx create custom subscriptions manager": (lambda args: create_subscription_manager(), False),
+}
+
+for _phrase, (_handler, _prefix) in MSX_STATEMENTS.items():
+    register_statement(_phrase, _handler, _prefix)
+
+
+# ===============================
+# Module imports
+# ===============================
+# Modules are found through the index in the current folder and loaded on
+# first use (see msx_modules)
+_module_loader = None
+
+
+def module_loader():
+    global _module_loader
+    root = os.getcwd()
+    if _module_loader is None or _module_loader.root != root:
+        from msx_modules import ModuleLoader
+        _module_loader = ModuleLoader(root)
+    return _module_loader
 
 
 # ===============================
 # Rating feature
 # ===============================
+# Prompts go through this so embedders such as msx_daemon can answer them
+read_input = input
+
+
 def run_rate():
-    print("Rate this extension (1-5):")
-    rating = input("Enter your rating: ").strip()
+    from msx_ratings import RatingsStore
+    emit("Rate this extension (1-5):")
+    # Buffered output must reach the terminal before we block on the prompt
+    get_sink().flush()
+    rating = read_input("Enter your rating: ").strip()
     try:
         rating_int = int(rating)
         if 1 <= rating_int <= 5:
-            print(f"Your rating of {rating_int} has been saved!")
-            with open(RATINGS_FILE, "a", encoding="utf-8") as f:
-                f.write(f"{rating_int}\n")
+            emit(f"Your rating of {rating_int} has been saved!")
+            RatingsStore(RATINGS_FILE).add(rating_int)
         else:
-            print("Rating must be between 1 and 5")
-    except:
-        print("Invalid input. Rating not saved.")
+            emit("Rating must be between 1 and 5")
+    except ValueError:
+        emit("Invalid input. Rating not saved.")
+
+
+def show_rating_stats():
+    from msx_ratings import RatingsStore
+    stats = RatingsStore(RATINGS_FILE).stats()
+    if not stats["count"]:
+        emit("No ratings yet.")
+        return
+    emit(f"Ratings: {stats['count']} (average {stats['average']:.2f})")
+    for rating in range(5, 0, -1):
+        emit(f"  {rating}: {stats['histogram'][rating]}")
 
 
 # ===============================
 # Subscription feature
 # ===============================
-def subscribe(duration_hours):
-    start_timestamp = int(time.time())
-    with open(SUBS_FILE, "w", encoding="utf-8") as f:
-        f.write(f"duration_hours={duration_hours}\n")
-        f.write(f"start_timestamp={start_timestamp}\n")
-    print(f"Subscription activated for {duration_hours} hours!")
+# Subscriptions are kept per user in SUBS_FILE (see msx_subscriptions);
+# commands that name no user act on DEFAULT_USER, the old single subscription.
+def subscribe(duration_hours, user=DEFAULT_USER):
+    open_store(SUBS_FILE).subscribe(user, duration_hours)
+    if user == DEFAULT_USER:
+        emit(f"Subscription activated for {duration_hours} hours!")
+    else:
+        emit(f"Subscription activated for {user} for {duration_hours} hours!")
 
 
-def check_subscription():
-    if not os.path.exists(SUBS_FILE):
-        print("No active subscription. Please subscribe to unlock this extension.")
+def check_subscription(user=DEFAULT_USER):
+    store = open_store(SUBS_FILE)
+    sub = store.get(user)
+    if sub is None:
+        emit("No active subscription. Please subscribe to unlock this extension.")
         return False
-    else:
-        data = {}
-        with open(SUBS_FILE, "r", encoding="utf-8") as f:
-            for line in f:
-                if "=" in line:
-                    key, val = line.strip().split("=")
-                    data[key] = int(val)
-        elapsed_hours = (time.time() - data.get("start_timestamp", 0)) / 3600
-        if elapsed_hours > data.get("duration_hours", 0):
-            print("Subscription expired! Restarting extension...")
+    duration_hours, start_timestamp = sub
+    elapsed_hours = (time.time() - start_timestamp) / 3600
+    if elapsed_hours > duration_hours:
+        if user == DEFAULT_USER:
+            emit("Subscription expired! Restarting extension...")
             reset_extension_state()
-            return False
-        remaining = data.get("duration_hours", 0) - elapsed_hours
-        print(f"Subscription active. {remaining:.2f} hours remaining.")
-        return True
+        else:
+            # A named user's expiry removes only that user's record
+            emit(f"Subscription for {user} expired!")
+            store.remove([user])
+        return False
+    remaining = duration_hours - elapsed_hours
+    emit(f"Subscription active. {remaining:.2f} hours remaining.")
+    return True
+
+
+def sweep_subscriptions():
+    expired = open_store(SUBS_FILE).sweep()
+    emit(f"Expired subscriptions removed: {len(expired)}")
+    return expired
 
 
 def reset_extension_state():
-    print("Restarting extension and clearing subscription state...")
-    if os.path.exists(SUBS_FILE):
-        os.remove(SUBS_FILE)
-    if os.path.exists(RATINGS_FILE):
-        os.remove(RATINGS_FILE)
-    print("Extension reset. You must start over.")
+    emit("Restarting extension and clearing subscription state...")
+    open_store(SUBS_FILE).clear()
+    from msx_ratings import RatingsStore
+    RatingsStore(RATINGS_FILE).clear()
+    emit("Extension reset. You must start over.")
 
 
 def create_subscription_manager():
-    print("Creating custom subscription manager...")
+    emit("Creating custom subscription manager...")
     bot_code = """# subscription manager bot
 function manage_subscriptions(user) {
     print "Checking subscription rules for $user..."
@@ -213,23 +344,45 @@ function manage_subscriptions(user) {
     manager_file = "subscription_manager.msx"
     with open(manager_file, "w", encoding="utf-8") as f:
         f.write(bot_code)
-    print(f"Subscription manager created: {manager_file}")
+    emit(f"Subscription manager created: {manager_file}")
 
 
 # ===============================
 # Ghost commands
 # ===============================
-def run_ghost_commands(command_type):
-    if not os.path.exists(GHOST_FILE):
-        print("No ghost commands file found.")
+# Ghost action -> handler. Any other action is only logged.
+GHOST_ACTIONS = {
+    "restart.msx": lambda: reset_extension_state(),
+}
+
+
+def resolve_ghost_action(action):
+    if not isinstance(action, str):
+        return None
+    return GHOST_ACTIONS.get(action)
+
+
+def run_ghost_commands(command_type, key=None):
+    """
+    Runs every binding of `command_type` (e.g. "double_click") from
+    GHOST_FILE, or just the one bound to `key`.
+    """
+    bindings = load_ghost_bindings(GHOST_FILE, resolve_ghost_action)
+    if bindings is None:
+        emit("No ghost commands file found.")
+        return
+    entries = bindings.get(command_type)
+    if not entries:
         return
-    with open(GHOST_FILE, "r", encoding="utf-8") as f:
-        data = json.load(f)
-    if command_type in data:
-        for key, action in data[command_type].items():
-            print(f"Executing ghost command '{key}' -> {action}")
-            if action == "restart.msx":
-                reset_extension_state()
+    if key is not None:
+        if key not in entries:
+            emit(f"No ghost command '{key}' bound for {command_type}")
+            return
+        entries = {key: entries[key]}
+    for key, (action, handler) in entries.items():
+        emit(f"Executing ghost command '{key}' -> {action}")
+        if handler is not None:
+            handler()
 
 
 # ===============================
@@ -0,0 +1,35 @@
+# test_compiler.py - print templates render like the old str.replace chain
+from msx_compiler import compile_template
+
+
+def replace_chain(text, params, values):
+    # What handle_body_line did before templates were precompiled
+    for var, val in dict(zip(params, values)).items():
+        text = text.replace(f"${var}", val)
+    return text
+
+
+def render(text, params, values):
+    return compile_template(text, params).format(*values)
+
+
+def test_prefix_parameter_replaced_first():
+    # $n is replaced before $name is looked at, so $name is left as N + "ame"
+    assert render("hi $name, $n", ["n", "name"], ["N", "NAME"]) == "hi Name, N"
+
+
+def test_longer_parameter_first():
+    assert render("hi $name, $n", ["name", "n"], ["NAME", "N"]) == "hi NAME, N"
+
+
+def test_matches_replace_chain():
+    cases = [
+        ("$a$a $ab $abc", ["a", "ab"], ["1", "2"]),
+        ("$ab $a", ["ab", "a"], ["1", "2"]),
+        ("{braces} $x {$x}", ["x"], ["v"]),
+        ("$x $y", ["x", "x"], ["1", "2"]),
+        ("no placeholders", ["a"], ["1"]),
+        ("$ alone", ["a"], ["1"]),
+    ]
+    for text, params, values in cases:
+        assert render(text, params, values) == replace_chain(text, params, values), text
@@ -0,0 +1,84 @@
+# test_daemon.py - bad requests, vanished clients and untrusted socket folders
+import json
+import socket
+import threading
+
+import pytest
+
+import runner
+import msx_daemon
+from msx_daemon import MSXDaemon, daemon_running, stop_daemon
+from msx_output import CaptureSink, use_sink
+
+if not hasattr(socket, "AF_UNIX"):
+    pytest.skip("the daemon needs Unix sockets", allow_module_level=True)
+
+
+@pytest.fixture
+def daemon(tmp_path):
+    socket_path = str(tmp_path / "msx.sock")
+    server = MSXDaemon(socket_path)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    for _ in range(500):
+        if daemon_running(socket_path):
+            break
+        thread.join(0.01)
+    yield socket_path
+    stop_daemon(socket_path)
+    thread.join(5)
+    assert not thread.is_alive()
+
+
+def raw_request(socket_path, data):
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.connect(socket_path)
+        sock.sendall(data)
+        with sock.makefile("r", encoding="utf-8") as rfile:
+            return [json.loads(line) for line in rfile]
+
+
+def test_invalid_json_gets_an_error_reply(daemon):
+    assert raw_request(daemon, b"{not json\n") == [{"error": "invalid request"}, {"done": True}]
+    assert raw_request(daemon, b"[1, 2]\n") == [{"error": "invalid request"}, {"done": True}]
+    assert daemon_running(daemon)
+
+
+def test_client_that_disconnects_mid_request(daemon, tmp_path):
+    script = tmp_path / "loud.msx"
+    script.write_text("".join(f'print "line {i}"\n' for i in range(200000)), encoding="utf-8")
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.connect(daemon)
+        request = {"op": "run", "path": str(script), "cwd": str(tmp_path)}
+        sock.sendall((json.dumps(request) + "\n").encode("utf-8"))
+        sock.recv(1)
+    # Writing the rest of the output fails with a broken pipe; the daemon carries on
+    assert daemon_running(daemon)
+    assert raw_request(daemon, b'{"op": "ping"}\n') == [{"done": True}]
+
+
+def test_socket_folder_open_to_others_is_not_trusted(tmp_path, capsys):
+    shared = tmp_path / "shared"
+    shared.mkdir(mode=0o755)
+    shared.chmod(0o755)
+    socket_path = str(shared / "msx.sock")
+    MSXDaemon(socket_path).serve_forever()
+    assert "refusing to start" in capsys.readouterr().out
+    # A socket someone else put there is not connected to
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as impostor:
+        impostor.bind(socket_path)
+        impostor.listen()
+        assert not daemon_running(socket_path)
+    assert "not using the MSX daemon" in capsys.readouterr().err
+
+
+def test_parsed_programs_are_bounded(tmp_path, monkeypatch):
+    monkeypatch.setattr(msx_daemon, "PROGRAM_CACHE_SIZE", 3)
+    server = MSXDaemon(str(tmp_path / "msx.sock"))
+    server.runner = runner
+    with use_sink(CaptureSink()):
+        for n in range(5):
+            script = tmp_path / f"s{n}.msx"
+            script.write_text(f'print "{n}"\n')
+            server.run_file(str(script), use_cache=False)
+    assert list(server.programs) == [str(tmp_path / f"s{n}.msx") for n in (2, 3, 4)]
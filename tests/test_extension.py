@@ -0,0 +1,54 @@
+# test_extension.py - bulk creation copies editable files and checks names
+import os
+import sys
+import subprocess
+
+import pytest
+
+from msx.extension import create_extensions, extension_names
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_only_binary_assets_are_linked(tmp_path, monkeypatch):
+    template = tmp_path / "template"
+    (template / "assets").mkdir(parents=True)
+    (template / "main.msx").write_text('print "hi"\n')
+    (template / "notes.rst").write_text("notes\n")
+    (template / "assets" / "logo.PNG").write_bytes(b"\x89PNG")
+    monkeypatch.chdir(tmp_path)
+    assert create_extensions(["one"], template=str(template), jobs=1) == {}
+
+    def same_file(rel):
+        return os.stat(template / rel).st_ino == os.stat(tmp_path / "one" / rel).st_ino
+    assert same_file("assets/logo.PNG")
+    assert not same_file("main.msx")
+    assert not same_file("notes.rst")
+
+
+def test_names_from_list_skip_indented_comments(tmp_path):
+    names = tmp_path / "names.txt"
+    names.write_text("alpha\n\n   # indented comment\n# comment\n  beta  \n")
+    assert extension_names(from_list=str(names)) == ["alpha", "beta"]
+
+
+@pytest.mark.parametrize("line", ["../escape", "a/b", "a\\b", "/tmp/abs", "..", "."])
+def test_names_that_are_not_plain_folders_are_rejected(tmp_path, line):
+    names = tmp_path / "names.txt"
+    names.write_text(f"ok\n{line}\n")
+    with pytest.raises(ValueError):
+        extension_names(from_list=str(names))
+    with pytest.raises(ValueError):
+        extension_names(line)
+
+
+@pytest.mark.parametrize("count", [0, -3])
+def test_count_below_one_is_rejected(tmp_path, count):
+    with pytest.raises(ValueError):
+        extension_names("ext", count)
+    result = subprocess.run([sys.executable, "-m", "msx.cli", "create-extension", "ext", "--count", str(count)],
+                            cwd=tmp_path, env=dict(os.environ, PYTHONPATH=REPO_ROOT),
+                            stdout=subprocess.PIPE, text=True)
+    assert result.returncode == 1
+    assert result.stdout.startswith("Error: --count must be at least 1")
+    assert os.listdir(tmp_path) == []
@@ -0,0 +1,77 @@
+# test_ghost.py - ghost bindings are parsed once and follow the config file
+import json
+import os
+
+import pytest
+
+import msx_ghost
+import runner
+from msx_output import CaptureSink, use_sink
+
+
+@pytest.fixture(autouse=True)
+def fresh_cache():
+    msx_ghost.clear_cache()
+    yield
+    msx_ghost.clear_cache()
+
+
+def write_config(path, data, mtime_ns=None):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f)
+    if mtime_ns is not None:
+        os.utime(path, ns=(mtime_ns, mtime_ns))
+
+
+def counting_resolver(calls):
+    def resolve(action):
+        calls.append(action)
+        return runner.resolve_ghost_action(action)
+    return resolve
+
+
+def test_bindings_are_parsed_once_until_the_file_changes(tmp_path):
+    path = str(tmp_path / runner.GHOST_FILE)
+    write_config(path, {"key_press": {"F5": "refresh"}}, mtime_ns=10**18)
+    calls = []
+    first = msx_ghost.load_bindings(path, counting_resolver(calls))
+    assert msx_ghost.load_bindings(path, counting_resolver(calls)) is first
+    assert calls == ["refresh"]
+
+    write_config(path, {"key_press": {"F5": "refresh", "F6": "restart.msx"}}, mtime_ns=10**18 + 1)
+    bindings = msx_ghost.load_bindings(path, counting_resolver(calls))
+    assert sorted(bindings["key_press"]) == ["F5", "F6"]
+    assert bindings["key_press"]["F6"][1] is not None
+    assert len(calls) == 3
+
+
+def test_deleted_config_drops_the_cache_entry(tmp_path):
+    path = str(tmp_path / runner.GHOST_FILE)
+    write_config(path, {"double_click": {"a": "log"}})
+    assert msx_ghost.load_bindings(path, runner.resolve_ghost_action) is not None
+    os.remove(path)
+    assert msx_ghost.load_bindings(path, runner.resolve_ghost_action) is None
+    assert os.path.abspath(path) not in msx_ghost._cache
+
+
+def test_only_restart_runs_a_handler(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    write_config(runner.GHOST_FILE, {"double_click": {"reset": "restart.msx", "open": "open.msx"},
+                                     "key_press": {"F5": "refresh", "bad": 3}})
+    with use_sink(CaptureSink()) as sink:
+        runner.run_ghost_commands("key_press")
+        runner.run_ghost_commands("key_press", "F9")
+    assert sink.lines == ["Executing ghost command 'F5' -> refresh",
+                          "Executing ghost command 'bad' -> 3",
+                          "No ghost command 'F9' bound for key_press"]
+    with use_sink(CaptureSink()) as sink:
+        runner.run_ghost_commands("double_click", "reset")
+    assert sink.lines[0] == "Executing ghost command 'reset' -> restart.msx"
+    assert "Extension reset. You must start over." in sink.lines
+
+
+def test_missing_config_is_reported(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    with use_sink(CaptureSink()) as sink:
+        runner.run_ghost_commands("double_click")
+    assert sink.lines == ["No ghost commands file found."]
@@ -0,0 +1,62 @@
+# test_mini.py - builds package the compiled artifacts and never damage what they copy from
+import os
+
+from mini_interpreter import MiniInterpreter, _clone_file
+from msx_output import CaptureSink, use_sink
+
+SOURCE = "# a comment\n\nset_repeat true   \n" + "change_ton 5\n" * 10
+COMPILED = "set_repeat true\n" + "change_ton 5\n" * 10
+
+
+def test_copy_over_a_hard_link_keeps_the_source(tmp_path):
+    src = tmp_path / "page.mini"
+    dst = tmp_path / "page_local.mini"
+    src.write_bytes(b"set_repeat true\n" * 1000)
+    os.link(src, dst)  # what a hard-linked output of an older build leaves behind
+    _clone_file(str(src), str(dst))
+    assert src.read_bytes() == b"set_repeat true\n" * 1000
+    assert dst.read_bytes() == src.read_bytes()
+    assert os.stat(src).st_ino != os.stat(dst).st_ino
+    assert sorted(os.listdir(tmp_path)) == ["page.mini", "page_local.mini"]
+
+
+def make_project(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "a.mini").write_text(SOURCE)
+    (tmp_path / "b.mini").write_text(SOURCE.replace("5", "6"))
+    (tmp_path / "huge.mini").write_text("change_ton 5\n" * 200)
+    mini = MiniInterpreter()
+    mini.set_output_format("quiet")
+    return mini
+
+
+def test_local_build_copies_compiled_artifacts(tmp_path, monkeypatch):
+    mini = make_project(tmp_path, monkeypatch)
+    mini.build("out")
+    assert sorted(os.listdir(tmp_path / "out_local")) == [".mini-manifest.json", "a.mini", "b.mini"]
+    assert (tmp_path / "out_local" / "a.mini").read_text() == COMPILED
+    assert [e["code"] for e in mini.error_log] == [106]
+
+    mini.set_output_format("text")
+    with use_sink(CaptureSink()) as sink:
+        mini.build("out")
+    assert sink.lines[-1] == "[BUILD] Local build completed: out_local (0 copied, 0 removed, 2 unchanged)"
+
+    (tmp_path / "b.mini").write_text(SOURCE + "set_recombine true\n")
+    os.remove(tmp_path / "a.mini")
+    with use_sink(CaptureSink()) as sink:
+        mini.build("out")
+    assert sink.lines[-1] == "[BUILD] Local build completed: out_local (1 copied, 1 removed, 0 unchanged)"
+    assert (tmp_path / "out_local" / "b.mini").read_text() == COMPILED + "set_recombine true\n"
+
+
+def test_web_build_bundles_compiled_artifacts(tmp_path, monkeypatch):
+    mini = make_project(tmp_path, monkeypatch)
+    mini.choose_mode(".minitron")
+    mini.build("out")
+    bundle = (tmp_path / "out.minitron").read_text()
+    assert bundle == f"# From a.mini\n{COMPILED}\n\n# From b.mini\n{COMPILED.replace('5', '6')}\n\n"
+    mini.set_output_format("text")
+    with use_sink(CaptureSink()) as sink:
+        mini.build("out")
+    assert sink.lines[-1] == "[BUILD] Web build up to date: out.minitron"
@@ -0,0 +1,90 @@
+# test_mini_batch.py - batch scripts, output formats and error codes
+import io
+import os
+import sys
+import json
+import subprocess
+
+import mini_interpreter
+from mini_interpreter import MiniInterpreter
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SCRIPT = """# settings
+set_repeat true
+
+change_ton abc
+change_ton 7
+no_such_command
+compile huge.mini
+exit
+change_ton 9
+"""
+
+
+def run(mini, script, capsys):
+    # run_batch buffers its own output to stdout
+    capsys.readouterr()
+    result = mini.run_batch(io.StringIO(script))
+    return result, capsys.readouterr().out.splitlines()
+
+
+def test_batch_skips_comments_and_stops_at_exit(tmp_path, monkeypatch, capsys):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "huge.mini").write_text("change_ton 5\n" * 200)
+    mini = MiniInterpreter()
+    (commands, errors), lines = run(mini, SCRIPT, capsys)
+    assert (commands, errors) == (5, 3)
+    assert mini.ton == 7 and mini.repeat is True
+    assert [e["code"] for e in mini.error_log] == [103, 102, 106]
+    assert "[ERROR 103] Invalid argument: change_ton abc" in lines
+    assert "[ERROR 106] huge.mini is 2600 bytes, above the maximum of 1000" in lines
+
+
+def test_json_output_is_one_object_per_line(tmp_path, monkeypatch, capsys):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "huge.mini").write_text("change_ton 5\n" * 200)
+    mini = MiniInterpreter()
+    mini.set_output_format("json")
+    _, lines = run(mini, SCRIPT, capsys)
+    records = [json.loads(line) for line in lines]
+    assert [r["level"] for r in records] == ["info", "error", "info", "error", "error", "compile"]
+    assert [r["code"] for r in records if r["level"] == "error"] == [103, 102, 106]
+    _, lines = run(mini, "show_errors\n", capsys)
+    summary = json.loads(lines[0])
+    assert summary["total"] == 3
+    assert summary["counts"] == {"102": 1, "103": 1, "106": 1}
+
+
+def test_quiet_output_only_reports_errors(capsys):
+    mini = MiniInterpreter()
+    mini.set_output_format("quiet")
+    _, lines = run(mini, "set_repeat true\nchange_ton x\nchange_ton 3\n", capsys)
+    assert lines == ["[ERROR 103] Invalid argument: change_ton x"]
+
+
+def test_error_log_keeps_the_most_recent_errors(monkeypatch, capsys):
+    monkeypatch.setattr(mini_interpreter, "ERROR_LOG_SIZE", 2)
+    mini = MiniInterpreter()
+    mini.set_output_format("quiet")
+    run(mini, "change_ton a\nchange_ton b\nbogus\n", capsys)
+    _, lines = run(mini, "show_errors\n", capsys)
+    assert lines == ["(1 older errors not kept)",
+                     "Error 103: Invalid argument: change_ton b",
+                     "Error 102: Unknown command: bogus",
+                     "Error 102: 1 total",
+                     "Error 103: 2 total"]
+
+
+def test_cli_exits_1_on_errors(tmp_path):
+    script = tmp_path / "commands.mini"
+    script.write_text("set_repeat true\nchange_ton abc\n")
+    result = subprocess.run([sys.executable, os.path.join(REPO_ROOT, "mini_interpreter.py"), "--json", str(script)],
+                            cwd=tmp_path, stdout=subprocess.PIPE, text=True)
+    assert result.returncode == 1
+    summary = json.loads(result.stdout.splitlines()[-1])
+    assert summary == {"level": "summary", "commands": 2, "errors": 1, "counts": {"103": 1}}
+    script.write_text("set_repeat true\n")
+    result = subprocess.run([sys.executable, os.path.join(REPO_ROOT, "mini_interpreter.py"), "--quiet", str(script)],
+                            cwd=tmp_path, stdout=subprocess.PIPE, text=True)
+    assert (result.returncode, result.stdout) == (0, "")
@@ -0,0 +1,121 @@
+# test_modules.py - the module index only re-lists changed folders,
+# modules cannot be loaded from outside the root, and imported functions
+# can be called
+import os
+import time
+
+import pytest
+
+import msx_modules
+import runner
+from msx_modules import ModuleIndex, ModuleLoader
+from msx_output import CaptureSink, use_sink
+
+
+def make_tree(root, age=3600):
+    old = time.time() - age
+    for folder in ("a", "b", "b/c"):
+        os.makedirs(os.path.join(root, folder))
+        with open(os.path.join(root, folder, "mod.msx"), "w", encoding="utf-8") as f:
+            f.write('print "hi"\n')
+    for folder in ("b/c", "b", "a"):
+        path = os.path.join(root, folder)
+        os.utime(os.path.join(path, "mod.msx"), (old, old))
+        os.utime(path, (old, old))
+
+
+def counting_scandir(monkeypatch):
+    listed = []
+    real = os.scandir
+
+    def scandir(path):
+        listed.append(path)
+        return real(path)
+    monkeypatch.setattr(msx_modules.os, "scandir", scandir)
+    return listed
+
+
+def test_refresh_lists_only_changed_folders(tmp_path, monkeypatch):
+    root = str(tmp_path)
+    make_tree(root)
+    index = ModuleIndex(root)
+    assert index.refresh() == (3, 0, 0)
+    assert index.save()
+
+    listed = counting_scandir(monkeypatch)
+    index = ModuleIndex(root)
+    assert index.refresh() == (0, 0, 0)
+    assert listed == [root]
+
+    with open(os.path.join(root, "b", "new.msx"), "w", encoding="utf-8") as f:
+        f.write('print "new"\n')
+    os.remove(os.path.join(root, "a", "mod.msx"))
+    del listed[:]
+    assert index.refresh() == (1, 0, 1)
+    assert sorted(listed) == sorted([root, os.path.join(root, "a"), os.path.join(root, "b")])
+    assert sorted(index.entries) == ["b/c/mod.msx", "b/mod.msx", "b/new.msx"]
+
+
+def test_load_rejects_names_outside_the_root(tmp_path):
+    root = tmp_path / "root"
+    root.mkdir()
+    (tmp_path / "outside.msx").write_text('print "outside"\n')
+    loader = ModuleLoader(str(root))
+    for name in ("../outside.msx", "a/../../outside.msx", str(tmp_path / "outside.msx")):
+        with pytest.raises(ValueError):
+            loader.load(name)
+
+
+def test_symlinks_cannot_lead_outside_the_root(tmp_path):
+    root = tmp_path / "root"
+    (root / "lib").mkdir(parents=True)
+    (root / "lib" / "mod.msx").write_text('print "inside"\n')
+    outside = tmp_path / "outside"
+    outside.mkdir()
+    (outside / "mod.msx").write_text('print "outside"\n')
+    (root / "secret.msx").symlink_to(outside / "mod.msx")
+    (root / "ext").symlink_to(outside)
+    (root / "alias.msx").symlink_to(root / "lib" / "mod.msx")
+    loader = ModuleLoader(str(root))
+    for name in ("secret.msx", "ext/mod.msx", str(root / "ext" / "mod.msx")):
+        with pytest.raises(ValueError):
+            loader.load(name)
+    assert loader.load("alias.msx")[0] == "lib/mod.msx"
+
+    # A folder swapped for a link after the name was resolved
+    assert loader.load("lib/mod.msx")[0] == "lib/mod.msx"
+    os.rename(root / "lib", tmp_path / "old-lib")
+    (root / "lib").symlink_to(outside)
+    with pytest.raises(ValueError):
+        loader.load("lib/mod.msx")
+
+
+def test_imported_functions_can_be_called(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "lib.msx").write_text('print "lib loaded"\nfunction greet(name) {\n    print "hi $name"\n}\n')
+    (tmp_path / "main.msx").write_text(
+        'msx extension import from file lib.msx\ncall greet("ada")\n'
+        'msx extension import from file lib.msx\ncall greet("bob")\n')
+    with use_sink(CaptureSink()) as sink:
+        assert runner.run_msx_file("main.msx") is True
+        # Run again in the same process: the module is not rerun but its
+        # functions are defined for this program too
+        assert runner.run_msx_file("main.msx") is True
+        assert runner.run_msx_source('call greet("eve")\n') is False
+    assert sink.lines == [
+        "Importing extension from lib.msx...", "lib loaded", "Imported lib.msx", "hi ada",
+        "Importing extension from lib.msx...", "lib.msx already imported", "hi bob",
+        "Importing extension from lib.msx...", "lib.msx already imported", "hi ada",
+        "Importing extension from lib.msx...", "lib.msx already imported", "hi bob",
+        "Error: Function 'greet' not defined at line 1",
+    ]
+
+
+def test_other_module_types_are_not_read(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "data.json").write_text("{not json")
+    with use_sink(CaptureSink()) as sink:
+        runner.handle_msx_statement("msx extension import from file data.json")
+        runner.handle_msx_statement("msx extension import from file data.json")
+    assert sink.lines == ["Importing extension from data.json...", "Imported data.json",
+                          "Importing extension from data.json...", "data.json already imported"]
@@ -0,0 +1,72 @@
+# test_output.py - runner output goes to the current sink, in order
+import io
+
+import runner
+from msx_output import BufferedSink, CaptureSink, NullSink, StdoutSink, get_sink, use_sink
+
+
+class CountingStream(io.StringIO):
+    def __init__(self):
+        super().__init__()
+        self.writes = 0
+
+    def write(self, text):
+        self.writes += 1
+        return super().write(text)
+
+
+def test_buffered_sink_batches_writes_and_keeps_order():
+    stream = CountingStream()
+    sink = BufferedSink(stream, flush_size=100, flush_interval=3600)
+    for n in range(50):
+        sink.write_line(f"line {n}")
+    assert stream.writes < 10
+    sink.flush()
+    assert stream.getvalue() == "".join(f"line {n}\n" for n in range(50))
+
+
+def test_buffered_sink_flushes_after_the_interval():
+    stream = io.StringIO()
+    sink = BufferedSink(stream, flush_size=1 << 20, flush_interval=0)
+    sink.write_line("now")
+    assert stream.getvalue() == "now\n"
+
+
+def test_use_sink_captures_a_run_and_restores_the_previous_sink():
+    previous = get_sink()
+    source = 'function hi(name) {\n    print "hi $name"\n}\nprint "top"\ncall hi("ada")\nmsx help\n'
+    with use_sink(CaptureSink()) as sink:
+        runner.run_msx_source(source)
+    assert sink.lines == ["top", "hi ada", "MSX Help: list of commands..."]
+    assert get_sink() is previous
+
+
+def test_output_argument_and_null_sink(capsys):
+    capture = CaptureSink()
+    assert runner.run_msx_source('print "kept"\n', output=capture) is True
+    runner.run_msx_source('print "dropped"\n', output=NullSink())
+    assert capture.getvalue() == "kept\n"
+    assert capsys.readouterr().out == ""
+
+
+def test_stdout_sink_prints_lines(capsys):
+    with use_sink(StdoutSink()):
+        runner.run_msx_source('print "to stdout"\n')
+    assert capsys.readouterr().out == "to stdout\n"
+
+
+def test_previous_sink_is_restored_when_the_flush_fails():
+    class BrokenStream:
+        def write(self, text):
+            raise BrokenPipeError(32, "Broken pipe")
+
+        def flush(self):
+            pass
+
+    previous = get_sink()
+    try:
+        with use_sink(BufferedSink(BrokenStream(), flush_interval=3600)):
+            runner.run_msx_source('print "lost"\n')
+    except BrokenPipeError:
+        pass
+    assert get_sink() is previous
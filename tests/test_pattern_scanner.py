@@ -0,0 +1,54 @@
+# test_pattern_scanner.py - matches are found across chunk and mapping boundaries
+import mmap
+
+import pytest
+
+import msx.scanner as scanner
+from msx.scanner import PatternScanner
+
+PATTERNS = ["subprocess", "subprocess.Popen", "eval("]
+
+
+def make_source(lines):
+    """Returns (bytes, expected findings) for a file with a match on each of `lines`."""
+    out = []
+    expected = []
+    for n in range(1, 201):
+        if n in lines:
+            out.append(b"x = subprocess.Popen(eval(y))\n")
+            expected += [(n, "subprocess"), (n, "subprocess.Popen"), (n, "eval(")]
+        else:
+            out.append(b"print('padding line %d')\n" % n)
+    return b"".join(out), expected
+
+
+def test_overlapping_patterns_are_all_reported():
+    data, expected = make_source({1, 7, 200})
+    assert PatternScanner(PATTERNS).scan_bytes(data) == expected
+
+
+@pytest.mark.parametrize("chunk_size", [1, 7, 16, 29, 64])
+def test_chunked_reads_find_matches_split_across_chunks(tmp_path, monkeypatch, chunk_size):
+    monkeypatch.setattr(scanner, "CHUNK_SIZE", chunk_size)
+    data, expected = make_source({1, 2, 50, 51, 199, 200})
+    path = tmp_path / "big.py"
+    path.write_bytes(data)
+    with open(path, "rb") as f:
+        assert PatternScanner(PATTERNS)._scan_chunks(f) == expected
+
+
+def test_mapped_and_unmappable_large_files(tmp_path, monkeypatch):
+    data, expected = make_source({3, 100, 200})
+    path = tmp_path / "big.py"
+    path.write_bytes(data)
+    monkeypatch.setattr(scanner, "MMAP_THRESHOLD", 1)
+    assert PatternScanner(PATTERNS).scan_file(str(path)) == expected
+
+    def no_mmap(*args, **kwargs):
+        raise OSError("cannot map")
+
+    monkeypatch.setattr(mmap, "mmap", no_mmap)
+    monkeypatch.setattr(scanner, "CHUNK_SIZE", 13)
+    findings, _, digest = PatternScanner(PATTERNS)._scan_path(str(path), hashing=True)
+    assert findings == expected
+    assert digest == scanner.content_digest(data)
@@ -0,0 +1,31 @@
+# test_profile.py - profiled runs go through the engine's loops via the hook
+import runner
+from msx_output import CaptureSink
+from msx_profile import Profiler
+
+SCRIPT = """function inner(a) {
+    print "inner $a"
+}
+function outer(x) {
+    print "outer $x"
+    call inner("$x")
+    call missing("b")
+}
+print "top"
+call outer("1")
+"""
+
+
+def test_profiled_run_matches_plain_run():
+    plain, profiled = CaptureSink(), CaptureSink()
+    profiler = Profiler("main")
+    assert runner.run_msx_source(SCRIPT, output=plain) is False
+    assert runner.run_msx_source(SCRIPT, output=profiled, profiler=profiler) is False
+    assert profiled.getvalue() == plain.getvalue()
+
+    assert {k: v[0] for k, v in profiler.kinds.items()} == {"parse": 1, "def": 2, "print": 3, "call": 2}
+    assert {k: v[0] for k, v in profiler.functions.items()} == {"outer": 1, "inner": 1}
+    assert {k: v[0] for k, v in profiler.lines.items()} == {1: 1, 4: 1, 9: 1, 10: 1, 5: 1, 2: 1, 6: 1}
+    assert sorted(profiler.stacks) == ["main", "main;outer", "main;outer;inner"]
+    # Every frame was closed, including the ones the error unwound
+    assert set(profiler._active.values()) == {0}
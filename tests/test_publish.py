@@ -0,0 +1,103 @@
+# test_publish.py - publishing an extension to a local bare repository
+import os
+import shutil
+import subprocess
+
+import pytest
+
+from msx.artifact import Artifact
+from publish_extension import publish_extension
+
+if shutil.which("git") is None:
+    pytest.skip("publishing needs git", allow_module_level=True)
+
+
+@pytest.fixture
+def repos(tmp_path, monkeypatch):
+    for var in ("AUTHOR", "COMMITTER"):
+        monkeypatch.setenv(f"GIT_{var}_NAME", "MSX Test")
+        monkeypatch.setenv(f"GIT_{var}_EMAIL", "msx-test@example.com")
+    monkeypatch.setenv("GIT_CONFIG_GLOBAL", os.devnull)
+    monkeypatch.setenv("GIT_CONFIG_NOSYSTEM", "1")
+    remote = tmp_path / "remote.git"
+    subprocess.run(["git", "init", "--quiet", "--bare", str(remote)], check=True)
+    extension = tmp_path / "ext"
+    (extension / "lib").mkdir(parents=True)
+    (extension / "main.msx").write_text('print "hello"\n')
+    (extension / "lib" / "util.msx").write_text('print "util"\n')
+    (extension / "notes.txt").write_text("draft\n")
+    return str(extension), str(remote)
+
+
+def remote_files(remote):
+    out = subprocess.run(["git", "--git-dir", remote, "ls-tree", "-r", "--name-only", "main"],
+                         check=True, stdout=subprocess.PIPE, text=True).stdout
+    return sorted(out.split())
+
+
+def remote_show(remote, path):
+    return subprocess.run(["git", "--git-dir", remote, "show", f"main:{path}"],
+                          check=True, stdout=subprocess.PIPE, text=True).stdout
+
+
+def blob_count(extension):
+    blob_dir = os.path.join(extension, ".msxpub", "blobs")
+    return sum(len(files) for _, _, files in os.walk(blob_dir))
+
+
+def test_first_publish_pushes_every_file(repos):
+    extension, remote = repos
+    publish_extension(extension, remote)
+    assert remote_files(remote) == ["lib/util.msx", "main.msx", "notes.txt"]
+    assert Artifact(extension).diff(Artifact(extension).build()) == ([], [])
+
+
+def test_incremental_publish_stages_changes_and_removals(repos, capsys):
+    extension, remote = repos
+    publish_extension(extension, remote)
+    with open(os.path.join(extension, "main.msx"), "a", encoding="utf-8") as f:
+        f.write('print "again"\n')
+    os.remove(os.path.join(extension, "notes.txt"))
+    with open(os.path.join(extension, "lib", "new.msx"), "w", encoding="utf-8") as f:
+        f.write('print "new"\n')
+    capsys.readouterr()
+    publish_extension(extension, remote)
+    assert "2 file(s) changed and 1 removed" in capsys.readouterr().out
+    assert remote_files(remote) == ["lib/new.msx", "lib/util.msx", "main.msx"]
+    assert remote_show(remote, "main.msx") == 'print "hello"\nprint "again"\n'
+
+    publish_extension(extension, remote)
+    assert "has not changed" in capsys.readouterr().out
+
+
+def test_publish_drops_blobs_of_unpublished_builds(repos):
+    extension, remote = repos
+    publish_extension(extension, remote)
+    path = os.path.join(extension, "notes.txt")
+    for n in range(3):
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(f"draft {n}\n")
+        Artifact(extension).build()  # built but never published
+    assert blob_count(extension) == 6
+    publish_extension(extension, remote)
+    # main.msx, lib/util.msx and the last notes.txt
+    assert blob_count(extension) == 3
+    assert remote_show(remote, "notes.txt") == "draft 2\n"
+
+
+def test_build_caches_are_not_published(repos):
+    extension, remote = repos
+    with open(os.path.join(extension, "main.msxc"), "wb") as f:
+        f.write(b"compiled")
+    os.makedirs(os.path.join(extension, "lib", ".minicache"))
+    with open(os.path.join(extension, "lib", ".minicache", "index.json"), "w", encoding="utf-8") as f:
+        f.write("{}")
+    publish_extension(extension, remote)
+    assert remote_files(remote) == ["lib/util.msx", "main.msx", "notes.txt"]
+    with open(os.path.join(extension, ".git", "info", "exclude"), encoding="utf-8") as f:
+        excluded = f.read().splitlines()
+    assert {"/.msxpub", ".minicache/", "*.msxc"} <= set(excluded)
+    assert "/.msxscan" not in excluded
+    status = subprocess.run(["git", "-C", extension, "status", "--porcelain", "--ignored"],
+                            check=True, stdout=subprocess.PIPE, text=True).stdout
+    assert "?? " not in status
@@ -0,0 +1,56 @@
+# test_ratings.py - the aggregate index follows the log without rereading it
+import json
+
+from msx_ratings import RatingsStore
+
+
+def test_stats_catch_up_from_the_recorded_offset(tmp_path, monkeypatch):
+    log = str(tmp_path / "ratings.log")
+    store = RatingsStore(log)
+    for rating in (5, 4, 4):
+        store.add(rating)
+    # Another writer appended without updating the index
+    with open(log, "a", encoding="ascii") as f:
+        f.write("1\nnot a rating\n9\n")
+    scanned_from = []
+    real_scan = RatingsStore._scan_log
+
+    def scan_log(self, index):
+        scanned_from.append(index["log_size"])
+        real_scan(self, index)
+
+    monkeypatch.setattr(RatingsStore, "_scan_log", scan_log)
+    stats = RatingsStore(log).stats()
+    assert scanned_from == [len("5\n4\n4\n")]
+    assert stats["count"] == 4
+    assert stats["sum"] == 14
+    assert stats["histogram"] == {1: 1, 2: 0, 3: 0, 4: 2, 5: 1}
+    RatingsStore(log).stats()
+    assert len(scanned_from) == 1  # the index is current again
+
+
+def test_truncated_log_rebuilds_the_index(tmp_path):
+    log = str(tmp_path / "ratings.log")
+    store = RatingsStore(log)
+    for rating in (1, 2, 3):
+        store.add(rating)
+    with open(log, "w", encoding="ascii") as f:
+        f.write("5\n")
+    assert store.stats()["histogram"] == {1: 0, 2: 0, 3: 0, 4: 0, 5: 1}
+    store.add(3)
+    assert store.stats()["average"] == 4.0
+
+
+def test_unreadable_index_is_rebuilt(tmp_path):
+    log = str(tmp_path / "ratings.log")
+    store = RatingsStore(log)
+    store.add(2)
+    store.add(4)
+    with open(store.index_path, "w", encoding="utf-8") as f:
+        f.write("{broken")
+    assert store.stats()["count"] == 2
+    with open(store.index_path, encoding="utf-8") as f:
+        assert json.load(f)["log_size"] == len("2\n4\n")
+    store.clear()
+    assert store.stats() == {"count": 0, "sum": 0, "average": 0.0,
+                             "histogram": {r: 0 for r in range(1, 6)}}
@@ -0,0 +1,77 @@
+# test_scanner.py - the scan cache cannot be forged and only rereads changed files
+import os
+import json
+
+import msx.scanner as scanner
+from msx.scanner import SCAN_CACHE_NAME, PatternScanner, ScanCache, patterns_digest, scan_cache_path
+from msx.signer import BLACKLISTED_PATTERNS, scan_extension
+
+BAD = b'import subprocess\nsubprocess.run("x")\n'
+GOOD = b'print("hello there, world")\n'
+
+
+def test_cache_is_kept_outside_the_extension(tmp_path, monkeypatch):
+    monkeypatch.setenv("MSX_CACHE_DIR", str(tmp_path / "cache"))
+    root = tmp_path / "ext"
+    root.mkdir()
+    (root / "main.py").write_bytes(GOOD)
+    assert scan_extension(str(root)) == []
+    assert not (root / SCAN_CACHE_NAME).exists()
+    assert os.path.exists(scan_cache_path(str(root)))
+
+
+def test_forged_cache_in_the_tree_is_ignored(tmp_path, monkeypatch):
+    monkeypatch.delenv("MSX_CACHE_DIR", raising=False)
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path / "cache"))
+    root = tmp_path / "ext"
+    root.mkdir()
+    path = root / "main.py"
+    path.write_bytes(BAD)
+    st = os.stat(path)
+    forged = {"version": 1, "patterns": patterns_digest(BLACKLISTED_PATTERNS), "written_ns": st.st_mtime_ns * 2,
+              "files": {"main.py": [st.st_size, st.st_mtime_ns, "0" * 32]}}
+    (root / SCAN_CACHE_NAME).write_text(json.dumps(forged))
+    assert len(scan_extension(str(root))) == 2
+
+
+def test_unchanged_stat_does_not_vouch_for_new_content(tmp_path, monkeypatch):
+    monkeypatch.setenv("MSX_CACHE_DIR", str(tmp_path / "cache"))
+    root = tmp_path / "ext"
+    root.mkdir()
+    path = root / "main.py"
+    path.write_bytes(GOOD.ljust(len(BAD)))
+    os.utime(path, ns=(10**18, 10**18))
+    assert scan_extension(str(root)) == []
+    # Same size and mtime, different content
+    path.write_bytes(BAD)
+    os.utime(path, ns=(10**18, 10**18))
+    digest, trusted = ScanCache(str(root), BLACKLISTED_PATTERNS).lookup(str(path))
+    assert digest is not None and not trusted
+    assert len(scan_extension(str(root))) == 2
+
+
+def test_warm_rescan_opens_only_the_edited_file(tmp_path, monkeypatch):
+    monkeypatch.setenv("MSX_CACHE_DIR", str(tmp_path / "cache"))
+    # Files written just now would otherwise be too recent to trust
+    monkeypatch.setattr(scanner, "RACY_WINDOW_NS", 0)
+    root = tmp_path / "ext"
+    root.mkdir()
+    for n in range(5):
+        (root / f"file{n}.py").write_bytes(GOOD)
+    assert scan_extension(str(root), jobs=1) == []
+
+    opened = []
+    real_scan_path = PatternScanner._scan_path
+
+    def scan_path(self, path, *args):
+        opened.append(os.path.basename(path))
+        return real_scan_path(self, path, *args)
+
+    monkeypatch.setattr(PatternScanner, "_scan_path", scan_path)
+    (root / "file3.py").write_bytes(GOOD + b"print(1)\n")
+    assert scan_extension(str(root), jobs=1) == []
+    assert opened == ["file3.py"]
+    opened.clear()
+    (root / "file1.py").write_bytes(BAD)
+    assert len(scan_extension(str(root), jobs=1)) == 2
+    assert opened == ["file1.py"]
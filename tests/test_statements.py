@@ -0,0 +1,88 @@
+# test_statements.py - statement dispatch picks the longest phrase and loads handlers lazily
+import sys
+
+import pytest
+
+import msx_statements
+from msx_statements import StatementRegistry
+
+
+def recorder(calls, name, result=None):
+    def handler(args):
+        calls.append((name, args))
+        return result
+    return handler
+
+
+def test_longest_phrase_wins():
+    calls = []
+    registry = StatementRegistry()
+    registry.register("msx rate", recorder(calls, "rate"), prefix=True)
+    registry.register("msx rate stats", recorder(calls, "stats"))
+    assert registry.dispatch("msx rate stats")
+    assert registry.dispatch("msx rate stats weekly")
+    assert registry.dispatch("msx rate 5")
+    assert calls == [("stats", ()), ("rate", ("stats", "weekly")), ("rate", ("5",))]
+
+
+def test_exact_and_prefix_phrases():
+    calls = []
+    registry = StatementRegistry()
+    registry.register("msx ping", recorder(calls, "exact"))
+    assert not registry.dispatch("msx ping now")
+    registry.register("msx ping", recorder(calls, "prefix"), prefix=True)
+    assert registry.dispatch("msx  ping")
+    assert registry.dispatch("msx ping now")
+    assert not registry.dispatch("msx pong")
+    assert calls == [("exact", ()), ("prefix", ("now",))]
+    assert registry.count == 2
+    assert registry.phrases() == ["msx ping", "msx ping ..."]
+
+
+def test_registering_clears_resolved_lines():
+    calls = []
+    registry = StatementRegistry()
+    registry.register("msx deploy", recorder(calls, "deploy"), prefix=True)
+    assert registry.dispatch("msx deploy now")
+    registry.register("msx deploy now", recorder(calls, "now"))
+    assert registry.dispatch("msx deploy now")
+    assert calls == [("deploy", ("now",)), ("now", ())]
+
+
+def test_resolved_lines_are_bounded(monkeypatch):
+    monkeypatch.setattr(msx_statements, "RESOLVE_CACHE_SIZE", 2)
+    registry = StatementRegistry()
+    registry.register("msx echo", lambda args: None, prefix=True)
+    for n in range(5):
+        registry.dispatch(f"msx echo {n}")
+    assert len(registry._cache) <= 2
+
+
+def test_handler_returning_false_is_not_handled():
+    registry = StatementRegistry()
+    registry.register("msx maybe", lambda args: bool(args), prefix=True)
+    assert registry.dispatch("msx maybe yes")
+    assert not registry.dispatch("msx maybe")
+
+
+def test_module_handlers_are_imported_on_first_use(tmp_path, monkeypatch):
+    (tmp_path / "lazy_statement_handlers.py").write_text(
+        "calls = []\n\ndef deploy(args):\n    calls.append(args)\n")
+    monkeypatch.syspath_prepend(str(tmp_path))
+    monkeypatch.delitem(sys.modules, "lazy_statement_handlers", raising=False)
+    registry = StatementRegistry()
+    registry.register("msx deploy", "lazy_statement_handlers:deploy", prefix=True)
+    assert "lazy_statement_handlers" not in sys.modules
+    assert registry.dispatch("msx deploy site")
+    assert registry.dispatch("msx deploy docs")
+    module = sys.modules["lazy_statement_handlers"]
+    assert module.calls == [("site",), ("docs",)]
+    assert callable(registry.root.children["msx"].children["deploy"].prefix[1])
+
+
+def test_bad_registrations_are_rejected():
+    registry = StatementRegistry()
+    with pytest.raises(ValueError):
+        registry.register("  ", lambda args: None)
+    with pytest.raises(ValueError):
+        registry.register("msx x", "not_a_handler")
@@ -0,0 +1,56 @@
+# test_streaming.py - streamed scripts run in bounded memory
+#
+# Each run happens in a fresh interpreter so ru_maxrss (the peak resident
+# size) only covers that run. A script ten times longer must not need more
+# memory: nothing is kept per top-level statement, and the long function
+# body is spilled to disk in SPILL_CHUNK pieces.
+import os
+import sys
+import subprocess
+
+import pytest
+
+resource = pytest.importorskip("resource")
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+RUN_STREAMED = r'''
+import sys, resource
+import runner
+from msx_output import NullSink
+
+lines = int(sys.argv[1])
+pad = "x" * 80
+
+def script():
+    yield "function f(a) {\n"
+    for i in range(25000):
+        yield f'    print "body line {i} of f for $a {pad}"\n'
+    yield "}\n"
+    for i in range(lines):
+        yield f'print "line {i} {pad}"\n'
+        if i % 100000 == 0:
+            yield "call f(one)\n"
+
+before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+ok = runner.run_msx_source(script(), output=NullSink())
+after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+print(ok, (after - before) * (1 if sys.platform == "darwin" else 1024))
+'''
+
+
+def peak_growth(lines, tmp_path):
+    env = dict(os.environ, PYTHONPATH=ROOT, TMPDIR=str(tmp_path))
+    result = subprocess.run([sys.executable, "-c", RUN_STREAMED, str(lines)], cwd=tmp_path, env=env,
+                            capture_output=True, text=True, check=True)
+    ok, growth = result.stdout.split()
+    assert ok == "True", result.stdout + result.stderr
+    return int(growth)
+
+
+def test_peak_rss_is_flat(tmp_path):
+    small = peak_growth(200_000, tmp_path)     # ~20 MB of source
+    large = peak_growth(2_000_000, tmp_path)   # ~200 MB of source
+    # Ten times the input, at most a few MB more peak memory
+    assert large - small < 8 * 1024 * 1024, (small, large)
+    assert large < 64 * 1024 * 1024, large
@@ -0,0 +1,40 @@
+# test_subscriptions.py - a named user's expiry only removes that user
+import time
+
+import runner
+from msx_output import CaptureSink, use_sink
+from msx_ratings import RatingsStore
+from msx_subscriptions import DEFAULT_USER, open_store
+
+OLD_START = int(time.time()) - 48 * 3600
+
+
+def test_named_user_expiry_keeps_other_users(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    store = open_store(runner.SUBS_FILE)
+    store.subscribe(DEFAULT_USER, 24)
+    store.subscribe("ada", 24, OLD_START)
+    store.subscribe("grace", 24)
+    RatingsStore(runner.RATINGS_FILE).add(5)
+    with use_sink(CaptureSink()) as sink:
+        assert runner.check_subscription("ada") is False
+        assert runner.check_subscription("grace") is True
+    assert sink.lines[0] == "Subscription for ada expired!"
+    assert store.get("ada") is None
+    assert store.get("grace") is not None
+    assert store.get(DEFAULT_USER) is not None
+    assert RatingsStore(runner.RATINGS_FILE).stats()["count"] == 1
+
+
+def test_default_user_expiry_resets_the_extension(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    store = open_store(runner.SUBS_FILE)
+    store.subscribe(DEFAULT_USER, 24, OLD_START)
+    store.subscribe("grace", 24)
+    RatingsStore(runner.RATINGS_FILE).add(5)
+    with use_sink(CaptureSink()) as sink:
+        assert runner.check_subscription() is False
+    assert sink.lines[0] == "Subscription expired! Restarting extension..."
+    assert "Extension reset. You must start over." in sink.lines
+    assert open_store(runner.SUBS_FILE).get("grace") is None
+    assert RatingsStore(runner.RATINGS_FILE).stats()["count"] == 0
@@ -0,0 +1,68 @@
+# test_tester.py - script results, reports and the exit status reflect failed scripts
+import os
+import sys
+import json
+import subprocess
+import xml.etree.ElementTree as ET
+
+import pytest
+
+import msx.tester as tester
+from msx.tester import junit_report, run_isolated
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_failed_script_is_reported(tmp_path):
+    good = tmp_path / "good.msx"
+    good.write_text('print "fine"\n')
+    bad = tmp_path / "bad.msx"
+    bad.write_text('print "before"\ncall missing("x")\nprint "after"\n')
+    results = [run_isolated(str(good)), run_isolated(str(bad))]
+    assert [r["status"] for r in results] == ["passed", "failed"]
+    assert results[1]["error"] == "Error: Function 'missing' not defined at line 2"
+
+    suite = ET.fromstring(junit_report(results, str(tmp_path), 0.0))
+    assert suite.get("failures") == "1"
+    assert suite.get("errors") == "0"
+    failure = suite.find("testcase[@name='bad.msx']/failure")
+    assert failure is not None and "missing" in failure.get("message")
+    assert suite.find("testcase[@name='good.msx']/failure") is None
+
+
+def make_extension(root, bad=True):
+    root.mkdir()
+    (root / "good.msx").write_text('print "fine"\n')
+    if bad:
+        (root / "bad.msx").write_text('call missing("x")\n')
+    return str(root)
+
+
+def cli_env():
+    env = dict(os.environ)
+    env["PYTHONPATH"] = REPO_ROOT + os.pathsep + env.get("PYTHONPATH", "")
+    return env
+
+
+def test_report_without_jobs_runs_inline(tmp_path, monkeypatch, capsys):
+    def no_pool(*args, **kwargs):
+        raise AssertionError("--report alone must not start a process pool")
+
+    monkeypatch.setattr(tester, "ProcessPoolExecutor", no_pool)
+    report = tmp_path / "report.json"
+    assert tester.test_extension(make_extension(tmp_path / "ext"), report=str(report)) is False
+    data = json.loads(report.read_text())
+    assert data["jobs"] == 1
+    assert [r["status"] for r in data["results"]] == ["failed", "passed"]
+    assert "2 scripts, 1 failed, 0 errors" in capsys.readouterr().out
+
+
+@pytest.mark.parametrize("options", [[], ["--jobs", "2"], ["--report", "report.xml"]])
+def test_cli_exits_1_when_a_script_fails(tmp_path, options):
+    command = [sys.executable, "-m", "msx.cli", "test-extension"]
+    bad = subprocess.run(command + [make_extension(tmp_path / "bad")] + options,
+                         cwd=tmp_path, env=cli_env(), stdout=subprocess.DEVNULL)
+    assert bad.returncode == 1
+    good = subprocess.run(command + [make_extension(tmp_path / "good", bad=False)] + options,
+                          cwd=tmp_path, env=cli_env(), stdout=subprocess.DEVNULL)
+    assert good.returncode == 0
@@ -0,0 +1,92 @@
+# test_watcher.py - inotify and polling watchers report the same changes
+import os
+import sys
+
+import pytest
+
+import msx.watcher as watcher
+from msx.watcher import InotifyWatcher, PollingWatcher
+
+WATCHERS = [PollingWatcher]
+if sys.platform.startswith("linux"):
+    WATCHERS.append(InotifyWatcher)
+
+
+@pytest.fixture(params=WATCHERS, ids=lambda cls: cls.__name__)
+def make_watcher(request, tmp_path, monkeypatch):
+    monkeypatch.setattr(watcher, "POLL_INTERVAL", 0.02)
+    root = tmp_path / "tree"
+    (root / "lib").mkdir(parents=True)
+    (root / "main.msx").write_text('print "main"\n')
+    (root / "lib" / "util.msx").write_text('print "util"\n')
+    watchers = []
+
+    def make():
+        w = request.param(str(root))
+        watchers.append(w)
+        return w
+
+    yield root, make
+    for w in watchers:
+        w.close()
+
+
+def write(path, text):
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(text)
+
+
+def test_create_modify_and_delete(make_watcher):
+    root, make = make_watcher
+    with make() as w:
+        write(root / "new.msx", 'print "new"\n')
+        assert w.wait(timeout=2) == ({str(root / "new.msx")}, set())
+        write(root / "main.msx", 'print "main, edited"\n')
+        assert w.wait(timeout=2) == ({str(root / "main.msx")}, set())
+        os.remove(root / "lib" / "util.msx")
+        assert w.wait(timeout=2) == (set(), {str(root / "lib" / "util.msx")})
+        write(root / "notes.txt", "not watched\n")
+        assert w.wait(timeout=0.2) == (set(), set())
+
+
+def test_new_folder_is_watched(make_watcher):
+    root, make = make_watcher
+    with make() as w:
+        (root / "pkg").mkdir()
+        write(root / "pkg" / "a.msx", 'print "a"\n')
+        assert w.wait(timeout=2) == ({str(root / "pkg" / "a.msx")}, set())
+        write(root / "pkg" / "b.msx", 'print "b"\n')
+        assert w.wait(timeout=2) == ({str(root / "pkg" / "b.msx")}, set())
+
+
+def test_burst_is_reported_once(make_watcher):
+    root, make = make_watcher
+    with make() as w:
+        for n in range(5):
+            write(root / "main.msx", f'print "save {n}"\n')
+        write(root / "lib" / "util.msx", 'print "util, edited"\n')
+        assert w.wait(timeout=2) == ({str(root / "main.msx"), str(root / "lib" / "util.msx")}, set())
+        assert w.wait(timeout=0.2) == (set(), set())
+
+
+@pytest.mark.skipif(not sys.platform.startswith("linux"), reason="needs inotify")
+def test_file_created_and_deleted_in_one_burst_is_not_reported(tmp_path):
+    (tmp_path / "main.msx").write_text('print "main"\n')
+    with InotifyWatcher(str(tmp_path)) as w:
+        write(tmp_path / "scratch.msx", "temp\n")
+        os.remove(tmp_path / "scratch.msx")
+        write(tmp_path / "main.msx", 'print "edited"\n')
+        assert w.wait(timeout=2) == ({str(tmp_path / "main.msx")}, set())
+
+
+@pytest.mark.skipif(not sys.platform.startswith("linux"), reason="needs inotify")
+def test_folder_moved_out_stops_being_watched(tmp_path):
+    root = tmp_path / "tree"
+    (root / "lib" / "deep").mkdir(parents=True)
+    (root / "lib" / "deep" / "a.msx").write_text('print "a"\n')
+    with InotifyWatcher(str(root)) as w:
+        os.rename(root / "lib", tmp_path / "moved")
+        assert w.wait(timeout=2) == (set(), {str(root / "lib" / "deep" / "a.msx")})
+        write(tmp_path / "moved" / "deep" / "b.msx", 'print "b"\n')
+        assert w.wait(timeout=0.2) == (set(), set())
+        assert list(w.dirs.values()) == [str(root)]